@@ -10,41 +10,90 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
+import functools
+import os
+from dataclasses import dataclass, field
+
 from langchain.agents import create_agent
-from langchain_core.tools import create_retriever_tool
-from langchain_huggingface import HuggingFaceEmbeddings
+from langchain.agents.middleware import ToolCallLimitMiddleware
+from langchain.tools import ToolRuntime
+from langchain_core.tools import tool
 from langchain_ollama import ChatOllama
-from langchain_core.vectorstores import InMemoryVectorStore
 
-# 1. Set up the vector store
+from retrieval_memo import RetrievalMemo
+from vector_index import PersistentVectorIndex, pack_passages
+
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+INDEX_DIR = os.environ.get("AGENTIC_RAG_INDEX_DIR", ".agentic_rag_index")
+SEARCH_TOP_K = int(os.environ.get("SEARCH_TOP_K", "4"))
+SEARCH_MAX_TOKENS = int(os.environ.get("SEARCH_MAX_TOKENS", "300"))
+MAX_SEARCHES = int(os.environ.get("MAX_SEARCHES", "3"))
+MEMO_SIMILARITY = float(os.environ.get("MEMO_SIMILARITY", "0.95"))
+
+
+@functools.cache
+def get_embeddings():
+    # Loading the embedding model takes seconds, so it is loaded only when needed:
+    # to embed new documents or a query
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    return HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+
+
+# 1. Set up the vector index
+# The index is persisted in INDEX_DIR. On later runs it is memory-mapped, and only
+# documents that are new or changed are embedded
 documents = [
     "The author of the book 'Fake Book: The New Age' is George Cauldron.",
     "The book discusses techniques for building robust and reliable AI systems.",
 ]
-embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-vector_store = InMemoryVectorStore.from_texts(documents, embeddings)
-retriever = vector_store.as_retriever()
+vector_index = PersistentVectorIndex.open(
+    INDEX_DIR, documents, lambda texts: get_embeddings().embed_documents(texts), EMBEDDING_MODEL
+)
+
 
 # 2. Create the RAG tool
+# Each question runs in its own session. The agent often searches again with a
+# reworded query, so the session memo reuses the results of the same (or a very
+# similar) query instead of embedding it and scanning the index again
+@dataclass
+class SearchSession:
+    memo: RetrievalMemo = field(default_factory=lambda: RetrievalMemo(MEMO_SIMILARITY))
+
+
 # The description is the only signal the agent has when it decides whether to
 # retrieve, so it must state what the collection contains
-tool = create_retriever_tool(
-    retriever,
+@tool(
     "search_documents",
-    "Search the private document collection, which contains facts about "
+    description="Search the private document collection, which contains facts about "
     "books, their authors, and their content. Use it for any question "
     "about a book or an author.",
 )
-tools = [tool]
+def search_documents(query: str, runtime: ToolRuntime[SearchSession]) -> str:
+    # At most SEARCH_TOP_K passages and SEARCH_MAX_TOKENS tokens are returned per call
+    memo = runtime.context.memo if runtime.context else RetrievalMemo(MEMO_SIMILARITY)
+    results = memo.retrieve(
+        query,
+        lambda q: get_embeddings().embed_query(q),
+        lambda vector: vector_index.search(vector, k=SEARCH_TOP_K),
+    )
+    return pack_passages([text for text, _ in results], SEARCH_MAX_TOKENS)
+
+
+tools = [search_documents]
 
 # 3. Create the agent
 # create_agent (LangChain 1.0+) builds the tool-calling loop internally, so no
 # ReAct prompt and no AgentExecutor are needed. The model must support tool
-# calling and have enough capacity to answer from the retrieved passages
+# calling and have enough capacity to answer from the retrieved passages.
+# Every search adds its passages to the conversation, so the number of searches
+# per question is limited to keep the context bounded
 llm = ChatOllama(model="llama3.1:8b", temperature=0)
 agent = create_agent(
     model=llm,
     tools=tools,
+    middleware=[ToolCallLimitMiddleware(tool_name="search_documents", run_limit=MAX_SEARCHES)],
+    context_schema=SearchSession,
     system_prompt=(
         "Answer in one sentence, using only the passages returned "
         "by the search_documents tool."
@@ -54,13 +103,16 @@ agent = create_agent(
 
 # 4. Run the agent with some questions
 def run_agent(question):
+    session = SearchSession()
     try:
         response = agent.invoke(
-            {"messages": [{"role": "user", "content": question}]}
+            {"messages": [{"role": "user", "content": question}]},
+            context=session,
         )
         print(response["messages"][-1].content)
     except Exception as e:
         print(f"An error occurred: {e}")
+    print(f"[retrieval memo] {session.memo.summary()}")
 
 
 question = "Who is the author of the book 'Fake Book: The New Age'?"
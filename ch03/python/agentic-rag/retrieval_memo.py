@@ -0,0 +1,94 @@
+"""
+(C) Copyright 2026 Boni Garcia (https://bonigarcia.github.io/)
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+ http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import re
+import threading
+from typing import Any, Callable, Dict, List, Sequence
+
+import numpy as np
+
+WORD = re.compile(r"\w+")
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase words only, so queries differing in case, punctuation or spacing are equal."""
+    return " ".join(WORD.findall(query.lower()))
+
+
+class RetrievalMemo:
+    """
+    Remembers the retrieval results of one session (e.g., the tool calls of one question).
+
+    A query whose normalized text was already searched is answered without embedding it.
+    Otherwise the query is embedded, and if its embedding has a cosine similarity of at
+    least `similarity_threshold` with an earlier query, that query's results are reused
+    without searching the index. Only the remaining queries reach the retriever. The memo
+    can be shared by tool calls that run in parallel threads.
+    """
+
+    def __init__(self, similarity_threshold: float = 0.95):
+        self.similarity_threshold = similarity_threshold
+        self.by_text: Dict[str, Any] = {}
+        self.vectors: List[np.ndarray] = []
+        self.results: List[Any] = []
+        self.counters = {"calls": 0, "text_hits": 0, "similar_hits": 0, "embeddings": 0, "searches": 0}
+        self._lock = threading.Lock()
+
+    def retrieve(
+        self,
+        query: str,
+        embed_query: Callable[[str], Sequence[float]],
+        search: Callable[[Sequence[float]], Any],
+    ) -> Any:
+        key = normalize_query(query)
+        with self._lock:
+            self.counters["calls"] += 1
+            if key in self.by_text:
+                self.counters["text_hits"] += 1
+                return self.by_text[key]
+
+        vector = np.asarray(embed_query(query), dtype=np.float32)
+        vector = vector / (np.linalg.norm(vector) or 1.0)
+        with self._lock:
+            self.counters["embeddings"] += 1
+            match = self._most_similar(vector)
+            if match is not None:
+                self.counters["similar_hits"] += 1
+                self.by_text[key] = self.results[match]
+                return self.results[match]
+
+        results = search(vector)
+        with self._lock:
+            self.counters["searches"] += 1
+            self.by_text[key] = results
+            self.vectors.append(vector)
+            self.results.append(results)
+        return results
+
+    def _most_similar(self, vector: np.ndarray):
+        if not self.vectors:
+            return None
+        similarities = np.stack(self.vectors) @ vector
+        best = int(np.argmax(similarities))
+        return best if similarities[best] >= self.similarity_threshold else None
+
+    @property
+    def avoided(self) -> int:
+        """Retriever calls (index searches) avoided by the memo."""
+        return self.counters["calls"] - self.counters["searches"]
+
+    def summary(self) -> str:
+        c = self.counters
+        return (f"search_documents calls: {c['calls']}, retriever calls: {c['searches']}, "
+                f"avoided: {self.avoided} ({c['text_hits']} same query, {c['similar_hits']} similar query), "
+                f"query embeddings: {c['embeddings']}")
+
@@ -0,0 +1,69 @@
+from importlib import util
+from pathlib import Path
+import unittest
+
+
+def load_memo_module():
+    path = Path(__file__).with_name("retrieval_memo.py")
+    spec = util.spec_from_file_location("retrieval_memo", path)
+    module = util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+VECTORS = {
+    "who wrote fake book": [1.0, 0.0, 0.0],
+    "who is the author of fake book": [0.99, 0.05, 0.0],
+    "what is the book about": [0.0, 1.0, 0.0],
+}
+
+
+class RetrievalMemoTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.module = load_memo_module()
+
+    def setUp(self):
+        self.memo = self.module.RetrievalMemo(similarity_threshold=0.95)
+        self.embedded, self.searched = [], []
+
+    def embed(self, query):
+        self.embedded.append(query)
+        return VECTORS[self.module.normalize_query(query)]
+
+    def search(self, vector):
+        self.searched.append(vector)
+        return [f"result {len(self.searched)}"]
+
+    def retrieve(self, query):
+        return self.memo.retrieve(query, self.embed, self.search)
+
+    def test_same_normalized_query_skips_embedding_and_search(self):
+        first = self.retrieve("Who wrote Fake Book?")
+        second = self.retrieve("  who WROTE fake book ")
+
+        self.assertEqual(first, second)
+        self.assertEqual((len(self.embedded), len(self.searched)), (1, 1))
+        self.assertEqual(self.memo.counters["text_hits"], 1)
+
+    def test_similar_query_reuses_results_without_search(self):
+        first = self.retrieve("Who wrote Fake Book?")
+        second = self.retrieve("Who is the author of Fake Book?")
+
+        self.assertEqual(first, second)
+        self.assertEqual((len(self.embedded), len(self.searched)), (2, 1))
+        self.assertEqual(self.memo.counters["similar_hits"], 1)
+
+    def test_different_query_reaches_the_retriever(self):
+        self.retrieve("Who wrote Fake Book?")
+        other = self.retrieve("What is the book about?")
+        self.retrieve("what is the book about")
+
+        self.assertEqual(other, ["result 2"])
+        self.assertEqual(self.memo.counters["searches"], 2)
+        self.assertEqual(self.memo.avoided, 1)
+        self.assertIn("avoided: 1", self.memo.summary())
+
+
+if __name__ == "__main__":
+    unittest.main()
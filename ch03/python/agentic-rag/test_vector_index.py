@@ -0,0 +1,106 @@
+from importlib import util
+from pathlib import Path
+import tempfile
+import unittest
+
+import numpy as np
+
+
+def load_index_module():
+    path = Path(__file__).with_name("vector_index.py")
+    spec = util.spec_from_file_location("vector_index", path)
+    module = util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class CountingEmbeddings:
+    """One dimension per vocabulary word, and a record of every text embedded."""
+
+    vocabulary = ["author", "book", "systems", "coffee", "grinder"]
+
+    def __init__(self):
+        self.embedded = []
+
+    def embed_query(self, text):
+        words = text.lower().split()
+        return [float(sum(word.startswith(term) for word in words)) for term in self.vocabulary]
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [self.embed_query(text) for text in texts]
+
+
+DOCUMENTS = [
+    "The author of the book is George Cauldron.",
+    "The book covers reliable AI systems.",
+    "Coffee tastes better with a burr grinder.",
+]
+
+
+class PersistentVectorIndexTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.module = load_index_module()
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = str(Path(self.tmp.name) / "index")
+        self.embeddings = CountingEmbeddings()
+
+    def open(self, texts, model="model-a"):
+        return self.module.PersistentVectorIndex.open(self.path, texts, self.embeddings.embed_documents, model)
+
+    def test_search_returns_the_most_similar_texts_first(self):
+        index = self.open(DOCUMENTS)
+
+        results = index.search(self.embeddings.embed_query("coffee grinder"), k=2)
+
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0][0], DOCUMENTS[2])
+        self.assertAlmostEqual(results[0][1], 1.0, places=5)
+
+    def test_unchanged_index_is_memory_mapped_without_embedding(self):
+        self.open(DOCUMENTS)
+        self.embeddings.embedded.clear()
+
+        index = self.open(DOCUMENTS)
+
+        self.assertEqual(self.embeddings.embedded, [])
+        self.assertIsInstance(index.vectors, np.memmap)
+
+    def test_only_new_texts_are_embedded(self):
+        first = self.open(DOCUMENTS)
+        vectors = np.array(first.vectors)
+        self.embeddings.embedded.clear()
+
+        index = self.open(DOCUMENTS[1:] + ["A new book by another author."])
+
+        self.assertEqual(self.embeddings.embedded, ["A new book by another author."])
+        self.assertEqual(index.embedded, 1)
+        np.testing.assert_array_equal(index.vectors[:2], vectors[1:])
+        reloaded = self.module.PersistentVectorIndex.load(self.path)
+        self.assertEqual(reloaded.texts, index.texts)
+        self.assertEqual(len(list(Path(self.path).glob("vectors-*.npy"))), 1)
+
+    def test_a_different_model_embeds_everything_again(self):
+        self.open(DOCUMENTS)
+        self.embeddings.embedded.clear()
+
+        self.open(DOCUMENTS, model="model-b")
+
+        self.assertEqual(self.embeddings.embedded, DOCUMENTS)
+
+    def test_packed_passages_stay_within_the_token_cap(self):
+        passages = ["word " * 40, "short passage", "another short passage"]
+
+        self.assertEqual(self.module.pack_passages(passages[1:], 100), "short passage\n\nanother short passage")
+        self.assertEqual(self.module.pack_passages(passages[1:], 5), "short passage")
+        truncated = self.module.pack_passages(passages, 20)
+        self.assertTrue(truncated.endswith(" ..."))
+        self.assertLessEqual(self.module.estimate_tokens(truncated), 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
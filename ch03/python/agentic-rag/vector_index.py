@@ -0,0 +1,178 @@
+"""
+(C) Copyright 2026 Boni Garcia (https://bonigarcia.github.io/)
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+ http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token for English)."""
+    return len(text) // 4 + 1
+
+
+class PersistentVectorIndex:
+    """
+    A vector index stored in a directory, with embeddings reused across runs.
+
+    The normalized embeddings are kept in a NumPy `.npy` file that is memory-mapped on
+    load, so opening an index takes milliseconds and does not read all vectors into
+    memory. The texts and their hashes are kept in JSON files next to it. When the document set
+    changes, only new texts are embedded; the vectors of unchanged texts are copied from
+    the previous index. Search is an exact cosine similarity (dot product) over all rows.
+    """
+
+    def __init__(self, path: Path, vectors: np.ndarray, texts: List[str], hashes: List[str], model: str):
+        self.path = Path(path)
+        self.vectors = vectors
+        self.texts = texts
+        self.hashes = hashes
+        self.model = model
+        self.embedded = 0  # texts embedded (not reused) when the index was opened
+
+    @classmethod
+    def load(cls, path: str) -> Optional["PersistentVectorIndex"]:
+        """The index stored in `path`, or None if there is none (or it is incomplete)."""
+        path = Path(path)
+        try:
+            meta = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+            texts = json.loads((path / meta["texts"]).read_text(encoding="utf-8"))
+            vectors = np.load(path / meta["vectors"], mmap_mode="r")
+        except (OSError, ValueError, KeyError):
+            return None
+        if len(texts) != len(meta["hashes"]) or vectors.shape[0] != len(texts):
+            return None
+        return cls(path, vectors, texts, meta["hashes"], meta["model"])
+
+    @classmethod
+    def open(
+        cls,
+        path: str,
+        texts: Sequence[str],
+        embed_documents: Callable[[List[str]], List[List[float]]],
+        model: str,
+    ) -> "PersistentVectorIndex":
+        """
+        The index of `texts`, loaded from `path` if it is up to date, or updated otherwise.
+
+        `embed_documents` is called only for texts that are not in the stored index (all of
+        them if the index was built with a different `model`), so it can load the
+        embedding model lazily.
+        """
+        texts = list(texts)
+        hashes = [text_hash(text) for text in texts]
+        previous = cls.load(path)
+        if previous is not None and previous.model == model and previous.hashes == hashes:
+            return previous
+
+        reusable = {}
+        if previous is not None and previous.model == model:
+            reusable = {h: row for row, h in enumerate(previous.hashes)}
+        missing = [i for i, h in enumerate(hashes) if h not in reusable]
+        new_vectors = np.asarray(embed_documents([texts[i] for i in missing]), dtype=np.float32) if missing else None
+
+        if new_vectors is not None:
+            dimensions = new_vectors.shape[1]
+        else:
+            dimensions = previous.vectors.shape[1] if previous is not None else 0
+        vectors = np.empty((len(texts), dimensions), dtype=np.float32)
+        for i, h in enumerate(hashes):
+            if h in reusable:
+                vectors[i] = previous.vectors[reusable[h]]
+        if new_vectors is not None:
+            norms = np.linalg.norm(new_vectors, axis=1, keepdims=True)
+            vectors[missing] = new_vectors / np.where(norms == 0, 1, norms)
+        del previous  # release the memory map of the previous version
+
+        index = cls(Path(path), vectors, texts, hashes, model)
+        index.save()
+        index.embedded = len(missing)
+        return index
+
+    def save(self):
+        """
+        Writes the index files.
+
+        The vectors and texts are written to new files named after the index content, and
+        meta.json, which points to them, is replaced last. A crash while saving therefore
+        leaves the previous index intact, and a memory-mapped file is never overwritten.
+        """
+        self.path.mkdir(parents=True, exist_ok=True)
+        version = text_hash(self.model + "".join(self.hashes))[:16]
+        meta = {"model": self.model, "hashes": self.hashes,
+                "vectors": f"vectors-{version}.npy", "texts": f"texts-{version}.json"}
+        np.save(self.path / meta["vectors"], np.ascontiguousarray(self.vectors))
+        (self.path / meta["texts"]).write_text(json.dumps(self.texts, ensure_ascii=False), encoding="utf-8")
+        tmp = self.path / "meta.json.tmp"
+        tmp.write_text(json.dumps(meta), encoding="utf-8")
+        os.replace(tmp, self.path / "meta.json")
+
+        for old in [*self.path.glob("vectors-*.npy"), *self.path.glob("texts-*.json")]:
+            if old.name not in (meta["vectors"], meta["texts"]):
+                try:
+                    old.unlink()
+                except OSError:  # still memory-mapped (on Windows); removed by a later save
+                    pass
+
+    def search(self, query_vector: Sequence[float], k: int = 4) -> List[Tuple[str, float]]:
+        """The `k` texts most similar to the query vector, with their cosine similarity."""
+        if not self.texts or k <= 0:
+            return []
+        query = np.asarray(query_vector, dtype=np.float32)
+        scores = self.vectors @ (query / (np.linalg.norm(query) or 1.0))
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self.texts[i], float(scores[i])) for i in top]
+
+
+def pack_passages(
+    passages: Sequence[str],
+    max_tokens: int,
+    count_tokens: Callable[[str], int] = estimate_tokens,
+    separator: str = "\n\n",
+) -> str:
+    """
+    Joins passages (best first) until `max_tokens` is reached; the rest are dropped.
+
+    If even the first passage does not fit, it is cut at a word boundary, so a tool result
+    never exceeds the cap.
+    """
+    packed, used = [], 0
+    for passage in passages:
+        tokens = count_tokens(passage)
+        if used + tokens <= max_tokens:
+            packed.append(passage)
+            used += tokens
+        elif not packed:
+            # Binary search for the longest prefix of words that fits
+            words = passage.split()
+            low, high = 0, len(words)
+            while low < high:
+                middle = (low + high + 1) // 2
+                if count_tokens(" ".join(words[:middle]) + " ...") <= max_tokens:
+                    low = middle
+                else:
+                    high = middle - 1
+            if low:
+                packed.append(" ".join(words[:low]) + " ...")
+            break
+        else:
+            break
+    return separator.join(packed)
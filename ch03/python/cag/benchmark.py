@@ -0,0 +1,169 @@
+"""
+(C) Copyright 2026 Boni Garcia (https://bonigarcia.github.io/)
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+ http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import argparse
+import statistics
+import tempfile
+import time
+from contextlib import redirect_stdout
+from io import StringIO
+
+from cag import TrueCacheAugmentedGenerator
+
+QUESTIONS = [
+    "What is the function of mitochondria?",
+    "How massive is Jupiter?",
+    "Which planet is the most massive in our solar system?",
+    "What do mitochondria generate?",
+]
+
+FACTS = (
+    "Jupiter is the largest planet in our solar system. Its mass is "
+    "two and a half times that of all the other planets in the Solar System combined. "
+    "Mitochondria are membrane-bound cell organelles that generate most of "
+    "the chemical energy needed to power the cell's biochemical reactions. "
+)
+
+
+def build_context(generator: TrueCacheAugmentedGenerator, target_tokens: int) -> str:
+    """Repeats the sample facts until the context is close to `target_tokens` tokens."""
+    per_copy = len(generator.tokenizer(FACTS).input_ids)
+    return FACTS * max(1, target_tokens // per_copy)
+
+
+def timed(fn, *args, **kwargs) -> float:
+    """Runs `fn` with its progress output silenced and returns the elapsed milliseconds."""
+    start = time.perf_counter()
+    with redirect_stdout(StringIO()):
+        fn(*args, **kwargs)
+    return (time.perf_counter() - start) * 1000
+
+
+def bench_load(generator: TrueCacheAugmentedGenerator, args):
+    """Prefill (forward pass over the context) vs. loading the saved cache from disk."""
+    context = build_context(generator, args.context_tokens)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = f"{tmp}/cache.safetensors"
+        # A fresh context id per run forces a real prefill instead of a pool hit.
+        prefill = [timed(generator.preload_context, context, context_id=f"prefill-{i}") for i in range(args.runs)]
+        with redirect_stdout(StringIO()):
+            generator.save_cache(path)
+        load = [timed(generator.load_cache, path, context=context) for _ in range(args.runs)]
+
+    print(f"Context: {len(generator.tokenizer(context).input_ids)} tokens, {args.runs} runs")
+    print(f"  prefill   median {statistics.median(prefill):9.2f}ms")
+    print(f"  load      median {statistics.median(load):9.2f}ms")
+    print(f"  speedup   {statistics.median(prefill) / statistics.median(load):.1f}x")
+
+
+def bench_batch(generator: TrueCacheAugmentedGenerator, args):
+    """Answers/sec of the sequential `ask` loop vs. `ask_batch` on the same questions."""
+    context = build_context(generator, args.context_tokens)
+    with redirect_stdout(StringIO()):
+        generator.preload_context(context)
+    questions = [QUESTIONS[i % len(QUESTIONS)] for i in range(args.questions)]
+
+    def sequential():
+        for q in questions:
+            generator.ask(q, max_new_tokens=args.max_new_tokens)
+
+    def batched():
+        for i in range(0, len(questions), args.batch_size):
+            generator.ask_batch(questions[i:i + args.batch_size], max_new_tokens=args.max_new_tokens)
+
+    seq = statistics.median(timed(sequential) for _ in range(args.runs))
+    bat = statistics.median(timed(batched) for _ in range(args.runs))
+
+    print(f"{len(questions)} questions, batch size {args.batch_size}, "
+          f"{args.max_new_tokens} new tokens, {args.runs} runs")
+    print(f"  sequential {len(questions) / seq * 1000:9.2f} answers/sec")
+    print(f"  batched    {len(questions) / bat * 1000:9.2f} answers/sec")
+    print(f"  speedup    {seq / bat:.1f}x")
+
+
+def bench_stream(generator: TrueCacheAugmentedGenerator, args):
+    """Time to first token and tokens/sec of `stream`."""
+    context = build_context(generator, args.context_tokens)
+    with redirect_stdout(StringIO()):
+        generator.preload_context(context)
+
+    ttft, throughput = [], []
+    for i in range(args.runs):
+        for _ in generator.stream(QUESTIONS[i % len(QUESTIONS)], max_new_tokens=args.max_new_tokens):
+            pass
+        ttft.append(generator.last_stream_stats.time_to_first_token * 1000)
+        throughput.append(generator.last_stream_stats.tokens_per_second)
+
+    print(f"{args.max_new_tokens} new tokens, {args.runs} runs")
+    print(f"  time to first token  median {statistics.median(ttft):9.2f}ms")
+    print(f"  throughput           median {statistics.median(throughput):9.1f} tokens/sec")
+
+
+def bench_prefill(generator: TrueCacheAugmentedGenerator, args):
+    """Prefill time and peak memory for different chunk sizes (the largest is a single pass)."""
+    context = build_context(generator, args.context_tokens)
+    print(f"Context: {len(generator.tokenizer(context).input_ids)} tokens, {args.runs} runs")
+    for chunk_size in (args.context_tokens, 256, 128, 64):
+        generator.prefill_chunk_size = chunk_size
+        times, peaks = [], []
+        for i in range(args.runs):
+            times.append(timed(generator.preload_context, context, context_id=f"chunk-{chunk_size}-{i}"))
+            peaks.append(generator.last_prefill_stats["peak_bytes"] or 0)
+        print(f"  chunk {chunk_size:5d}  median {statistics.median(times):9.2f}ms  "
+              f"peak memory +{statistics.median(peaks) / 2**20:7.1f}MiB")
+
+
+def bench_quantize(generator: TrueCacheAugmentedGenerator, args):
+    """Prefix memory, answer latency and agreement with fp32 for each cache quantization."""
+    context = build_context(generator, args.context_tokens)
+    questions = [QUESTIONS[i % len(QUESTIONS)] for i in range(args.questions)]
+
+    baseline = None
+    for quantization in (None, "fp16", "int8"):
+        with redirect_stdout(StringIO()):
+            quantized = TrueCacheAugmentedGenerator(model_name=args.model, cache_quantization=quantization)
+            quantized.preload_context(context)
+            answers = [quantized.ask(q, max_new_tokens=args.max_new_tokens) for q in questions]
+        latency = statistics.median(
+            timed(quantized.ask, q, max_new_tokens=args.max_new_tokens) for q in questions
+        )
+        cache_bytes = quantized.last_prefill_stats["cache_bytes"]
+        if baseline is None:
+            baseline = (cache_bytes, answers)
+        agreement = sum(a == b for a, b in zip(answers, baseline[1])) / len(answers)
+        print(f"  {quantization or 'fp32':5s} prefix {cache_bytes / 2**20:7.2f}MiB "
+              f"({baseline[0] / cache_bytes:.1f}x smaller)  ask median {latency:8.2f}ms  "
+              f"answers identical to fp32 {agreement:.0%}")
+
+
+BENCHMARKS = {
+    "prefill": bench_prefill,
+    "load": bench_load,
+    "batch": bench_batch,
+    "stream": bench_stream,
+    "quantize": bench_quantize,
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CAG benchmarks")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    parser.add_argument("--model", default="gpt2")
+    parser.add_argument("--context-tokens", type=int, default=768)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--questions", type=int, default=16)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--max-new-tokens", type=int, default=50)
+    args = parser.parse_args()
+
+    with redirect_stdout(StringIO()):
+        generator = TrueCacheAugmentedGenerator(model_name=args.model)
+    BENCHMARKS[args.benchmark](generator, args)
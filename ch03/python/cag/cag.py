@@ -10,14 +10,445 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
+import hashlib
+import json
+import os
+import sys
 import torch
 import time
-from transformers import AutoModelForCausalLM, AutoTokenizer
-from typing import Optional, Tuple
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from safetensors import SafetensorError, safe_open
+from safetensors.torch import save_file
+from transformers import AutoModelForCausalLM, AutoTokenizer, DynamicCache
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
 
 # A type hint for the KV cache structure.
 PastKeyValues = Tuple[Tuple[torch.Tensor, torch.Tensor], ...]
 
+# Bump when the on-disk layout of saved caches changes.
+CACHE_FORMAT_VERSION = "1"
+
+# What `preload_context` does with a context that does not fit in the model window.
+OVERFLOW_POLICIES = ("reject", "sliding_window")
+
+# How preloaded prefixes can be stored (None keeps the model dtype).
+CACHE_QUANTIZATIONS = (None, "fp16", "int8")
+
+
+def cache_layers(cache) -> List[Tuple[torch.Tensor, torch.Tensor]]:
+    """Returns the (key, value) tensors of every layer, whatever the cache class."""
+    if isinstance(cache, (tuple, list)):
+        return [(k, v) for k, v in cache]
+    if hasattr(cache, "layers"):
+        return [(layer.keys, layer.values) for layer in cache.layers]
+    return list(zip(cache.key_cache, cache.value_cache))
+
+
+def build_cache(layers: List[Tuple[torch.Tensor, torch.Tensor]]) -> DynamicCache:
+    """Builds a `DynamicCache` holding the given per-layer (key, value) tensors."""
+    cache = DynamicCache()
+    for layer_idx, (k, v) in enumerate(layers):
+        cache.update(k, v, layer_idx)
+    return cache
+
+
+def write_cache_file(path: Union[str, Path], tensors: Dict[str, torch.Tensor], metadata: Dict[str, str]):
+    """Writes the tensors of a prefix (see `CachedPrefix.tensors`) to a safetensors file."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    save_file({name: t.contiguous() for name, t in tensors.items()}, str(path), metadata=metadata)
+
+
+def read_cache_file(path: Union[str, Path], device: str) -> Tuple[Dict[str, torch.Tensor], Dict[str, str]]:
+    """Reads the tensors and metadata written by `write_cache_file`."""
+    with safe_open(str(path), framework="pt", device=str(device)) as f:
+        metadata = f.metadata() or {}
+        tensors = {name: f.get_tensor(name) for name in f.keys()}
+    return tensors, metadata
+
+
+def _read_peak_rss() -> Optional[int]:
+    """Peak resident set size of this process in bytes (None if it cannot be read)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+@contextmanager
+def measure_peak_memory(device: str):
+    """
+    Yields a dict whose "peak_bytes" is set, on exit, to the peak memory used inside the block.
+
+    On CUDA this is the allocator's peak; on CPU it is the growth of the process peak RSS
+    (on Linux the peak is reset first, elsewhere only a new process-wide peak is visible).
+    """
+    result = {"peak_bytes": None}
+    if device == "cuda":
+        torch.cuda.synchronize()
+        torch.cuda.reset_peak_memory_stats()
+        baseline = torch.cuda.memory_allocated()
+        yield result
+        torch.cuda.synchronize()
+        result["peak_bytes"] = torch.cuda.max_memory_allocated() - baseline
+        return
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")  # resets the VmHWM peak to the current RSS
+    except OSError:
+        pass
+    baseline = _read_peak_rss()
+    yield result
+    peak = _read_peak_rss()
+    if baseline is not None and peak is not None:
+        result["peak_bytes"] = peak - baseline
+
+
+def apply_repetition_penalty(logits: torch.Tensor, token_ids: List[int], penalty: float) -> torch.Tensor:
+    """Makes already seen tokens less likely (CTRL-style: shrink positive logits, grow negative ones)."""
+    if penalty == 1.0 or not token_ids:
+        return logits
+    seen = torch.tensor(sorted(set(token_ids)), device=logits.device)
+    scores = logits[..., seen]
+    logits[..., seen] = torch.where(scores > 0, scores / penalty, scores * penalty)
+    return logits
+
+
+def sample_next_token(
+    logits: torch.Tensor,
+    temperature: float = 0.0,
+    top_k: int = 0,
+    top_p: float = 1.0,
+    generator: Optional[torch.Generator] = None,
+) -> torch.Tensor:
+    """Picks the next token from `[batch, vocab]` logits; `temperature=0` means greedy."""
+    if temperature <= 0:
+        return torch.argmax(logits, dim=-1)
+
+    logits = logits / temperature
+    if top_k > 0:
+        kth_best = torch.topk(logits, min(top_k, logits.shape[-1]), dim=-1).values[..., -1:]
+        logits = logits.masked_fill(logits < kth_best, float("-inf"))
+    if top_p < 1.0:
+        sorted_logits, sorted_idx = torch.sort(logits, descending=True, dim=-1)
+        cumulative = torch.softmax(sorted_logits, dim=-1).cumsum(dim=-1)
+        # Drop a token once the tokens before it already cover `top_p` (the best one always stays).
+        drop = cumulative - torch.softmax(sorted_logits, dim=-1) >= top_p
+        logits = logits.scatter(-1, sorted_idx, sorted_logits.masked_fill(drop, float("-inf")))
+
+    probs = torch.softmax(logits, dim=-1)
+    return torch.multinomial(probs, num_samples=1, generator=generator).squeeze(-1)
+
+
+class StreamStats:
+    """Per-token latencies of a `stream` call."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.token_latencies: List[float] = []  # seconds since the previous token (or the start)
+        self._last = self.start
+
+    def record_token(self):
+        now = time.perf_counter()
+        self.token_latencies.append(now - self._last)
+        self._last = now
+
+    @property
+    def time_to_first_token(self) -> Optional[float]:
+        return self.token_latencies[0] if self.token_latencies else None
+
+    @property
+    def tokens_per_second(self) -> float:
+        elapsed = sum(self.token_latencies)
+        return len(self.token_latencies) / elapsed if elapsed > 0 else 0.0
+
+    def __str__(self) -> str:
+        if not self.token_latencies:
+            return "no tokens generated"
+        return (f"{len(self.token_latencies)} tokens, time to first token "
+                f"{self.time_to_first_token * 1000:.2f}ms, {self.tokens_per_second:.1f} tokens/sec")
+
+
+def _stop_prefix_overlap(text: str, stop: str) -> int:
+    """Length of the longest suffix of `text` that is a proper prefix of `stop`."""
+    for size in range(min(len(text), len(stop) - 1), 0, -1):
+        if stop.startswith(text[-size:]):
+            return size
+    return 0
+
+
+class CachedPrefix:
+    """A preloaded context: its KV cache, the number of context tokens, and its metadata."""
+
+    def __init__(self, cache, prefix_length: int, metadata: Dict[str, str]):
+        self.cache = cache
+        self.prefix_length = prefix_length
+        self.metadata = metadata
+
+    @classmethod
+    def from_tensors(cls, tensors: Dict[str, torch.Tensor], metadata: Dict[str, str]) -> "CachedPrefix":
+        num_layers = len([name for name in tensors if name.endswith(".key")])
+        layers = [(tensors[f"layer.{i}.key"], tensors[f"layer.{i}.value"]) for i in range(num_layers)]
+        return cls(build_cache(layers), layers[0][0].shape[-2] if layers else 0, metadata)
+
+    def tensors(self) -> Dict[str, torch.Tensor]:
+        """One key and one value tensor per layer, as written to disk."""
+        tensors = {}
+        for layer_idx, (k, v) in enumerate(cache_layers(self.cache)):
+            tensors[f"layer.{layer_idx}.key"] = k
+            tensors[f"layer.{layer_idx}.value"] = v
+        return tensors
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the cache tensors (storage size, so cropped views count in full)."""
+        storages = {}
+        for t in self.tensors().values():
+            storage = t.untyped_storage()
+            storages[storage.data_ptr()] = storage.nbytes()
+        return sum(storages.values())
+
+    def working_cache(self):
+        """The cache a single query runs on (call `restore` when the query is done)."""
+        return self.cache
+
+    def batch_cache(self, batch_size: int):
+        """A new cache with the prefix broadcast across `batch_size` rows (expand is a view, no copy)."""
+        return build_cache([
+            (k.expand(batch_size, -1, -1, -1), v.expand(batch_size, -1, -1, -1))
+            for k, v in cache_layers(self.cache)
+        ])
+
+    def restore(self):
+        """
+        Drops whatever a query appended to the shared cache, keeping only the context.
+
+        `DynamicCache` objects are extended in place by every forward pass, so without
+        this each question would silently become part of the context for the next one.
+        Legacy tuple caches are immutable and need no restoring.
+        """
+        if not hasattr(self.cache, "crop"):
+            return
+        # A negative value means "remove this many tokens" in every transformers version.
+        appended = self.cache.get_seq_length() - self.prefix_length
+        if appended > 0:
+            self.cache.crop(-appended)
+
+
+class QuantizedPrefix(CachedPrefix):
+    """
+    A preloaded context stored in fp16, or in int8 with one scale per channel.
+
+    Scales are computed per (head, head dimension) channel over the sequence, since
+    some key channels have much larger magnitudes than others. Queries run on a
+    `DequantizingCache`, which dequantizes each layer's prefix when that layer needs it.
+    """
+
+    def __init__(self, layers: List[Tuple[torch.Tensor, ...]], prefix_length: int,
+                 metadata: Dict[str, str], dtype: torch.dtype):
+        # Each layer is (key, value) in fp16, or (key, key scale, value, value scale) in int8.
+        self.layers = layers
+        self.prefix_length = prefix_length
+        self.metadata = metadata
+        self.dtype = dtype
+
+    @classmethod
+    def quantize(cls, cache, quantization: str, metadata: Dict[str, str]) -> "QuantizedPrefix":
+        layers = []
+        dtype = torch.float32
+        for k, v in cache_layers(cache):
+            dtype = k.dtype
+            if quantization == "fp16":
+                layers.append((k.half(), v.half()))
+            else:
+                layers.append((*_quantize_int8(k), *_quantize_int8(v)))
+        return cls(layers, cache.get_seq_length(), metadata, dtype)
+
+    @classmethod
+    def from_tensors(cls, tensors: Dict[str, torch.Tensor], metadata: Dict[str, str]) -> "QuantizedPrefix":
+        num_layers = len([name for name in tensors if name.endswith(".key")])
+        names = _quantized_tensor_names(metadata["quantization"])
+        layers = [tuple(tensors[f"layer.{i}.{name}"] for name in names) for i in range(num_layers)]
+        dtype = getattr(torch, metadata["dtype"].replace("torch.", ""))
+        return cls(layers, layers[0][0].shape[-2] if layers else 0, metadata, dtype)
+
+    def tensors(self) -> Dict[str, torch.Tensor]:
+        names = _quantized_tensor_names(self.metadata["quantization"])
+        return {
+            f"layer.{layer_idx}.{name}": t
+            for layer_idx, layer in enumerate(self.layers)
+            for name, t in zip(names, layer)
+        }
+
+    def dequantize_layer(self, layer_idx: int, dtype: torch.dtype) -> Tuple[torch.Tensor, torch.Tensor]:
+        layer = self.layers[layer_idx]
+        if len(layer) == 2:
+            return layer[0].to(dtype), layer[1].to(dtype)
+        k, k_scale, v, v_scale = layer
+        return k.to(dtype) * k_scale.to(dtype), v.to(dtype) * v_scale.to(dtype)
+
+    def working_cache(self):
+        return DequantizingCache(self)
+
+    def batch_cache(self, batch_size: int):
+        return DequantizingCache(self, batch_size=batch_size)
+
+    def restore(self):
+        # Queries never write to the quantized prefix, only to their own working cache.
+        pass
+
+
+def _quantized_tensor_names(quantization: str) -> Tuple[str, ...]:
+    if quantization == "fp16":
+        return ("key", "value")
+    return ("key", "key_scale", "value", "value_scale")
+
+
+def _quantize_int8(x: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+    """Symmetric int8 quantization with one scale per channel (absmax over the sequence axis)."""
+    scale = x.abs().amax(dim=-2, keepdim=True).clamp(min=1e-8) / 127
+    return torch.round(x / scale).clamp(-127, 127).to(torch.int8), scale.float()
+
+
+class DequantizingCache(DynamicCache):
+    """
+    Working cache for queries on a `QuantizedPrefix`.
+
+    It stores only the query and answer tokens, in full precision. When a layer
+    updates the cache, that layer's prefix is dequantized and prepended, so only
+    one layer's prefix is held in full precision at a time.
+    """
+
+    def __init__(self, prefix: QuantizedPrefix, batch_size: int = 1):
+        super().__init__()
+        self.prefix = prefix
+        self.rows = batch_size
+
+    def update(self, key_states, value_states, layer_idx, *args, **kwargs):
+        keys, values = super().update(key_states, value_states, layer_idx, *args, **kwargs)
+        prefix_keys, prefix_values = self.prefix.dequantize_layer(layer_idx, keys.dtype)
+        if self.rows > 1:
+            prefix_keys = prefix_keys.expand(self.rows, -1, -1, -1)
+            prefix_values = prefix_values.expand(self.rows, -1, -1, -1)
+        return torch.cat([prefix_keys, keys], dim=-2), torch.cat([prefix_values, values], dim=-2)
+
+    def get_seq_length(self, layer_idx: int = 0) -> int:
+        return self.prefix.prefix_length + super().get_seq_length(layer_idx)
+
+    def get_mask_sizes(self, query, layer_idx: int = 0):
+        # Older transformers versions pass `cache_position`, newer ones the query length.
+        query_length = query if isinstance(query, int) else query.shape[0]
+        return self.get_seq_length(layer_idx) + query_length, 0
+
+
+def prefix_from_tensors(tensors: Dict[str, torch.Tensor], metadata: Dict[str, str]) -> CachedPrefix:
+    """Rebuilds a prefix read by `read_cache_file`, quantized or not."""
+    if metadata.get("quantization", "none") != "none":
+        return QuantizedPrefix.from_tensors(tensors, metadata)
+    return CachedPrefix.from_tensors(tensors, metadata)
+
+
+class KVCachePool:
+    """
+    Holds many preloaded prefixes (one per context id) under a memory budget.
+
+    When the cached prefixes exceed `max_bytes`, the least recently used ones are
+    evicted: written to `spill_dir` (and transparently reloaded by `get`) if it is
+    set, or dropped otherwise. Spill files are named after the pool as well as the
+    context id, so pools (or processes) that share `spill_dir` never read each other's.
+    """
+
+    def __init__(self, device: str, max_bytes: Optional[int] = None, spill_dir: Optional[Union[str, Path]] = None):
+        self.device = device
+        self.max_bytes = max_bytes
+        self.spill_dir = Path(spill_dir) if spill_dir is not None else None
+        self.pool_id = uuid.uuid4().hex[:12]
+        self._entries: "OrderedDict[str, CachedPrefix]" = OrderedDict()
+        self._spilled: Dict[str, Tuple[Path, Dict[str, str]]] = {}  # path and metadata of each spill
+
+    def __contains__(self, context_id: str) -> bool:
+        return context_id in self._entries or context_id in self._spilled
+
+    def __len__(self) -> int:
+        return len(self._entries) + len(self._spilled)
+
+    @property
+    def total_bytes(self) -> int:
+        """Bytes held in memory by all resident prefixes."""
+        return sum(entry.nbytes for entry in self._entries.values())
+
+    def resident_ids(self) -> List[str]:
+        """Context ids held in memory, from least to most recently used."""
+        return list(self._entries)
+
+    def put(self, context_id: str, entry: CachedPrefix):
+        # A spill of an earlier prefix under the same id must never be reloaded for this one.
+        self._discard_spill(context_id)
+        self._entries[context_id] = entry
+        self._entries.move_to_end(context_id)
+        self._evict(keep=context_id)
+
+    def get(self, context_id: str) -> CachedPrefix:
+        if context_id in self._entries:
+            self._entries.move_to_end(context_id)
+            return self._entries[context_id]
+        if context_id in self._spilled:
+            path, expected = self._spilled[context_id]
+            try:
+                tensors, metadata = read_cache_file(path, self.device)
+            except (OSError, SafetensorError) as error:  # deleted or corrupt
+                self._discard_spill(context_id)
+                raise KeyError(f"Spill file of context '{context_id}' cannot be read ({error}); "
+                               f"call `preload_context` for it again.") from error
+            if metadata != expected:
+                self._discard_spill(context_id)
+                raise KeyError(f"Spill file of context '{context_id}' is stale; call `preload_context` for it again.")
+            del self._spilled[context_id]
+            entry = prefix_from_tensors(tensors, metadata)
+            self._entries[context_id] = entry
+            self._evict(keep=context_id)
+            return entry
+        raise KeyError(f"Unknown or evicted context '{context_id}'; call `preload_context` for it again.")
+
+    def _spill_path(self, context_id: str) -> Path:
+        digest = hashlib.sha256(context_id.encode("utf-8")).hexdigest()
+        return self.spill_dir / f"{self.pool_id}-{digest}.safetensors"
+
+    def _discard_spill(self, context_id: str):
+        spilled = self._spilled.pop(context_id, None)
+        if spilled is not None:
+            spilled[0].unlink(missing_ok=True)
+
+    def _evict(self, keep: str):
+        if self.max_bytes is None:
+            return
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            context_id = next(iter(self._entries))
+            if context_id == keep:
+                break
+            entry = self._entries.pop(context_id)
+            if self.spill_dir is not None:
+                # Always rewritten: a file left by an earlier process (or an earlier prefix
+                # under this id) may hold a different prefix.
+                path = self._spill_path(context_id)
+                tmp = path.with_name(path.name + ".tmp")
+                write_cache_file(tmp, entry.tensors(), entry.metadata)
+                os.replace(tmp, path)
+                self._spilled[context_id] = (path, dict(entry.metadata))
+
+
 class TrueCacheAugmentedGenerator:
     """
     A minimal implementation of cache-augmented generation (CAG).
@@ -25,47 +456,284 @@ class TrueCacheAugmentedGenerator:
     This class implements the generation loop to provide a demonstration
     of how the Key-Value (KV) cache is created, injected, and updated.
     """
-    def __init__(self, model_name: str = "gpt2"):
-        """Initializes the model and tokenizer."""
+    def __init__(
+        self,
+        model_name: str = "gpt2",
+        revision: str = "main",
+        cache_budget_mb: Optional[float] = None,
+        spill_dir: Optional[Union[str, Path]] = None,
+        prefill_chunk_size: int = 256,
+        overflow: str = "reject",
+        sink_tokens: int = 4,
+        reserve_tokens: int = 128,
+        cache_quantization: Optional[str] = None,
+    ):
+        """
+        Initializes the model and tokenizer.
+
+        `cache_budget_mb` caps the memory held by preloaded contexts; least recently
+        used contexts beyond it are spilled to `spill_dir` (or dropped if it is not set).
+
+        Contexts are prefilled in slices of `prefill_chunk_size` tokens. A context may
+        use the model window minus `reserve_tokens` (kept for the question and answer);
+        longer ones are rejected, or with `overflow="sliding_window"` only the first
+        `sink_tokens` tokens (attention sinks) and the most recent tokens are kept.
+
+        `cache_quantization` ("fp16" or "int8") stores preloaded prefixes in reduced
+        precision; they are dequantized layer by layer while answering.
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"`overflow` must be one of {OVERFLOW_POLICIES}, not {overflow!r}.")
+        if cache_quantization not in CACHE_QUANTIZATIONS:
+            raise ValueError(f"`cache_quantization` must be one of {CACHE_QUANTIZATIONS}, not {cache_quantization!r}.")
+        self.cache_quantization = cache_quantization
         print(f"Loading model: {model_name}...")
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         print(f"Running on device: {self.device}")
 
-        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-        self.model = AutoModelForCausalLM.from_pretrained(model_name).to(self.device)
+        self.model_name = model_name
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name, revision=revision)
+        self.model = AutoModelForCausalLM.from_pretrained(model_name, revision=revision).to(self.device)
         self.tokenizer.pad_token = self.tokenizer.eos_token
+        # Prefer the resolved commit hash so that "main" pointing to a new commit invalidates saved caches.
+        self.revision = getattr(self.model.config, "_commit_hash", None) or revision
+        self._tokenizer_hash: Optional[str] = None
+
+        # Internal state for the cache: every preloaded context, and the one `ask` uses by default
+        max_bytes = int(cache_budget_mb * 1024 * 1024) if cache_budget_mb is not None else None
+        self.pool = KVCachePool(self.device, max_bytes=max_bytes, spill_dir=spill_dir)
+        self.active_context_id: Optional[str] = None
+        self.last_stream_stats: Optional[StreamStats] = None
+
+        # Prefill settings
+        self.prefill_chunk_size = prefill_chunk_size
+        self.overflow = overflow
+        self.sink_tokens = sink_tokens
+        max_positions = getattr(self.model.config, "n_positions", None) or getattr(
+            self.model.config, "max_position_embeddings", None)
+        self.max_context_tokens = max_positions - reserve_tokens if max_positions else None
+        self.last_prefill_stats: Optional[dict] = None
+        if overflow == "sliding_window" and self.max_context_tokens and \
+                prefill_chunk_size > self.max_context_tokens - sink_tokens:
+            raise ValueError("`prefill_chunk_size` must leave room for the attention sinks in the window.")
 
-        # Internal state for the cache
-        self.kv_cache: Optional[PastKeyValues] = None
+    @property
+    def kv_cache(self) -> Optional[PastKeyValues]:
+        """The KV cache of the active context (None before `preload_context`)."""
+        if self.active_context_id is None:
+            return None
+        return self.pool.get(self.active_context_id).working_cache()
 
-    def preload_context(self, context: str):
+    @property
+    def prefix_length(self) -> int:
+        """Number of context tokens in the active context's cache."""
+        if self.active_context_id is None:
+            return 0
+        return self.pool.get(self.active_context_id).prefix_length
+
+    def _prefix(self, context_id: Optional[str]) -> CachedPrefix:
+        context_id = context_id if context_id is not None else self.active_context_id
+        if context_id is None:
+            raise ValueError("You must call `preload_context` before asking a question.")
+        return self.pool.get(context_id)
+
+    def tokenizer_fingerprint(self) -> str:
+        """Hash of the tokenizer vocabulary (a different tokenizer yields different token ids)."""
+        if self._tokenizer_hash is None:
+            vocab = json.dumps(self.tokenizer.get_vocab(), sort_keys=True)
+            self._tokenizer_hash = hashlib.sha256(vocab.encode("utf-8")).hexdigest()
+        return self._tokenizer_hash
+
+    def cache_metadata(self, context: str) -> dict:
+        """Everything a saved KV cache depends on; a cache is only valid if all of it matches."""
+        return {
+            "format": CACHE_FORMAT_VERSION,
+            "model": self.model_name,
+            "revision": str(self.revision),
+            "tokenizer": self.tokenizer_fingerprint(),
+            "dtype": str(self.model.dtype),
+            "overflow": self._overflow_signature(),
+            "quantization": self.cache_quantization or "none",
+            "context": hashlib.sha256(context.encode("utf-8")).hexdigest(),
+        }
+
+    def _overflow_signature(self) -> str:
+        """The overflow settings decide which tokens end up in the cache, so caches depend on them."""
+        if self.overflow == "sliding_window":
+            return f"sliding_window:{self.max_context_tokens}:{self.sink_tokens}"
+        return self.overflow
+
+    def cache_key(self, context: str) -> str:
+        """File-name friendly key for (model name, revision, tokenizer, context hash)."""
+        metadata = json.dumps(self.cache_metadata(context), sort_keys=True)
+        return hashlib.sha256(metadata.encode("utf-8")).hexdigest()
+
+    def preload_context(
+        self,
+        context: str,
+        cache_dir: Optional[Union[str, Path]] = None,
+        context_id: Optional[str] = None,
+    ) -> str:
         """
         Phase 1: "Remembering"
         Processes the context and stores its computed state in the KV cache.
         This is done only once and is the more expensive step.
+
+        The cache is added to the pool under `context_id` (the context hash by default),
+        becomes the active context, and the id is returned. Preloading a context that is
+        already in the pool only makes it active again.
+
+        If `cache_dir` is given, a cache previously saved there for the same model,
+        revision, tokenizer and context is loaded instead of recomputing it, and a
+        freshly computed cache is saved there for the next process start.
         """
         print(f"\n--- [Phase 1] Pre-loading context... ---")
+        metadata = self.cache_metadata(context)
+        context_id = context_id if context_id is not None else metadata["context"]
+
+        try:
+            cached = self.pool.get(context_id) if context_id in self.pool else None
+        except KeyError:  # its spill file is stale or gone, so the prefix is computed again
+            cached = None
+        if cached is not None and cached.metadata.get("context") == metadata["context"]:
+            self.active_context_id = context_id
+            print(f"Context '{context_id[:12]}' is already cached.")
+            return context_id
+
+        cache_path = None
+        if cache_dir is not None:
+            cache_path = Path(cache_dir) / f"{self.cache_key(context)}.safetensors"
+            if cache_path.exists():
+                return self.load_cache(cache_path, context=context, context_id=context_id)
+
         start_time = time.time()
 
-        inputs = self.tokenizer(context, return_tensors="pt").to(self.device)
-        
-        # Perform a single forward pass to generate and store the KV cache.
-        # The model internally calculates and returns the cache when `use_cache=True`.
-        with torch.no_grad():
-            outputs = self.model(**inputs, use_cache=True)
+        input_ids = self.tokenizer(context, return_tensors="pt").to(self.device).input_ids
+        num_tokens = input_ids.shape[1]
+        if self.overflow == "reject" and self.max_context_tokens and num_tokens > self.max_context_tokens:
+            raise ValueError(
+                f"Context has {num_tokens} tokens but at most {self.max_context_tokens} fit in the model "
+                "window (use overflow='sliding_window' to keep only its start and end)."
+            )
+
+        with measure_peak_memory(self.device) as memory:
+            cache = self._chunked_prefill(input_ids)
+        if self.cache_quantization is not None:
+            entry = QuantizedPrefix.quantize(cache, self.cache_quantization, metadata)
+        else:
+            entry = CachedPrefix(cache, cache.get_seq_length(), metadata)
         
-        self.kv_cache = outputs.past_key_values
+        self.pool.put(context_id, entry)
+        self.active_context_id = context_id
+        self.last_prefill_stats = {
+            "context_tokens": num_tokens,
+            "cached_tokens": entry.prefix_length,
+            "chunks": -(-num_tokens // self.prefill_chunk_size),
+            "cache_bytes": entry.nbytes,
+            "peak_bytes": memory["peak_bytes"],
+        }
         
         elapsed = (time.time() - start_time) * 1000
         print(f"Context ingested and cached in {elapsed:.2f}ms.")
+        dropped = num_tokens - entry.prefix_length
+        peak = memory["peak_bytes"]
+        print(f"{num_tokens} tokens in {self.last_prefill_stats['chunks']} chunk(s)"
+              + (f", {dropped} dropped by the sliding window" if dropped else "")
+              + f"; cache {entry.nbytes / 2**20:.1f}MiB"
+              + (f", peak memory +{peak / 2**20:.1f}MiB" if peak is not None else "") + ".")
+
+        if cache_path is not None:
+            self.save_cache(cache_path, context_id=context_id)
+        return context_id
+
+    def _chunked_prefill(self, input_ids: torch.Tensor):
+        """
+        Feeds the context to the model in slices of `prefill_chunk_size` tokens.
+
+        Each slice attends to the cache built so far, so the result matches a single
+        forward pass while only one slice's activations are alive at a time. With the
+        sliding window policy, the cache is trimmed to the attention sinks plus the most
+        recent tokens before a slice would overflow it. New tokens then get positions
+        right after the trimmed cache, so they stay inside the model window (the kept
+        tokens retain the positions they were computed with).
+        """
+        cache = DynamicCache()
+        for start in range(0, input_ids.shape[1], self.prefill_chunk_size):
+            chunk = input_ids[:, start:start + self.prefill_chunk_size]
+            if self.overflow == "sliding_window" and self.max_context_tokens:
+                cache = self._slide_window(cache, room_for=chunk.shape[1])
+            with torch.no_grad():
+                outputs = self.model(input_ids=chunk, past_key_values=cache, use_cache=True)
+            cache = outputs.past_key_values
+        return cache
+
+    def _slide_window(self, cache, room_for: int):
+        """Drops the oldest non-sink tokens so that `room_for` more tokens fit in the window."""
+        excess = cache.get_seq_length() + room_for - self.max_context_tokens
+        if excess <= 0:
+            return cache
+        sinks = self.sink_tokens
+        return build_cache([
+            (torch.cat([k[..., :sinks, :], k[..., sinks + excess:, :]], dim=-2),
+             torch.cat([v[..., :sinks, :], v[..., sinks + excess:, :]], dim=-2))
+            for k, v in cache_layers(cache)
+        ])
+
+    def save_cache(self, path: Union[str, Path], context_id: Optional[str] = None):
+        """
+        Serializes a preloaded KV cache (the active one by default) to a safetensors
+        file (one key and one value tensor per layer), tagged with the metadata it
+        was computed under.
+        """
+        if context_id is None and self.active_context_id is None:
+            raise ValueError("You must call `preload_context` before saving the cache.")
+
+        entry = self._prefix(context_id)
+        write_cache_file(path, entry.tensors(), entry.metadata)
+        print(f"KV cache saved to {path}.")
+
+    def load_cache(
+        self,
+        path: Union[str, Path],
+        context: Optional[str] = None,
+        context_id: Optional[str] = None,
+    ) -> str:
+        """
+        Loads a KV cache written by `save_cache`, skipping the prefill forward pass.
+
+        The cache must have been computed with the same model, revision, tokenizer
+        and dtype; if `context` is given, its hash must match as well. The cache is
+        added to the pool (under its context hash by default) and becomes active.
+        """
+        start_time = time.time()
+
+        tensors, metadata = read_cache_file(path, self.device)
+        expected = self.cache_metadata(context if context is not None else "")
+        for field, value in expected.items():
+            if field == "context" and context is None:
+                continue
+            if metadata.get(field) != value:
+                raise ValueError(
+                    f"Cache at {path} does not match this generator ({field}: "
+                    f"{metadata.get(field)!r} != {value!r})."
+                )
 
-    def ask(self, query: str, max_new_tokens: int = 50) -> str:
+        context_id = context_id if context_id is not None else metadata["context"]
+        self.pool.put(context_id, prefix_from_tensors(tensors, metadata))
+        self.active_context_id = context_id
+
+        elapsed = (time.time() - start_time) * 1000
+        print(f"KV cache loaded from {path} in {elapsed:.2f}ms.")
+        return context_id
+
+    def ask(self, query: str, max_new_tokens: int = 50, context_id: Optional[str] = None) -> str:
         """
         Phase 2: "Querying" using a manual generation loop.
         This is the fast, cheap step that reuses the cached context.
+
+        The query is answered on the `context_id` prefix (the active context by default).
         """
-        if self.kv_cache is None:
-            raise ValueError("You must call `preload_context` before asking a question.")
+        prefix = self._prefix(context_id)
 
         print(f"\n--- [Phase 2] Answering query: '{query}' ---")
         start_time = time.time()
@@ -74,39 +742,190 @@ class TrueCacheAugmentedGenerator:
         input_ids = self.tokenizer(query, return_tensors="pt").to(self.device).input_ids
         
         # Use the pre-computed cache from the context.
-        current_cache = self.kv_cache
+        current_cache = prefix.working_cache()
         generated_token_ids = []
 
         # 2. Manual auto-regressive generation loop
+        try:
+            for _ in range(max_new_tokens):
+                with torch.no_grad():
+                    # Forward pass: provide the current token(s) and the latest cache.
+                    outputs = self.model(
+                        input_ids=input_ids,
+                        past_key_values=current_cache,
+                        use_cache=True
+                    )
+
+                # 3. Get the predicted next token (greedy decoding)
+                next_token_logits = outputs.logits[:, -1, :]
+                next_token_id = torch.argmax(next_token_logits, dim=-1).unsqueeze(-1)
+
+                # 4. Store the generated token
+                generated_token_ids.append(next_token_id.item())
+
+                # 5. Stop if the End-Of-Sentence token is generated
+                if generated_token_ids[-1] == self.tokenizer.eos_token_id:
+                    break
+
+                # 6. Update the cache and prepare input for the next iteration
+                current_cache = outputs.past_key_values
+                input_ids = next_token_id # The next input is just the token we just generated
+        finally:
+            # 7. Crop the cache back to the context so every query starts from the same prefix
+            prefix.restore()
+
+        elapsed = (time.time() - start_time) * 1000
+        print(f"Query processed in {elapsed:.2f}ms via manual generation loop.")
+
+        # Decode the generated tokens into a string
+        return self.tokenizer.decode(generated_token_ids, skip_special_tokens=True)
+
+    def ask_batch(
+        self,
+        questions: List[str],
+        max_new_tokens: int = 50,
+        context_id: Optional[str] = None,
+    ) -> List[str]:
+        """
+        Phase 2 for several questions at once, decoded together on the shared prefix.
+
+        The context cache is broadcast across the batch, the questions are left-padded
+        (with attention masks and position ids that skip the padding), and rows that
+        reach EOS keep emitting padding until every row has finished.
+        """
+        prefix = self._prefix(context_id)
+        if not questions:
+            return []
+
+        print(f"\n--- [Phase 2] Answering {len(questions)} queries as a batch ---")
+        start_time = time.time()
+
+        # 1. Left-pad the questions so that the last column holds every row's latest token.
+        padding_side = self.tokenizer.padding_side
+        self.tokenizer.padding_side = "left"
+        try:
+            inputs = self.tokenizer(questions, return_tensors="pt", padding=True).to(self.device)
+        finally:
+            self.tokenizer.padding_side = padding_side
+        batch_size = inputs.input_ids.shape[0]
+
+        # 2. The prefix is fully visible to every row; padding is masked out, and positions
+        # continue from the prefix counting only real question tokens.
+        prefix_mask = inputs.attention_mask.new_ones((batch_size, prefix.prefix_length))
+        attention_mask = torch.cat([prefix_mask, inputs.attention_mask], dim=-1)
+        position_ids = (prefix.prefix_length + inputs.attention_mask.cumsum(-1) - 1).clamp(min=prefix.prefix_length)
+
+        # 3. Broadcast the context cache across the batch (expand is a view, no copy here).
+        current_cache = prefix.batch_cache(batch_size)
+
+        input_ids = inputs.input_ids
+        finished = torch.zeros(batch_size, dtype=torch.bool, device=self.device)
+        generated = []
+
+        # 4. Batched greedy decoding with per-row EOS tracking
         for _ in range(max_new_tokens):
             with torch.no_grad():
-                # Forward pass: provide the current token(s) and the latest cache.
                 outputs = self.model(
                     input_ids=input_ids,
+                    attention_mask=attention_mask,
+                    position_ids=position_ids,
                     past_key_values=current_cache,
-                    use_cache=True
+                    use_cache=True,
                 )
-            
-            # 3. Get the predicted next token (greedy decoding)
-            next_token_logits = outputs.logits[:, -1, :]
-            next_token_id = torch.argmax(next_token_logits, dim=-1).unsqueeze(-1)
-            
-            # 4. Store the generated token
-            generated_token_ids.append(next_token_id.item())
-
-            # 5. Stop if the End-Of-Sentence token is generated
-            if next_token_id.item() == self.tokenizer.eos_token_id:
+
+            next_tokens = torch.argmax(outputs.logits[:, -1, :], dim=-1)
+            next_tokens = torch.where(finished, self.tokenizer.pad_token_id, next_tokens)
+            generated.append(next_tokens)
+            finished |= next_tokens == self.tokenizer.eos_token_id
+
+            # A single device-to-host sync per step for the whole batch
+            if finished.all():
                 break
-            
-            # 6. Update the cache and prepare input for the next iteration
+
             current_cache = outputs.past_key_values
-            input_ids = next_token_id # The next input is just the token we just generated
+            input_ids = next_tokens.unsqueeze(-1)
+            position_ids = position_ids[:, -1:] + 1
+            attention_mask = torch.cat([attention_mask, prefix_mask[:, :1]], dim=-1)
+
+        # 5. Cut every row at its first EOS and decode
+        answers = []
+        for row in torch.stack(generated, dim=1).tolist():
+            if self.tokenizer.eos_token_id in row:
+                row = row[: row.index(self.tokenizer.eos_token_id) + 1]
+            answers.append(self.tokenizer.decode(row, skip_special_tokens=True))
 
         elapsed = (time.time() - start_time) * 1000
-        print(f"Query processed in {elapsed:.2f}ms via manual generation loop.")
+        print(f"{batch_size} queries processed in {elapsed:.2f}ms via batched generation loop.")
+        return answers
 
-        # Decode the generated tokens into a string
-        return self.tokenizer.decode(generated_token_ids, skip_special_tokens=True)
+    def stream(
+        self,
+        query: str,
+        max_new_tokens: int = 50,
+        temperature: float = 0.0,
+        top_k: int = 0,
+        top_p: float = 1.0,
+        repetition_penalty: float = 1.0,
+        stop: Sequence[str] = (),
+        seed: Optional[int] = None,
+        context_id: Optional[str] = None,
+    ) -> Iterator[str]:
+        """
+        Phase 2 as a generator that yields the answer text as it is produced.
+
+        Decoding is greedy unless `temperature > 0`, in which case tokens are sampled
+        (optionally restricted by `top_k`/`top_p`). Generation ends at EOS, after
+        `max_new_tokens`, or when any of the `stop` strings appears (the stop string
+        itself is not yielded). Per-token latencies are kept in `self.last_stream_stats`.
+        """
+        prefix = self._prefix(context_id)
+        stats = StreamStats()
+        self.last_stream_stats = stats
+        rng = torch.Generator(device=self.device).manual_seed(seed) if seed is not None else None
+
+        input_ids = self.tokenizer(query, return_tensors="pt").to(self.device).input_ids
+        seen_ids = input_ids[0].tolist()
+        generated_ids: List[int] = []
+        current_cache = prefix.working_cache()
+        emitted = 0  # characters of the decoded answer already yielded
+
+        try:
+            for _ in range(max_new_tokens):
+                with torch.no_grad():
+                    outputs = self.model(input_ids=input_ids, past_key_values=current_cache, use_cache=True)
+
+                logits = apply_repetition_penalty(outputs.logits[:, -1, :], seen_ids + generated_ids, repetition_penalty)
+                next_token_id = sample_next_token(logits, temperature, top_k, top_p, generator=rng).unsqueeze(-1)
+                token_id = next_token_id.item()
+                stats.record_token()
+                if token_id == self.tokenizer.eos_token_id:
+                    break
+                generated_ids.append(token_id)
+                current_cache = outputs.past_key_values
+                input_ids = next_token_id
+
+                # Re-decode the whole answer: a token can be a fragment of a multi-byte
+                # character, which decodes to U+FFFD until the rest of it arrives.
+                text = self.tokenizer.decode(generated_ids, skip_special_tokens=True)
+                stop_at = min((text.find(s) for s in stop if s in text), default=-1)
+                if stop_at >= 0:
+                    if stop_at > emitted:
+                        yield text[emitted:stop_at]
+                    return
+                if text.endswith("\ufffd"):
+                    continue
+                # Hold back a tail that could still turn into a stop string.
+                safe_end = len(text) - max((_stop_prefix_overlap(text, s) for s in stop), default=0)
+                if safe_end > emitted:
+                    yield text[emitted:safe_end]
+                    emitted = safe_end
+
+            text = self.tokenizer.decode(generated_ids, skip_special_tokens=True)
+            if len(text) > emitted:
+                yield text[emitted:]
+        finally:
+            # Also runs if the caller stops iterating early
+            prefix.restore()
 
 if __name__ == "__main__":
     generator = TrueCacheAugmentedGenerator(model_name="gpt2")
@@ -134,4 +953,12 @@ if __name__ == "__main__":
     new_question = "Which planet is the most massive in our solar system?"
     answer = generator.ask(new_question)
     print(f"  - User: {new_question}")
-    print(f"  - AI: {answer}\n")
\ No newline at end of file
+    print(f"  - AI: {answer}\n")
+
+    # Streaming the answer token by token, with sampling and a stop string
+    print("--- Streaming an answer ---")
+    print(f"  - User: {questions[0]}")
+    print("  - AI:", end="", flush=True)
+    for piece in generator.stream(questions[0], temperature=0.7, top_p=0.9, repetition_penalty=1.2, stop=["\n\n"], seed=42):
+        print(piece, end="", flush=True)
+    print(f"\n  ({generator.last_stream_stats})")
\ No newline at end of file
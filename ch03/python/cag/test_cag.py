@@ -0,0 +1,223 @@
+from contextlib import redirect_stdout
+from importlib import util
+from io import StringIO
+from pathlib import Path
+import statistics
+import tempfile
+import time
+import unittest
+
+from tokenizers import ByteLevelBPETokenizer
+from transformers import GPT2Config, GPT2LMHeadModel, PreTrainedTokenizerFast
+
+CONTEXT = (
+    "Jupiter is the largest planet in our solar system. Mitochondria are "
+    "membrane-bound cell organelles that generate chemical energy."
+)
+QUESTIONS = ["What is the function of mitochondria?", "How massive is Jupiter?"]
+
+
+def load_example_module():
+    path = Path(__file__).with_name("cag.py")
+    spec = util.spec_from_file_location("cag", path)
+    module = util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def save_tiny_model(directory):
+    """Saves a small random GPT-2 and a byte-level BPE tokenizer, so tests run offline."""
+    bpe = ByteLevelBPETokenizer()
+    bpe.train_from_iterator([CONTEXT, *QUESTIONS] * 20, vocab_size=300, special_tokens=["<|endoftext|>"])
+    tokenizer = PreTrainedTokenizerFast(tokenizer_object=bpe._tokenizer, eos_token="<|endoftext|>")
+    tokenizer.save_pretrained(directory)
+    config = GPT2Config(
+        vocab_size=len(tokenizer), n_positions=1024, n_embd=32, n_layer=2, n_head=2,
+        bos_token_id=tokenizer.eos_token_id, eos_token_id=tokenizer.eos_token_id,
+    )
+    GPT2LMHeadModel(config).save_pretrained(directory)
+
+
+class CacheAugmentedGeneratorTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.module = load_example_module()
+        cls.tmp = tempfile.TemporaryDirectory()
+        save_tiny_model(cls.tmp.name)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def setUp(self):
+        with redirect_stdout(StringIO()):
+            self.generator = self.module.TrueCacheAugmentedGenerator(model_name=self.tmp.name)
+            self.generator.preload_context(CONTEXT)
+
+    def ask(self, question, **kwargs):
+        with redirect_stdout(StringIO()):
+            return self.generator.ask(question, **kwargs)
+
+    def test_ask_leaves_context_prefix_untouched(self):
+        prefix_length = self.generator.prefix_length
+
+        first = self.ask(QUESTIONS[0], max_new_tokens=10)
+        self.ask(QUESTIONS[1], max_new_tokens=10)
+        again = self.ask(QUESTIONS[0], max_new_tokens=10)
+
+        self.assertEqual(self.generator.kv_cache.get_seq_length(), prefix_length)
+        self.assertEqual(first, again)
+
+    def test_ask_batch_matches_sequential_answers(self):
+        sequential = [self.ask(q, max_new_tokens=10) for q in QUESTIONS]
+
+        with redirect_stdout(StringIO()):
+            batched = self.generator.ask_batch(QUESTIONS, max_new_tokens=10)
+
+        self.assertEqual(batched, sequential)
+        self.assertEqual(self.generator.kv_cache.get_seq_length(), self.generator.prefix_length)
+
+    def test_stream_yields_the_same_text_as_ask(self):
+        expected = self.ask(QUESTIONS[0], max_new_tokens=20)
+
+        pieces = list(self.generator.stream(QUESTIONS[0], max_new_tokens=20))
+
+        self.assertEqual("".join(pieces), expected)
+        self.assertEqual(len(self.generator.last_stream_stats.token_latencies), 20)
+        self.assertEqual(self.generator.kv_cache.get_seq_length(), self.generator.prefix_length)
+
+    def test_stream_stops_before_stop_string(self):
+        options = dict(max_new_tokens=30, temperature=1.0, top_k=50, top_p=0.9, repetition_penalty=1.2, seed=7)
+        full = "".join(self.generator.stream(QUESTIONS[1], **options))
+        stop = full[5:8]
+
+        text = "".join(self.generator.stream(QUESTIONS[1], stop=[stop], **options))
+
+        self.assertEqual(text, full[:full.find(stop)])
+
+    def test_chunked_prefill_matches_single_pass(self):
+        expected = self.ask(QUESTIONS[0], max_new_tokens=10)
+
+        with redirect_stdout(StringIO()):
+            generator = self.module.TrueCacheAugmentedGenerator(model_name=self.tmp.name, prefill_chunk_size=5)
+            generator.preload_context(CONTEXT)
+            answer = generator.ask(QUESTIONS[0], max_new_tokens=10)
+
+        self.assertGreater(generator.last_prefill_stats["chunks"], 1)
+        self.assertEqual(generator.prefix_length, self.generator.prefix_length)
+        self.assertEqual(answer, expected)
+
+    def test_overflowing_context_is_rejected_or_windowed(self):
+        long_context = CONTEXT * 10
+        window = dict(model_name=self.tmp.name, prefill_chunk_size=16, reserve_tokens=1024 - 64)
+
+        with redirect_stdout(StringIO()):
+            rejecting = self.module.TrueCacheAugmentedGenerator(**window)
+            with self.assertRaises(ValueError):
+                rejecting.preload_context(long_context)
+
+            sliding = self.module.TrueCacheAugmentedGenerator(overflow="sliding_window", sink_tokens=4, **window)
+            sliding.preload_context(long_context)
+            sliding.ask(QUESTIONS[0], max_new_tokens=10)
+
+        self.assertEqual(sliding.prefix_length, 64)
+        self.assertEqual(sliding.kv_cache.get_seq_length(), 64)
+
+    def test_quantized_prefix_is_smaller_and_answers_alike(self):
+        expected = [self.ask(q, max_new_tokens=10) for q in QUESTIONS]
+
+        for quantization in ("fp16", "int8"):
+            with redirect_stdout(StringIO()):
+                generator = self.module.TrueCacheAugmentedGenerator(
+                    model_name=self.tmp.name, cache_quantization=quantization,
+                )
+                generator.preload_context(CONTEXT)
+                answers = [generator.ask(q, max_new_tokens=10) for q in QUESTIONS]
+                batched = generator.ask_batch(QUESTIONS, max_new_tokens=10)
+
+            self.assertLess(generator.last_prefill_stats["cache_bytes"], self.generator.last_prefill_stats["cache_bytes"])
+            self.assertEqual(answers, expected)
+            self.assertEqual(batched, expected)
+
+    def test_pool_routes_queries_and_spills_lru_contexts(self):
+        other_context = "Saturn has rings made of ice. " * 3
+        expected = self.ask(QUESTIONS[1], max_new_tokens=10)
+
+        with tempfile.TemporaryDirectory() as spill_dir, redirect_stdout(StringIO()):
+            generator = self.module.TrueCacheAugmentedGenerator(
+                model_name=self.tmp.name, cache_budget_mb=0.001, spill_dir=spill_dir,
+            )
+            first_id = generator.preload_context(CONTEXT)
+            second_id = generator.preload_context(other_context)
+
+            # The budget only fits one prefix, so the first one was spilled to disk.
+            self.assertEqual(generator.pool.resident_ids(), [second_id])
+            self.assertIn(first_id, generator.pool)
+
+            answer = generator.ask(QUESTIONS[1], max_new_tokens=10, context_id=first_id)
+
+            self.assertEqual(answer, expected)
+            self.assertEqual(generator.pool.resident_ids(), [first_id])
+            self.assertEqual(generator.active_context_id, second_id)
+
+    def test_reused_context_id_never_reloads_a_stale_spill(self):
+        other_context = "Saturn has rings made of ice. " * 3
+
+        with tempfile.TemporaryDirectory() as spill_dir, redirect_stdout(StringIO()):
+            generator = self.module.TrueCacheAugmentedGenerator(
+                model_name=self.tmp.name, cache_budget_mb=0.001, spill_dir=spill_dir,
+            )
+            generator.preload_context(CONTEXT, context_id="tenant")
+            generator.preload_context(other_context, context_id="other")  # spills "tenant" (v1)
+            generator.preload_context(other_context, context_id="tenant")  # v2 under the same id
+            v2 = generator.pool.get("tenant").metadata["context"]
+            generator.preload_context(CONTEXT, context_id="third")  # spills "tenant" (v2)
+
+            self.assertNotIn("tenant", generator.pool.resident_ids())
+            self.assertEqual(generator.pool.get("tenant").metadata["context"], v2)
+            self.assertEqual(generator.pool.get("tenant").metadata, generator.cache_metadata(other_context))
+
+    def test_lost_spill_file_is_recomputed_by_preload_context(self):
+        other_context = "Saturn has rings made of ice. " * 3
+
+        with tempfile.TemporaryDirectory() as spill_dir, redirect_stdout(StringIO()):
+            generator = self.module.TrueCacheAugmentedGenerator(
+                model_name=self.tmp.name, cache_budget_mb=0.001, spill_dir=spill_dir,
+            )
+            first_id = generator.preload_context(CONTEXT)
+            generator.preload_context(other_context)  # spills the first context
+            for path in Path(spill_dir).iterdir():
+                path.unlink()
+
+            self.assertEqual(generator.preload_context(CONTEXT), first_id)
+            self.assertEqual(generator.pool.get(first_id).metadata, generator.cache_metadata(CONTEXT))
+
+    def test_pools_sharing_a_spill_dir_keep_their_own_files(self):
+        other_context = "Saturn has rings made of ice. " * 3
+
+        with tempfile.TemporaryDirectory() as spill_dir, redirect_stdout(StringIO()):
+            generators = [self.module.TrueCacheAugmentedGenerator(
+                model_name=self.tmp.name, cache_budget_mb=0.001, spill_dir=spill_dir,
+            ) for _ in range(2)]
+            for generator, (first, second) in zip(generators, [(CONTEXT, other_context), (other_context, CONTEXT)]):
+                generator.preload_context(first, context_id="tenant")
+                generator.preload_context(second, context_id="other")  # spills "tenant"
+
+            self.assertEqual(len(list(Path(spill_dir).iterdir())), 2)
+            self.assertEqual(generators[0].pool.get("tenant").metadata, generators[0].cache_metadata(CONTEXT))
+            self.assertEqual(generators[1].pool.get("tenant").metadata, generators[1].cache_metadata(other_context))
+
+    def test_latency_is_flat_over_100_questions(self):
+        latencies = []
+        for i in range(100):
+            start = time.perf_counter()
+            self.ask(QUESTIONS[i % 2], max_new_tokens=10)
+            latencies.append(time.perf_counter() - start)
+
+        self.assertEqual(self.generator.kv_cache.get_seq_length(), self.generator.prefix_length)
+        first, last = statistics.median(latencies[:20]), statistics.median(latencies[-20:])
+        self.assertLess(last, first * 1.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -10,17 +10,27 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
+import argparse
 import os
+import time
+from typing import Any, Optional, Tuple
 from openai import OpenAI
 
+from manual_index import ManualIndex, compare_prompts
+from prompt_cache import CacheHitReport, prefix_hash
+
 # Setup OpenAI client
 client = OpenAI()
 
-def query_model(system_message: str,
-                user_message: str,
-                model: str = "gpt-4o-mini",
-                max_tokens: int = 1024) -> str:
-    """Send a system + user message pair to a model."""
+def query_model_with_usage(system_message: str,
+                           user_message: str,
+                           model: str = "gpt-4o-mini",
+                           max_tokens: int = 1024,
+                           prompt_cache_key: Optional[str] = None) -> Tuple[str, Any]:
+    """Send a system + user message pair to a model, returning the answer
+    and the token usage (including cached prompt tokens).
+    """
+    extra = {"prompt_cache_key": prompt_cache_key} if prompt_cache_key else {}
     response = client.chat.completions.create(
         model=model,
         messages=[
@@ -28,8 +38,16 @@ def query_model(system_message: str,
             {"role": "user", "content": user_message},
         ],
         max_tokens=max_tokens,
+        **extra,
     )
-    return response.choices[0].message.content
+    return response.choices[0].message.content, response.usage
+
+def query_model(system_message: str,
+                user_message: str,
+                model: str = "gpt-4o-mini",
+                max_tokens: int = 1024) -> str:
+    """Send a system + user message pair to a model."""
+    return query_model_with_usage(system_message, user_message, model, max_tokens)[0]
 
 manual_text = """# Contoso Barista Pro 3000 – Maintenance & Troubleshooting Guide
 
@@ -88,24 +106,86 @@ Explain your reasoning in clear, step-by-step language that a non-expert user ca
 When possible, refer to relevant sections of the manual by name or number.
 """
 
-def build_system_message_with_manual() -> str:
+# The manual is split into sections once; with a question, the system message includes
+# only the sections it needs, up to this many tokens. Set MANUAL_TOKEN_BUDGET=0 to always
+# include the full manual.
+MANUAL_TOKEN_BUDGET = int(os.environ.get("MANUAL_TOKEN_BUDGET", 400))
+manual_index = ManualIndex(manual_text)
+
+QUESTIONS = [
+    "The machine shows error code E17 after I finished descaling. What should I do?",
+    "How long should the machine warm up before brewing?",
+    "What does error code E12 mean?",
+    "How often should I clean the steam wand?",
+    "How do I descale the machine?",
+    "Is it safe to open the housing to fix a leak?",
+    "The display shows E32. Can I fix it myself?",
+    "What kind of water should I use?",
+]
+
+def build_system_message_with_manual(user_question: Optional[str] = None,
+                                     token_budget: Optional[int] = MANUAL_TOKEN_BUDGET) -> str:
     """Construct a system message that includes both role instructions
-    and the full reference manual.
+    and the reference manual: the sections relevant to `user_question`, or the
+    full manual if there is no question or `token_budget` is 0 or None.
     """
+    use_sections = user_question is not None and token_budget
+    manual = manual_index.pack(user_question, token_budget) if use_sections else manual_text
     system_message = f"""{base_instructions}
 
 ====================
 REFERENCE MANUAL
 ====================
-{manual_text}
+{manual}
 """
     return system_message
 
+# Prefix-cache layout: the system message holds everything static (instructions and the
+# full manual). It is built once, so it is byte-identical in every request and the
+# provider can reuse its cached prefill; only the user message varies.
+STATIC_SYSTEM_MESSAGE = build_system_message_with_manual()
+STATIC_PREFIX_HASH = prefix_hash(STATIC_SYSTEM_MESSAGE)
+
+def answer_questions(questions, layout: str) -> CacheHitReport:
+    """Answer questions with the given prompt layout, logging the cached tokens of every request."""
+    if layout == "prefix-cache":
+        report = CacheHitReport(STATIC_PREFIX_HASH, manual_index.count_tokens(STATIC_SYSTEM_MESSAGE))
+    else:
+        # The selected sections vary with the question, so only the instructions are a stable prefix
+        report = CacheHitReport(prefix_hash(base_instructions), manual_index.count_tokens(base_instructions))
+    for question in questions:
+        print(f"\nUser: {question}")
+        if layout == "prefix-cache":
+            system_message, cache_key = STATIC_SYSTEM_MESSAGE, STATIC_PREFIX_HASH
+        else:
+            system_message, cache_key = build_system_message_with_manual(question), None
+        start = time.perf_counter()
+        response, usage = query_model_with_usage(system_message, question, prompt_cache_key=cache_key)
+        report.record(question, usage, time.perf_counter() - start)
+        print(f"\nResponse:\n{response}")
+    report.print()
+    return report
+
 if __name__ == "__main__":
-    system_message = build_system_message_with_manual()
-    
+    parser = argparse.ArgumentParser(description="Context stuffing in the system prompt")
+    parser.add_argument("--report", action="store_true",
+                        help="Compare full and selective stuffing on a question set instead of answering")
+    parser.add_argument("--call-model", action="store_true", help="In the report, also measure model latency")
+    parser.add_argument("--layout", choices=["selective", "prefix-cache"], default="selective",
+                        help="selective: only the relevant manual sections; "
+                             "prefix-cache: full manual in a byte-stable system message that the provider can cache")
+    parser.add_argument("--session", action="store_true", help="Answer the whole question set, not just the example")
+    args = parser.parse_args()
+
+    if args.report:
+        compare_prompts(
+            QUESTIONS,
+            build_full=lambda q: (build_system_message_with_manual(), q),
+            build_selective=lambda q: (build_system_message_with_manual(q), q),
+            count_tokens=manual_index.count_tokens,
+            call_model=query_model if args.call_model else None,
+        )
+        raise SystemExit(0)
+
     example_question = "The machine shows error code E17 after I finished descaling. What should I do?"
-    print(f"User: {example_question}")
-    
-    response = query_model(system_message, example_question)
-    print(f"\nResponse:\n{response}")
+    answer_questions(QUESTIONS if args.session else [example_question], args.layout)
@@ -0,0 +1,68 @@
+"""
+(C) Copyright 2026 Boni Garcia (https://bonigarcia.github.io/)
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+ http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import hashlib
+from dataclasses import dataclass, field
+from typing import Any, List, Tuple
+
+
+def prefix_hash(prefix: str) -> str:
+    """Short hash of the static prompt prefix; it only changes if the prefix changes by a single byte."""
+    return hashlib.sha256(prefix.encode("utf-8")).hexdigest()[:16]
+
+
+def read_usage(usage: Any) -> Tuple[int, int]:
+    """
+    (input tokens, cached input tokens) from a Responses or Chat Completions usage object.
+
+    The Responses API reports `input_tokens_details.cached_tokens`, and Chat Completions
+    reports `prompt_tokens_details.cached_tokens`. Missing fields count as 0.
+    """
+    if usage is None:
+        return 0, 0
+    if getattr(usage, "input_tokens", None) is not None:
+        total, details = usage.input_tokens, getattr(usage, "input_tokens_details", None)
+    else:
+        total, details = getattr(usage, "prompt_tokens", 0) or 0, getattr(usage, "prompt_tokens_details", None)
+    return total, getattr(details, "cached_tokens", 0) or 0
+
+
+@dataclass
+class CacheHitReport:
+    """Collects the cached-token usage of every request in a run and prints a summary."""
+
+    prefix_hash: str
+    prefix_tokens: int
+    requests: List[Tuple[str, int, int, float]] = field(default_factory=list)
+
+    def record(self, label: str, usage: Any, latency: float):
+        input_tokens, cached = read_usage(usage)
+        self.requests.append((label, input_tokens, cached, latency))
+        print(f"[prompt cache] prefix={self.prefix_hash} input={input_tokens} cached={cached} "
+              f"({latency:.2f}s) {label}")
+
+    def print(self):
+        total = sum(r[1] for r in self.requests)
+        cached = sum(r[2] for r in self.requests)
+        hits = sum(1 for r in self.requests if r[2] > 0)
+        print("\n--- Prompt cache report ---")
+        print(f"Prefix hash:          {self.prefix_hash} ({self.prefix_tokens} tokens, estimated)")
+        print(f"Requests:             {len(self.requests)} ({hits} with cached tokens)")
+        print(f"Input tokens:         {total} ({cached} cached, {cached / total if total else 0:.0%})")
+        print(f"Uncached input:       {total - cached}")
+        if len(self.requests) > 1:
+            # If the prefix was cached after the first request, it is prefilled (and billed
+            # at the full rate) only once in the run.
+            later_misses = sum(1 for r in self.requests[1:] if r[2] == 0)
+            print(f"Prefix prefilled:     {1 + later_misses} of {len(self.requests)} requests")
+        if self.prefix_tokens < 1024:
+            print("Note: OpenAI caches prompts of 1,024 tokens or more, so a shorter prefix is never cached.")
@@ -0,0 +1,54 @@
+from contextlib import redirect_stdout
+from importlib import util
+from io import StringIO
+from pathlib import Path
+from types import SimpleNamespace
+import unittest
+
+
+def load_cache_module():
+    path = Path(__file__).with_name("prompt_cache.py")
+    spec = util.spec_from_file_location("prompt_cache", path)
+    module = util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def responses_usage(input_tokens, cached):
+    return SimpleNamespace(input_tokens=input_tokens, input_tokens_details=SimpleNamespace(cached_tokens=cached))
+
+
+class PromptCacheTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.module = load_cache_module()
+
+    def test_usage_is_read_from_both_apis(self):
+        chat_usage = SimpleNamespace(prompt_tokens=1500, prompt_tokens_details=SimpleNamespace(cached_tokens=1280))
+
+        self.assertEqual(self.module.read_usage(responses_usage(1500, 1024)), (1500, 1024))
+        self.assertEqual(self.module.read_usage(chat_usage), (1500, 1280))
+        self.assertEqual(self.module.read_usage(SimpleNamespace(prompt_tokens=10, prompt_tokens_details=None)), (10, 0))
+        self.assertEqual(self.module.read_usage(None), (0, 0))
+
+    def test_prefix_hash_changes_with_a_single_byte(self):
+        self.assertEqual(self.module.prefix_hash("manual"), self.module.prefix_hash("manual"))
+        self.assertNotEqual(self.module.prefix_hash("manual"), self.module.prefix_hash("manual "))
+
+    def test_report_shows_the_prefix_was_prefilled_once(self):
+        report = self.module.CacheHitReport("abc", prefix_tokens=1200)
+        output = StringIO()
+        with redirect_stdout(output):
+            report.record("q1", responses_usage(1300, 0), 1.0)
+            report.record("q2", responses_usage(1310, 1152), 0.4)
+            report.record("q3", responses_usage(1290, 1152), 0.4)
+            report.print()
+
+        self.assertIn("Requests:             3 (2 with cached tokens)", output.getvalue())
+        self.assertIn("Input tokens:         3900 (2304 cached, 59%)", output.getvalue())
+        self.assertIn("Prefix prefilled:     1 of 3 requests", output.getvalue())
+        self.assertNotIn("Note:", output.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -10,23 +10,40 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
+import argparse
 import os
+import time
+from typing import Any, Optional, Tuple
 from openai import OpenAI
 
+from manual_index import ManualIndex, compare_prompts
+from prompt_cache import CacheHitReport, prefix_hash
+
 # Setup OpenAI client
 client = OpenAI()
 
-def query_model(prompt: str,
-                model: str = "gpt-4o-mini",
-                max_output_tokens: int = 1024) -> str:
-    """Send a plain text prompt to an OpenAI model using the Responses API."""
+def query_model_with_usage(prompt: str,
+                           model: str = "gpt-4o-mini",
+                           max_output_tokens: int = 1024,
+                           prompt_cache_key: Optional[str] = None) -> Tuple[str, Any]:
+    """Send a plain text prompt to an OpenAI model using the Responses API,
+    returning the answer and the token usage (including cached input tokens).
+    """
+    extra = {"prompt_cache_key": prompt_cache_key} if prompt_cache_key else {}
     response = client.responses.create(
         model=model,
         input=prompt,
         max_output_tokens=max_output_tokens,
+        **extra,
     )
     # Following the notebook's structure for the response object
-    return response.output[0].content[0].text
+    return response.output[0].content[0].text, response.usage
+
+def query_model(prompt: str,
+                model: str = "gpt-4o-mini",
+                max_output_tokens: int = 1024) -> str:
+    """Send a plain text prompt to an OpenAI model using the Responses API."""
+    return query_model_with_usage(prompt, model, max_output_tokens)[0]
 
 manual_text = """# Contoso Barista Pro 3000 – Maintenance & Troubleshooting Guide
 
@@ -84,16 +101,34 @@ If the manual does not contain the answer, say that the information is not avail
 Explain your reasoning in clear, step-by-step language that a non-expert user can follow.
 """
 
-def build_context_augmented_prompt(user_question: str) -> str:
-    """Construct a single text prompt that includes instructions, the full manual,
+# The manual is split into sections once; each question gets only the sections it needs,
+# up to this many tokens. Set MANUAL_TOKEN_BUDGET=0 to always stuff the full manual.
+MANUAL_TOKEN_BUDGET = int(os.environ.get("MANUAL_TOKEN_BUDGET", 400))
+manual_index = ManualIndex(manual_text)
+
+QUESTIONS = [
+    "The machine shows error code E17 after I finished descaling. What should I do?",
+    "How long should the machine warm up before brewing?",
+    "What does error code E12 mean?",
+    "How often should I clean the steam wand?",
+    "How do I descale the machine?",
+    "Is it safe to open the housing to fix a leak?",
+    "The display shows E32. Can I fix it myself?",
+    "What kind of water should I use?",
+]
+
+def build_context_augmented_prompt(user_question: str, token_budget: Optional[int] = MANUAL_TOKEN_BUDGET) -> str:
+    """Construct a single text prompt that includes instructions, the manual sections
+    relevant to the question (or the full manual if `token_budget` is 0 or None),
     and the user question.
     """
+    manual = manual_index.pack(user_question, token_budget) if token_budget else manual_text
     prompt = f"""{base_instructions}
 
 ====================
 REFERENCE MANUAL
 ====================
-{manual_text}
+{manual}
 
 ====================
 USER QUESTION
@@ -104,10 +139,65 @@ When answering, cite the specific sections or steps from the manual that you are
 """
     return prompt
 
+# Prefix-cache layout: everything static (instructions, full manual, answer guidelines)
+# comes first and is built once, so it is byte-identical in every request and the
+# provider can reuse its cached prefill. Only the question varies, at the very end.
+STATIC_PREFIX = f"""{base_instructions}
+
+====================
+REFERENCE MANUAL
+====================
+{manual_text}
+
+When answering, cite the specific sections or steps from the manual that you are using.
+
+====================
+USER QUESTION
+====================
+"""
+STATIC_PREFIX_HASH = prefix_hash(STATIC_PREFIX)
+
+def build_prefix_cached_prompt(user_question: str) -> str:
+    """Construct a prompt whose static part is a byte-stable prefix, followed by the question."""
+    return STATIC_PREFIX + user_question + "\n"
+
+def answer_questions(questions, layout: str) -> CacheHitReport:
+    """Answer questions with the given prompt layout, logging the cached tokens of every request."""
+    if layout == "prefix-cache":
+        build, prefix, cache_key = build_prefix_cached_prompt, STATIC_PREFIX, STATIC_PREFIX_HASH
+    else:
+        # The selected sections vary with the question, so only the instructions are a stable prefix
+        build, prefix, cache_key = build_context_augmented_prompt, base_instructions, None
+    report = CacheHitReport(prefix_hash(prefix), manual_index.count_tokens(prefix))
+    for question in questions:
+        print(f"\nUser: {question}")
+        start = time.perf_counter()
+        response, usage = query_model_with_usage(build(question), prompt_cache_key=cache_key)
+        report.record(question, usage, time.perf_counter() - start)
+        print(f"\nResponse:\n{response}")
+    report.print()
+    return report
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Context stuffing in the user prompt")
+    parser.add_argument("--report", action="store_true",
+                        help="Compare full and selective stuffing on a question set instead of answering")
+    parser.add_argument("--call-model", action="store_true", help="In the report, also measure model latency")
+    parser.add_argument("--layout", choices=["selective", "prefix-cache"], default="selective",
+                        help="selective: only the relevant manual sections; "
+                             "prefix-cache: full manual in a byte-stable prefix that the provider can cache")
+    parser.add_argument("--session", action="store_true", help="Answer the whole question set, not just the example")
+    args = parser.parse_args()
+
+    if args.report:
+        compare_prompts(
+            QUESTIONS,
+            build_full=lambda q: build_context_augmented_prompt(q, token_budget=None),
+            build_selective=build_context_augmented_prompt,
+            count_tokens=manual_index.count_tokens,
+            call_model=query_model if args.call_model else None,
+        )
+        raise SystemExit(0)
+
     example_question = "The machine shows error code E17 after I finished descaling. What should I do?"
-    print(f"User: {example_question}")
-    
-    prompt = build_context_augmented_prompt(example_question)
-    response = query_model(prompt)
-    print(f"\nResponse:\n{response}")
+    answer_questions(QUESTIONS if args.session else [example_question], args.layout)
@@ -0,0 +1,209 @@
+"""
+(C) Copyright 2026 Boni Garcia (https://bonigarcia.github.io/)
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+ http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import math
+import re
+import statistics
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+HEADING = re.compile(r"^(#{1,6})\s+(.+?)\s*$", re.MULTILINE)
+SECTION_NUMBER = re.compile(r"^(\d+(?:\.\d+)*)\.?\s")
+SECTION_REFERENCE = re.compile(r"\bsections?\s+(\d+(?:\.\d+)*)", re.IGNORECASE)
+WORD = re.compile(r"[a-z0-9]+")
+STOP_WORDS = frozenset(
+    "a about after an and are as at be before by can do does for from how i if in is it its me my "
+    "of on or s should so that the then this to was what when where which who why will with you your".split()
+)
+
+
+def default_token_counter(model: str = "gpt-4o-mini") -> Callable[[str], int]:
+    """Counts tokens with tiktoken when it is available, or estimates ~4 characters per token."""
+    try:
+        import tiktoken
+
+        encoding = tiktoken.encoding_for_model(model)
+        return lambda text: len(encoding.encode(text))
+    except Exception:  # tiktoken is not installed, or its encoding cannot be downloaded
+        return lambda text: len(text) // 4 + 1
+
+
+# Suffixes stripped by `stem`, longest first
+SUFFIXES = ("ations", "ation", "ings", "ing", "ers", "edly", "ed", "er", "es", "ly", "s", "e")
+
+
+def stem(word: str) -> str:
+    """
+    Strips one common English suffix, so that e.g. "descale", "descaled" and "descaling"
+    match. It is much cruder than a real stemmer, but enough for matching a question
+    against the sections of a manual.
+    """
+    if word.endswith("ss") or word.isdigit():
+        return word
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    return [stem(word) for word in WORD.findall(text.lower()) if word not in STOP_WORDS]
+
+
+@dataclass
+class Section:
+    title: str
+    text: str  # the heading line plus the section body
+    number: Optional[str] = None  # "2" for "## 2. Descaling procedure"
+    references: List[str] = field(default_factory=list)  # numbers of the sections it mentions
+    tokens: int = 0
+
+
+def split_sections(markdown: str) -> List[Section]:
+    """Splits a Markdown document at its headings. Text before the first ## heading is the preamble."""
+    headings = [m for m in HEADING.finditer(markdown) if len(m.group(1)) > 1]
+    starts = [0] + [m.start() for m in headings] + [len(markdown)]
+    sections = []
+    for i, (start, end) in enumerate(zip(starts, starts[1:])):
+        text = markdown[start:end].strip()
+        if not text:
+            continue
+        title = headings[i - 1].group(2) if i > 0 else "Preamble"
+        number = SECTION_NUMBER.match(title)
+        sections.append(Section(
+            title=title, text=text, number=number.group(1) if number else None,
+            references=SECTION_REFERENCE.findall(text),
+        ))
+    return sections
+
+
+class ManualIndex:
+    """
+    Splits a Markdown manual into sections once, and picks the sections a question needs.
+
+    Sections are scored against the question with BM25. A section referenced by a relevant
+    section (e.g., "Section 2" inside section 5) inherits part of its score, so procedures
+    that a matching section depends on are included too. The best sections are then
+    packed into a token budget and returned in document order.
+    """
+
+    def __init__(
+        self,
+        markdown: str,
+        count_tokens: Optional[Callable[[str], int]] = None,
+        k1: float = 1.5,
+        b: float = 0.75,
+        reference_weight: float = 0.5,
+    ):
+        self.count_tokens = count_tokens or default_token_counter()
+        self.sections = split_sections(markdown)
+        self.k1, self.b, self.reference_weight = k1, b, reference_weight
+        self._terms = [Counter(tokenize(s.text)) for s in self.sections]
+        self._lengths = [sum(terms.values()) for terms in self._terms]
+        self._avg_length = sum(self._lengths) / max(1, len(self._lengths))
+        df = Counter(term for terms in self._terms for term in terms)
+        n = len(self.sections)
+        self._idf = {term: math.log(1 + (n - freq + 0.5) / (freq + 0.5)) for term, freq in df.items()}
+        by_number = {s.number: i for i, s in enumerate(self.sections) if s.number}
+        self._references = [[by_number[r] for r in s.references if r in by_number] for s in self.sections]
+        for section in self.sections:
+            section.tokens = self.count_tokens(section.text)
+
+    def bm25(self, question: str) -> List[float]:
+        query = set(tokenize(question))
+        scores = []
+        for terms, length in zip(self._terms, self._lengths):
+            score = 0.0
+            for term in query & terms.keys():
+                tf = terms[term]
+                norm = tf + self.k1 * (1 - self.b + self.b * length / self._avg_length)
+                score += self._idf[term] * tf * (self.k1 + 1) / norm
+            scores.append(score)
+        return scores
+
+    def scores(self, question: str) -> List[float]:
+        """BM25 score of each section plus a share of the score of the sections that reference it."""
+        direct = self.bm25(question)
+        scores = list(direct)
+        for i, referenced in enumerate(self._references):
+            for j in referenced:
+                if j != i:
+                    scores[j] += self.reference_weight * direct[i]
+        return scores
+
+    def select(self, question: str, token_budget: int) -> List[Tuple[Section, float]]:
+        """
+        The highest-scoring sections that fit in `token_budget` tokens, in document order.
+
+        If no section matches the question, the manual is packed from the top instead, so
+        the model still sees as much of it as the budget allows.
+        """
+        scores = self.scores(question)
+        if any(score > 0 for score in scores):
+            candidates = sorted((i for i, s in enumerate(scores) if s > 0), key=lambda i: -scores[i])
+        else:
+            candidates = list(range(len(self.sections)))
+        chosen, used = [], 0
+        for i in candidates:
+            if used + self.sections[i].tokens <= token_budget:
+                chosen.append(i)
+                used += self.sections[i].tokens
+        return [(self.sections[i], scores[i]) for i in sorted(chosen)]
+
+    def pack(self, question: str, token_budget: int) -> str:
+        """The selected sections as a Markdown excerpt of the manual."""
+        return "\n\n".join(section.text for section, _ in self.select(question, token_budget))
+
+
+def compare_prompts(
+    questions: List[str],
+    build_full: Callable[[str], Union[str, Tuple[str, ...]]],
+    build_selective: Callable[[str], Union[str, Tuple[str, ...]]],
+    count_tokens: Callable[[str], int],
+    call_model: Optional[Callable[..., str]] = None,
+) -> Dict[str, Dict[str, float]]:
+    """
+    Reports prompt tokens and latency of full vs. selective context stuffing over a question set.
+
+    The builders return the prompt, or a tuple of messages (e.g., system and user), which
+    is passed to `call_model` as separate arguments. Without `call_model`, latency is the
+    time to build the prompt. With it, each prompt is also sent to the model and the
+    end-to-end time is measured.
+    """
+    results = {}
+    for name, build in (("full", build_full), ("selective", build_selective)):
+        tokens, build_ms, call_s = [], [], []
+        for question in questions:
+            start = time.perf_counter()
+            prompt = build(question)
+            build_ms.append((time.perf_counter() - start) * 1000)
+            messages = prompt if isinstance(prompt, tuple) else (prompt,)
+            tokens.append(sum(count_tokens(message) for message in messages))
+            if call_model:
+                start = time.perf_counter()
+                call_model(*messages)
+                call_s.append(time.perf_counter() - start)
+        results[name] = {
+            "prompt_tokens": statistics.mean(tokens),
+            "build_ms": statistics.median(build_ms),
+            "model_s": statistics.median(call_s) if call_s else float("nan"),
+        }
+
+    full, selective = results["full"], results["selective"]
+    print(f"{'':<12}{'prompt tokens':>15}{'build (ms)':>12}{'model (s)':>11}")
+    for name, row in results.items():
+        print(f"{name:<12}{row['prompt_tokens']:>15.0f}{row['build_ms']:>12.2f}{row['model_s']:>11.2f}")
+    print(f"Selective stuffing uses {1 - selective['prompt_tokens'] / full['prompt_tokens']:.0%} "
+          f"fewer prompt tokens on {len(questions)} questions.")
+    return results
@@ -0,0 +1,105 @@
+from importlib import util
+from pathlib import Path
+import unittest
+
+MANUAL = """# Widget Guide
+
+Intro text about the widget.
+
+## 1. Setup
+
+Plug the widget in and press the power button.
+
+## 2. Calibration
+
+Hold the calibrate button for ten seconds until the light blinks green.
+
+## 3. Error codes
+
+- **W5**: Calibration failed. Repeat the procedure from Section 2.
+
+## 4. Cleaning
+
+Wipe the widget with a dry cloth every week.
+"""
+
+# Sections of the Barista manual of the example, where the words of a question about
+# descaling appear in several inflections
+BARISTA_MANUAL = """# Barista Pro 3000 Guide
+
+## 2. Descaling procedure
+
+1. Fill the water reservoir with a descaling solution.
+2. Let the machine rest for 10 minutes so the descaling solution can dissolve mineral deposits.
+3. Run two full tanks of fresh water through the system before brewing coffee again.
+
+## 4. Error codes
+
+- **E10**: Water reservoir is empty or not seated correctly.
+- **E17**: Descale cycle incomplete. The machine detected residual descaling solution or scale.
+
+## 5. Resolving error code E17
+
+1. Confirm that the descaling procedure from Section 2 was completed.
+2. If E17 still appears, contact customer support with the machine's serial number.
+"""
+
+
+def load_index_module():
+    path = Path(__file__).with_name("manual_index.py")
+    spec = util.spec_from_file_location("manual_index", path)
+    module = util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class ManualIndexTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.module = load_index_module()
+        cls.index = cls.module.ManualIndex(MANUAL, count_tokens=lambda text: len(text.split()))
+
+    def test_manual_is_split_by_headings(self):
+        sections = self.index.sections
+
+        self.assertEqual([s.title for s in sections],
+                         ["Preamble", "1. Setup", "2. Calibration", "3. Error codes", "4. Cleaning"])
+        self.assertEqual([s.number for s in sections], [None, "1", "2", "3", "4"])
+        self.assertEqual(sections[3].references, ["2"])
+        self.assertTrue(sections[2].text.startswith("## 2. Calibration\n"))
+
+    def test_referenced_sections_inherit_score(self):
+        direct = self.index.bm25("What does W5 mean?")
+        scores = self.index.scores("What does W5 mean?")
+
+        self.assertEqual(direct[2], 0)
+        self.assertGreater(scores[2], 0)
+        self.assertEqual(scores[3], direct[3])
+
+    def test_sections_are_packed_into_the_budget_in_document_order(self):
+        selected = self.index.select("The W5 error appears after calibration", token_budget=100)
+        small = self.index.select("The W5 error appears after calibration", token_budget=20)
+
+        self.assertEqual([s.number for s, _ in selected], ["2", "3"])
+        self.assertEqual(len(small), 1)
+        self.assertLessEqual(sum(s.tokens for s, _ in small), 20)
+
+    def test_unmatched_question_packs_the_manual_from_the_top(self):
+        selected = self.index.select("warranty period?", token_budget=25)
+
+        self.assertEqual([s.title for s, _ in selected], ["Preamble", "1. Setup"])
+
+    def test_inflected_words_match(self):
+        self.assertEqual(self.module.tokenize("descale descaled descaling"), ["descal"] * 3)
+        self.assertEqual(self.module.tokenize("machines process processes"), ["machin", "process", "process"])
+
+    def test_descaling_question_ranks_the_descaling_section_first(self):
+        index = self.module.ManualIndex(BARISTA_MANUAL, count_tokens=lambda text: len(text.split()))
+        scores = index.scores("How do I descale the machine?")
+
+        best = max(range(len(scores)), key=scores.__getitem__)
+        self.assertEqual(index.sections[best].title, "2. Descaling procedure")
+
+
+if __name__ == "__main__":
+    unittest.main()
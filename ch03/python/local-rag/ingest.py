@@ -0,0 +1,271 @@
+"""
+(C) Copyright 2026 Boni Garcia (https://bonigarcia.github.io/)
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+ http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import hashlib
+import io
+import json
+import os
+import time
+import uuid
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from agno.knowledge.embedder.ollama import OllamaEmbedder
+from agno.vectordb.search import SearchType
+from qdrant_client import models
+
+SOURCE_KEY = "meta_data.source"
+HASH_KEY = "content_hash"
+ROOT_KEY = "ingest_root"
+
+
+def file_digest(path: Path, block_size: int = 1 << 20) -> str:
+    """SHA-256 of the file content, read in blocks so large files are not loaded at once."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def split_text(text: str, chunk_size: int = 2000, overlap: int = 200) -> List[str]:
+    """Splits text at word boundaries into chunks of up to `chunk_size` characters that overlap by up to `overlap`."""
+    words = text.split()
+    chunks, start = [], 0
+    while start < len(words):
+        end, length = start + 1, len(words[start])
+        while end < len(words) and length + 1 + len(words[end]) <= chunk_size:
+            length += 1 + len(words[end])
+            end += 1
+        chunks.append(" ".join(words[start:end]))
+        if end == len(words):
+            break
+        next_start, shared = end, 0
+        while next_start - 1 > start and shared + len(words[next_start - 1]) + 1 <= overlap:
+            next_start -= 1
+            shared += len(words[next_start]) + 1
+        start = next_start
+    return chunks
+
+
+def parse_document(path: Path, chunk_size: int = 2000, overlap: int = 200) -> Tuple[str, List[Dict]]:
+    """
+    The content hash and the text chunks of a PDF (one set of chunks per page) or text file.
+
+    The file is read once, and the hash is computed from the same bytes that are parsed, so
+    it matches the content that was indexed even if the file changes meanwhile.
+    """
+    data = Path(path).read_bytes()
+    digest = hashlib.sha256(data).hexdigest()
+    if Path(path).suffix.lower() == ".pdf":
+        from pypdf import PdfReader
+
+        pages = [page.extract_text() or "" for page in PdfReader(io.BytesIO(data)).pages]
+    else:
+        pages = [data.decode("utf-8", errors="replace")]
+    chunks = [
+        {"page": number, "text": text}
+        for number, page in enumerate(pages, start=1)
+        for text in split_text(page, chunk_size, overlap)
+    ]
+    return digest, chunks
+
+
+def _parse_worker(job: Tuple[str, str, int, int]) -> Tuple[str, str, List[Dict]]:
+    path, source, chunk_size, overlap = job
+    digest, chunks = parse_document(Path(path), chunk_size, overlap)
+    return source, digest, chunks
+
+
+def batch_embedder(embedder) -> Callable[[List[str]], List[List[float]]]:
+    """
+    A function that embeds a list of texts.
+
+    `OllamaEmbedder` sends one request per text, but Ollama's embed endpoint accepts a list
+    of inputs, so for Ollama a whole batch is sent in a single request. Other embedders
+    fall back to one call per text.
+    """
+    if not isinstance(embedder, OllamaEmbedder):
+        return lambda texts: [embedder.get_embedding(text) for text in texts]
+
+    def embed(texts: List[str]) -> List[List[float]]:
+        kwargs = {}
+        if embedder.options is not None:
+            kwargs["options"] = embedder.options
+        if embedder.dimensions is not None:
+            kwargs["dimensions"] = embedder.dimensions
+        return list(embedder.client.embed(input=texts, model=embedder.id, **kwargs)["embeddings"])
+
+    return embed
+
+
+def point_id(source: str, digest: str, index: int) -> str:
+    """Deterministic point id, so re-ingesting the same file version overwrites its points."""
+    return str(uuid.UUID(hashlib.md5(f"{source}\n{digest}\n{index}".encode("utf-8")).hexdigest()))
+
+
+def source_filter(root: str, source: Optional[str] = None, digest: Optional[str] = None,
+                  same_digest: bool = True) -> models.Filter:
+    """
+    Points ingested from the folder `root`: all of them, or those of `source`, optionally
+    only with (or without) the given content hash.
+    """
+    must = [models.FieldCondition(key=ROOT_KEY, match=models.MatchValue(value=root))]
+    if source is not None:
+        must.append(models.FieldCondition(key=SOURCE_KEY, match=models.MatchValue(value=source)))
+    if digest is None:
+        return models.Filter(must=must)
+    condition = models.FieldCondition(key=HASH_KEY, match=models.MatchValue(value=digest))
+    return models.Filter(must=must + [condition]) if same_digest else models.Filter(must=must, must_not=[condition])
+
+
+def is_indexed(client, collection: str, root: str, source: str, digest: str) -> bool:
+    """True if every chunk of this version of `source`, and nothing else of it, is in the collection."""
+    points, _ = client.scroll(collection, scroll_filter=source_filter(root, source, digest), limit=1,
+                              with_payload=["meta_data"], with_vectors=False)
+    if not points:
+        return False
+    expected = points[0].payload["meta_data"]["chunks"]
+    return client.count(collection, count_filter=source_filter(root, source), exact=True).count == expected
+
+
+def load_manifest(path: Optional[str]) -> Dict[str, Dict[str, str]]:
+    if not path:
+        return {}
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(path: Optional[str], manifest: Dict[str, Dict[str, str]]):
+    if not path:
+        return
+    tmp = Path(f"{path}.tmp")
+    tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def ingest_folder(
+    folder: str,
+    vector_db,
+    embed_batch: Optional[Callable[[List[str]], List[List[float]]]] = None,
+    patterns: Sequence[str] = ("*.pdf",),
+    processes: Optional[int] = None,
+    chunk_size: int = 2000,
+    overlap: int = 200,
+    embed_batch_size: int = 64,
+    upsert_batch_size: int = 256,
+    prune: bool = False,
+    manifest_path: Optional[str] = ".ingest_manifest.json",
+) -> Dict[str, float]:
+    """
+    Ingests every file in `folder` (recursively) matching `patterns` into an agno Qdrant vector DB.
+
+    Files are fingerprinted by the SHA-256 of their content, which is stored with every
+    point, together with the folder they were ingested from. A file whose current version
+    is already fully indexed is skipped, so only new and changed files are processed. Files
+    without any text produce no points, so their hashes are recorded in a JSON manifest
+    (`manifest_path`) instead. The files to process are parsed in a pool of `processes`
+    worker processes, their chunks are embedded `embed_batch_size` texts per request, and
+    the points are upserted `upsert_batch_size` at a time. The points of the previous
+    version of a changed file are deleted once the new version is stored. With `prune`,
+    the points of files no longer in the folder are deleted too; only points ingested from
+    this same folder are pruned, so several folders can share a collection.
+
+    The points have the payload layout of agno's `Qdrant.insert`, so the agent searches
+    them as usual. Only vector search (the default `search_type`) is supported.
+    """
+    if vector_db.search_type != SearchType.vector:
+        raise ValueError("Folder ingestion supports only vector search")
+    start = time.perf_counter()
+    embed_batch = embed_batch or batch_embedder(vector_db.embedder)
+    client, collection = vector_db.client, vector_db.collection
+    vector_db.create()
+    for key in (SOURCE_KEY, HASH_KEY, ROOT_KEY):
+        client.create_payload_index(collection, field_name=key, field_schema=models.PayloadSchemaType.KEYWORD)
+
+    root = Path(folder)
+    root_id = str(root.resolve())
+    manifest = load_manifest(manifest_path)
+    empty = manifest.setdefault(root_id, {})  # source -> hash of the files that have no chunks
+    files = sorted({path for pattern in patterns for path in root.rglob(pattern) if path.is_file()})
+    sources = {path.relative_to(root).as_posix(): path for path in files}
+    changed = []
+    for source, path in sources.items():
+        digest = file_digest(path)
+        if empty.get(source) != digest and not is_indexed(client, collection, root_id, source, digest):
+            changed.append(source)
+    stats = {"files": len(files), "unchanged": len(files) - len(changed), "ingested": 0, "removed": 0,
+             "chunks": 0, "embed_requests": 0}
+
+    pending: List[Tuple[str, str, int, int, Dict]] = []
+
+    def flush():
+        points = []
+        for i in range(0, len(pending), embed_batch_size):
+            batch = pending[i:i + embed_batch_size]
+            vectors = embed_batch([chunk["text"] for *_, chunk in batch])
+            stats["embed_requests"] += 1
+            if len(vectors) != len(batch):
+                raise RuntimeError(f"Expected {len(batch)} embeddings, got {len(vectors)}")
+            points.extend(
+                models.PointStruct(id=point_id(source, digest, index), vector=vector, payload={
+                    "name": Path(source).stem,
+                    "meta_data": {"source": source, "page": chunk["page"], "chunk": index, "chunks": total},
+                    "content": chunk["text"].replace("\x00", "\ufffd"),
+                    "usage": None,
+                    "content_id": None,
+                    HASH_KEY: digest,
+                    ROOT_KEY: root_id,
+                })
+                for (source, digest, index, total, chunk), vector in zip(batch, vectors)
+            )
+        if points:
+            client.upsert(collection, points=points, wait=True)
+        pending.clear()
+
+    ingested = []
+    jobs = [(str(sources[source]), source, chunk_size, overlap) for source in changed]
+    if jobs:
+        with Pool(processes=max(1, min(processes or os.cpu_count() or 1, len(jobs)))) as pool:
+            for source, digest, chunks in pool.imap_unordered(_parse_worker, jobs):
+                pending.extend((source, digest, index, len(chunks), chunk) for index, chunk in enumerate(chunks))
+                ingested.append((source, digest))
+                if chunks:
+                    empty.pop(source, None)
+                else:
+                    empty[source] = digest
+                stats["chunks"] += len(chunks)
+                if len(pending) >= upsert_batch_size:
+                    flush()
+        flush()
+
+    # Old versions are deleted only now, so a file stays searchable while it is re-indexed
+    for source, digest in ingested:
+        client.delete(collection, points_selector=source_filter(root_id, source, digest, same_digest=False), wait=True)
+    stats["ingested"] = len(ingested)
+
+    if prune:
+        indexed = client.facet(collection, key=SOURCE_KEY, facet_filter=source_filter(root_id),
+                               limit=max(1000, 2 * len(files))).hits
+        for hit in indexed:
+            if hit.value not in sources:
+                client.delete(collection, points_selector=source_filter(root_id, hit.value), wait=True)
+                stats["removed"] += 1
+        for source in [source for source in empty if source not in sources]:
+            del empty[source]
+    save_manifest(manifest_path, manifest)
+
+    stats["seconds"] = time.perf_counter() - start
+    return stats
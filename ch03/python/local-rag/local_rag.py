@@ -10,6 +10,7 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
+import argparse
 import asyncio
 from agno.agent import Agent
 from agno.models.ollama import Ollama
@@ -17,6 +18,7 @@ from agno.knowledge.knowledge import Knowledge
 from agno.vectordb.qdrant import Qdrant
 from agno.knowledge.embedder.ollama import OllamaEmbedder
 from agno.os import AgentOS
+from ingest import ingest_folder
 
 # Knowledge base
 vector_db = Qdrant(
@@ -48,9 +50,30 @@ async def init_knowledge():
     )
 
 
+def ingest_documents(folder: str, processes: int = None, prune: bool = False):
+    """Ingest a folder of PDF documents, re-processing only new and changed files"""
+    stats = ingest_folder(folder, vector_db, processes=processes, prune=prune)
+    print(f"Ingested {stats['ingested']} of {stats['files']} files ({stats['unchanged']} unchanged, "
+          f"{stats['removed']} removed): {stats['chunks']} chunks in {stats['embed_requests']} embedding "
+          f"requests, {stats['seconds']:.1f}s")
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local RAG with Ollama, Qdrant, and Agno")
+    parser.add_argument("--docs", help="Folder of PDF documents to ingest (instead of the WebDriverManager manual)")
+    parser.add_argument("--processes", type=int, help="Worker processes for parsing PDFs (default: CPU count)")
+    parser.add_argument("--prune", action="store_true",
+                        help="Delete the indexed documents of files no longer in the --docs folder")
+    parser.add_argument("--ingest-only", action="store_true", help="Exit after ingesting, without starting the server")
+    args = parser.parse_args()
+
     # Ingest external knowledge before starting the server
-    asyncio.run(init_knowledge())
+    if args.docs:
+        ingest_documents(args.docs, args.processes, args.prune)
+    else:
+        asyncio.run(init_knowledge())
+    if args.ingest_only:
+        raise SystemExit(0)
 
     # Start the AgentOS app
     agent_os.serve(app="local_rag:app", reload=True)
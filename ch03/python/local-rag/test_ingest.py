@@ -0,0 +1,158 @@
+from dataclasses import dataclass
+from importlib import util
+from pathlib import Path
+from typing import List
+import hashlib
+import sys
+import tempfile
+import unittest
+
+from agno.knowledge.embedder.base import Embedder
+from agno.vectordb.qdrant import Qdrant
+
+
+def load_ingest_module():
+    path = Path(__file__).with_name("ingest.py")
+    spec = util.spec_from_file_location("ingest", path)
+    module = util.module_from_spec(spec)
+    sys.modules["ingest"] = module  # worker processes look the parse function up by module name
+    spec.loader.exec_module(module)
+    return module
+
+
+def write_pdf(path: Path, pages: List[str]):
+    """Writes a minimal PDF with one line of text per page."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out, offsets = "%PDF-1.4\n", []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n"
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n"
+    path.write_bytes(out.encode("latin-1"))
+
+
+def stub_vector(text: str, dimensions: int = 16) -> List[float]:
+    vector = [0.0] * dimensions
+    for word in text.lower().split():
+        vector[hashlib.md5(word.encode()).digest()[0] % dimensions] += 1.0
+    return vector
+
+
+@dataclass
+class StubEmbedder(Embedder):
+    dimensions: int = 16
+
+    def get_embedding(self, text: str) -> List[float]:
+        return stub_vector(text, self.dimensions)
+
+
+class IngestTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.module = load_ingest_module()
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.docs = Path(self.tmp.name) / "docs"
+        self.docs.mkdir()
+        self.manifest = str(Path(self.tmp.name) / "manifest.json")
+        self.vector_db = Qdrant(collection="docs", location=":memory:", embedder=StubEmbedder())
+        self.batches = []
+
+    def embed_batch(self, texts):
+        self.batches.append(len(texts))
+        return [stub_vector(text) for text in texts]
+
+    def ingest(self, folder=None, **kwargs):
+        return self.module.ingest_folder(str(folder or self.docs), self.vector_db, embed_batch=self.embed_batch,
+                                         processes=2, manifest_path=self.manifest, **kwargs)
+
+    def test_split_text_respects_size_and_overlap(self):
+        text = " ".join(f"word{i}" for i in range(200))
+        chunks = self.module.split_text(text, chunk_size=100, overlap=20)
+
+        self.assertTrue(all(len(chunk) <= 100 for chunk in chunks))
+        self.assertEqual(chunks[0].split()[0], "word0")
+        self.assertEqual(chunks[-1].split()[-1], "word199")
+        self.assertIn(chunks[0].split()[-1], chunks[1].split()[:4])
+
+    def test_pdfs_are_parsed_embedded_in_batches_and_searchable(self):
+        write_pdf(self.docs / "espresso.pdf", ["Descale the espresso machine monthly", "Error E17 means rinse again"])
+        (self.docs / "guides").mkdir()
+        write_pdf(self.docs / "guides" / "grinder.pdf", ["Clean the burr grinder weekly"])
+
+        stats = self.ingest(embed_batch_size=2)
+
+        self.assertEqual((stats["files"], stats["ingested"], stats["chunks"]), (2, 2, 3))
+        self.assertEqual(sorted(self.batches), [1, 2])
+        results = self.vector_db.search("burr grinder weekly", limit=1)
+        self.assertEqual(results[0].content, "Clean the burr grinder weekly")
+        self.assertEqual(results[0].meta_data["source"], "guides/grinder.pdf")
+
+    def test_only_changed_files_are_reprocessed(self):
+        write_pdf(self.docs / "a.pdf", ["Version one of document A"])
+        write_pdf(self.docs / "b.pdf", ["Document B"])
+        self.ingest()
+        self.batches.clear()
+
+        stats = self.ingest()
+        self.assertEqual((stats["unchanged"], stats["ingested"], self.batches), (2, 0, []))
+
+        write_pdf(self.docs / "a.pdf", ["Version two of document A", "with a second page"])
+        stats = self.ingest()
+
+        self.assertEqual((stats["unchanged"], stats["ingested"], stats["chunks"]), (1, 1, 2))
+        contents = sorted(point.payload["content"] for point in self.vector_db.client.scroll("docs", limit=10)[0])
+        self.assertEqual(contents, ["Document B", "Version two of document A", "with a second page"])
+
+    def test_removed_files_are_pruned(self):
+        write_pdf(self.docs / "a.pdf", ["Document A"])
+        write_pdf(self.docs / "b.pdf", ["Document B"])
+        self.ingest()
+
+        (self.docs / "b.pdf").unlink()
+        self.assertEqual(self.ingest()["removed"], 0)  # pruning is opt-in
+        stats = self.ingest(prune=True)
+
+        self.assertEqual(stats["removed"], 1)
+        self.assertEqual(self.vector_db.client.count("docs").count, 1)
+
+    def test_pruning_keeps_the_points_of_other_folders(self):
+        write_pdf(self.docs / "a.pdf", ["Document A"])
+        other = Path(self.tmp.name) / "other"
+        other.mkdir()
+        write_pdf(other / "a.pdf", ["Another document A"])
+        write_pdf(other / "b.pdf", ["Document B"])
+        self.ingest()
+        self.ingest(other)
+
+        stats = self.ingest(prune=True)
+
+        self.assertEqual((stats["unchanged"], stats["removed"]), (1, 0))
+        self.assertEqual(self.vector_db.client.count("docs").count, 3)
+
+    def test_files_without_text_are_not_reprocessed(self):
+        write_pdf(self.docs / "blank.pdf", [""])
+        write_pdf(self.docs / "a.pdf", ["Document A"])
+        self.ingest()
+
+        stats = self.ingest()
+
+        self.assertEqual((stats["unchanged"], stats["ingested"]), (2, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,208 @@
+"""
+(C) Copyright 2026 Boni Garcia (https://bonigarcia.github.io/)
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+ http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from importlib import util
+from pathlib import Path
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+
+from tfidf_index import TfidfIndex
+
+
+def synthetic_chunks(n_chunks: int, words_per_chunk: int = 40, vocab_size: int = 50_000, seed: int = 0):
+    """Chunks of random words with a Zipf-like frequency, so the matrix is as sparse as real text."""
+    rng = np.random.default_rng(seed)
+    vocab = np.array([f"term{i}" for i in range(vocab_size)])
+    ranks = np.minimum(rng.zipf(1.2, size=(n_chunks, words_per_chunk)), vocab_size) - 1
+    return [{"chunk_id": f"synthetic#chunk{i}", "text": " ".join(vocab[row])} for i, row in enumerate(ranks)]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def query_latency(search, queries, runs):
+    latencies = []
+    for _ in range(runs):
+        for query in queries:
+            start = time.perf_counter()
+            search(query)
+            latencies.append(time.perf_counter() - start)
+    return statistics.median(latencies) * 1000
+
+
+QUESTIONS = [
+    "Why is chunking useful in RAG?",
+    "What does a retriever do?",
+    "How does cosine similarity compare queries and chunks?",
+    "Why should answers include citations?",
+    "What do overlapping chunks preserve?",
+    "How does RAG reduce hallucinations?",
+    "What is Retrieval-Augmented Generation?",
+    "Why keep prompts short and focused?",
+]
+
+
+def load_example_module():
+    path = Path(__file__).with_name("rag-hugging-face.py")
+    spec = util.spec_from_file_location("rag_hugging_face", path)
+    module = util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# Runs in a fresh interpreter, so modules imported by earlier runs do not hide the cost
+# Runs with "python -c", so the example's folder (for tfidf_index) is not on sys.path by default
+IMPORT_PROBE = """
+import sys, time
+from importlib import util
+sys.path.insert(0, {folder!r})
+start = time.perf_counter()
+spec = util.spec_from_file_location("rag_hugging_face", {path!r})
+rag = util.module_from_spec(spec)
+spec.loader.exec_module(rag)
+imported = time.perf_counter()
+{call}
+done = time.perf_counter()
+print(imported - start, done - imported, "torch" in sys.modules, "transformers" in sys.modules)
+"""
+
+
+def benchmark_index(args):
+    chunks = synthetic_chunks(args.chunks + args.added)
+    base, extra = chunks[:args.chunks], chunks[args.chunks:]
+    queries = [c["text"].split()[5] + " " + c["text"].split()[20] for c in chunks[::len(chunks) // args.queries]]
+    print(f"Corpus: {args.chunks} chunks (+{args.added} added later), {args.queries} queries, k={args.k}\n")
+
+    # Baseline: what the example did before, refit on every run and dense cosine + full argsort
+    corpus = [c["text"] for c in base]
+    vectorizer = TfidfVectorizer(stop_words="english")
+    matrix, fit_time = timed(lambda: vectorizer.fit_transform(corpus))
+    _, refit_time = timed(lambda: TfidfVectorizer(stop_words="english").fit_transform(corpus + [c["text"] for c in extra]))
+
+    def baseline_search(query):
+        sims = cosine_similarity(vectorizer.transform([query]), matrix)[0]
+        return np.argsort(-sims)[:args.k]
+
+    baseline_query = query_latency(baseline_search, queries, args.runs)
+
+    # Persistent index: build once, then load from disk and add incrementally
+    index = TfidfIndex(stop_words="english")
+    _, build_time = timed(lambda: index.add(base))
+    with tempfile.TemporaryDirectory() as directory:
+        _, save_time = timed(lambda: index.save(directory))
+        loaded, load_time = timed(lambda: TfidfIndex.load(directory))
+    _, add_time = timed(lambda: loaded.add(extra))
+    _, reweight_time = timed(lambda: loaded.search(queries[0], k=args.k))
+    index_query = query_latency(lambda q: loaded.search(q, k=args.k), queries, args.runs)
+
+    for query in queries:
+        expected = np.sort(cosine_similarity(vectorizer.transform([query]), matrix)[0])[::-1][:args.k]
+        found = [c["score"] for c in index.search(query, k=args.k)]
+        if not np.allclose(expected, found, atol=1e-5):
+            print(f"Warning: scores differ from TfidfVectorizer for query '{query}'")
+
+    print(f"{'step':<36}{'TfidfVectorizer':>16}{'TfidfIndex':>14}")
+    print(f"{'build (cold start)':<36}{fit_time:>15.2f}s{build_time:>13.2f}s")
+    print(f"{'save':<36}{'-':>16}{save_time:>13.2f}s")
+    print(f"{'load (warm start)':<36}{'-':>16}{load_time:>13.2f}s")
+    print(f"{f'add {args.added} chunks':<36}{refit_time:>15.2f}s{add_time:>13.2f}s")
+    print(f"{'first query after add (reweight)':<36}{'-':>16}{reweight_time:>13.2f}s")
+    print(f"{'query latency (median)':<36}{baseline_query:>14.1f}ms{index_query:>12.1f}ms")
+
+
+def benchmark_generation(args):
+    rag = load_example_module()
+    questions = (QUESTIONS * (args.questions // len(QUESTIONS) + 1))[:args.questions]
+    print(f"Model: {rag.GENERATION_MODEL}, {len(questions)} questions, batch size {args.batch_size}\n")
+
+    rag.rag_answer_batch(questions[:2], max_new_tokens=args.max_new_tokens)  # warmup
+    sequential, sequential_time = timed(
+        lambda: [rag.rag_answer(q, max_new_tokens=args.max_new_tokens) for q in questions]
+    )
+    batched, batched_time = timed(
+        lambda: rag.rag_answer_batch(questions, batch_size=args.batch_size, max_new_tokens=args.max_new_tokens)
+    )
+
+    same = sum(s["answer"] == b["answer"] for s, b in zip(sequential, batched))
+    print(f"{'sequential (rag_answer)':<28}{len(questions) / sequential_time * 60:>10.1f} questions/min")
+    print(f"{'batched (rag_answer_batch)':<28}{len(questions) / batched_time * 60:>10.1f} questions/min")
+    print(f"Speedup: {sequential_time / batched_time:.2f}x, identical answers: {same}/{len(questions)}")
+
+
+def benchmark_imports(args):
+    path = str(Path(__file__).with_name("rag-hugging-face.py"))
+    scenarios = [
+        ("import only", "pass"),
+        ("simple_word_chunk", "rag.simple_word_chunk(rag.DOCUMENTS[0]['text'])"),
+        ("retrieve", "rag.retrieve('Why is chunking useful in RAG?')"),
+        ("rag_answer", "rag.rag_answer('Why is chunking useful in RAG?', max_new_tokens=20)"),
+    ]
+    print(f"{'use':<20}{'import':>10}{'first call':>12}{'torch':>8}{'transformers':>14}")
+    retrieval_loaded_torch = False
+    for name, call in scenarios:
+        runs = []
+        for _ in range(args.runs):
+            output = subprocess.run(
+                [sys.executable, "-c", IMPORT_PROBE.format(folder=str(Path(path).parent), path=path, call=call)],
+                capture_output=True, text=True, check=True,
+            ).stdout.split()[-4:]
+            runs.append(output)
+        import_time = statistics.median(float(run[0]) for run in runs)
+        call_time = statistics.median(float(run[1]) for run in runs)
+        torch_loaded, transformers_loaded = runs[0][2] == "True", runs[0][3] == "True"
+        print(f"{name:<20}{import_time:>9.2f}s{call_time:>11.2f}s{str(torch_loaded):>8}{str(transformers_loaded):>14}")
+        if name != "rag_answer" and torch_loaded:
+            retrieval_loaded_torch = True
+
+    if retrieval_loaded_torch:
+        sys.exit("torch was imported by a retrieval-only use of the example")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for the RAG with Hugging Face example")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    index_parser = subparsers.add_parser("index", help="Persistent TF-IDF index vs. refitting TfidfVectorizer")
+    index_parser.add_argument("--chunks", type=int, default=100_000)
+    index_parser.add_argument("--added", type=int, default=1_000, help="Chunks added incrementally after the build")
+    index_parser.add_argument("--queries", type=int, default=20)
+    index_parser.add_argument("--runs", type=int, default=3)
+    index_parser.add_argument("--k", type=int, default=3)
+    index_parser.set_defaults(run=benchmark_index)
+
+    generation_parser = subparsers.add_parser("generation", help="rag_answer_batch vs. sequential rag_answer")
+    generation_parser.add_argument("--questions", type=int, default=32)
+    generation_parser.add_argument("--batch-size", type=int, default=8)
+    generation_parser.add_argument("--max-new-tokens", type=int, default=64)
+    generation_parser.set_defaults(run=benchmark_generation)
+
+    imports_parser = subparsers.add_parser("imports", help="Import time, and whether torch is loaded, per use")
+    imports_parser.add_argument("--runs", type=int, default=3)
+    imports_parser.set_defaults(run=benchmark_imports)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+"""
+(C) Copyright 2026 Boni Garcia (https://bonigarcia.github.io/)
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+ http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import argparse
+import json
+import re
+import sys
+import time
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+HEADING = re.compile(r"#{1,6}\s+(.*)")
+FENCE = re.compile(r"(`{3,}|~{3,})")
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+TokenCounter = Callable[[str], int]
+
+
+def load_token_counter(tokenizer: str) -> TokenCounter:
+    """
+    Token counter for a Hugging Face tokenizer (a hub name, a folder or a tokenizer.json file).
+
+    It uses the `tokenizers` library directly, so chunking does not import transformers or torch.
+    """
+    from tokenizers import Tokenizer
+
+    path = Path(tokenizer)
+    if path.is_dir():
+        path = path / "tokenizer.json"
+    model = Tokenizer.from_file(str(path)) if path.is_file() else Tokenizer.from_pretrained(tokenizer)
+    return lambda text: len(model.encode(text, add_special_tokens=False).ids)
+
+
+def word_count(text: str) -> int:
+    return len(text.split())
+
+
+def iter_units(stream: TextIO, block_size: int = 1 << 16, max_unit_chars: int = 1 << 16) -> Iterator[Tuple[str, str]]:
+    """
+    Splits text read from `stream` into ("heading", title) and ("sentence", text) units.
+
+    The stream is read in blocks of at most `block_size` characters. The blocks of a line
+    are joined (up to `max_unit_chars`) before it is checked for a heading, a blank line or
+    a code fence, and an unfinished sentence is cut after `max_unit_chars`, so memory stays
+    bounded even for huge files or files without line breaks. Blank lines end a paragraph
+    (and its last sentence). Lines starting with "#" inside fenced code blocks (``` or ~~~)
+    are not headings.
+    """
+    pending = ""
+    at_line_start = True
+    fence = None  # the opening marker of the fenced code block being read
+    for line in iter(lambda: stream.readline(block_size), ""):
+        starts_line = at_line_start
+        if starts_line:
+            # A line cut by block_size: read the rest of it, so that a heading or a fence
+            # marker split across blocks is still recognised
+            while not line.endswith("\n") and len(line) < max_unit_chars:
+                more = stream.readline(block_size)
+                if not more:
+                    break
+                line += more
+        at_line_start = line.endswith("\n")
+        if starts_line:
+            marker = FENCE.match(line.lstrip())
+            if marker and fence is None:
+                fence = marker.group(1)
+            elif marker and marker.group(1)[0] == fence[0] and len(marker.group(1)) >= len(fence):
+                fence = None
+        heading = HEADING.fullmatch(line.strip()) if starts_line and fence is None else None
+        if heading or (starts_line and not line.strip()):
+            if pending.strip():
+                yield "sentence", " ".join(pending.split())
+            pending = ""
+            if heading:
+                yield "heading", heading.group(1).strip()
+            continue
+
+        pending += line
+        *sentences, pending = SENTENCE_END.split(pending)
+        for sentence in sentences:
+            if sentence.strip():
+                yield "sentence", " ".join(sentence.split())
+        if len(pending) > max_unit_chars:
+            yield "sentence", " ".join(pending.split())
+            pending = ""
+    if pending.strip():
+        yield "sentence", " ".join(pending.split())
+
+
+def split_long_sentence(sentence: str, count_tokens: TokenCounter, max_tokens: int) -> Iterator[Tuple[str, int]]:
+    """Splits a sentence longer than `max_tokens` at word boundaries."""
+    words, tokens = [], 0
+    for word in sentence.split():
+        word_tokens = count_tokens(word)
+        if words and tokens + word_tokens > max_tokens:
+            yield " ".join(words), tokens
+            words, tokens = [], 0
+        words.append(word)
+        tokens += word_tokens
+    if words:
+        yield " ".join(words), tokens
+
+
+def chunk_units(
+    units: Iterable[Tuple[str, str]],
+    count_tokens: TokenCounter,
+    max_tokens: int = 256,
+    overlap_tokens: int = 32,
+) -> Iterator[Dict]:
+    """
+    Packs sentences into chunks of at most `max_tokens` tokens.
+
+    Chunks end at sentence boundaries and never span a heading. Each chunk starts with the
+    last sentences of the previous chunk of the same section, up to `overlap_tokens`
+    tokens. The token count of a chunk is the sum of its sentences' counts, which can
+    differ by about one token per sentence from counting the joined text.
+    """
+    section = ""
+    sentences: List[Tuple[str, int]] = []
+    tokens = 0
+    has_new = False  # whether the chunk holds anything besides the overlap
+
+    def emit():
+        return {"section": section, "text": " ".join(s for s, _ in sentences), "tokens": tokens}
+
+    for kind, text in units:
+        if kind == "heading":
+            if has_new:
+                yield emit()
+            section, sentences, tokens, has_new = text, [], 0, False
+            continue
+
+        sentence_tokens = count_tokens(text)
+        pieces = [(text, sentence_tokens)] if sentence_tokens <= max_tokens else \
+            split_long_sentence(text, count_tokens, max_tokens)
+        for piece, piece_tokens in pieces:
+            if has_new and tokens + piece_tokens > max_tokens:
+                yield emit()
+                overlap: List[Tuple[str, int]] = []
+                overlap_total = 0
+                for previous in reversed(sentences):
+                    if overlap_total + previous[1] > overlap_tokens:
+                        break
+                    overlap.insert(0, previous)
+                    overlap_total += previous[1]
+                sentences, tokens, has_new = overlap, overlap_total, False
+            # Drop overlap that would not leave room for the new sentence
+            while sentences and tokens + piece_tokens > max_tokens:
+                tokens -= sentences.pop(0)[1]
+            sentences.append((piece, piece_tokens))
+            tokens += piece_tokens
+            has_new = True
+    if has_new:
+        yield emit()
+
+
+def chunk_file(
+    path: Path,
+    count_tokens: TokenCounter,
+    max_tokens: int = 256,
+    overlap_tokens: int = 32,
+    doc_id: Optional[str] = None,
+    block_size: int = 1 << 16,
+) -> Iterator[Dict]:
+    """Streams the chunks of a text/Markdown file, in the chunk format used by the example."""
+    doc_id = doc_id or path.name
+    with open(path, encoding="utf-8", errors="replace") as stream:
+        chunks = chunk_units(iter_units(stream, block_size), count_tokens, max_tokens, overlap_tokens)
+        for i, chunk in enumerate(chunks):
+            yield {
+                "doc_id": doc_id,
+                "title": chunk["section"] or path.stem,
+                "chunk_id": f"{doc_id}#chunk{i}",
+                "text": chunk["text"],
+                "tokens": chunk["tokens"],
+            }
+
+
+# Each worker process loads the tokenizer once
+_worker: Dict = {}
+
+
+def _init_worker(tokenizer: Optional[str], max_tokens: int, overlap_tokens: int, out_dir: str):
+    _worker.update(
+        count_tokens=load_token_counter(tokenizer) if tokenizer else word_count,
+        max_tokens=max_tokens, overlap_tokens=overlap_tokens, out_dir=Path(out_dir),
+    )
+
+
+def _chunk_to_jsonl(job: Tuple[str, str]) -> Tuple[str, int, int, int]:
+    """Chunks one file into its own JSONL shard; only counts go back to the parent process."""
+    path, doc_id = job
+    # The shards mirror the folders of the corpus, so distinct documents never share one
+    shard = _worker["out_dir"] / (doc_id + ".jsonl")
+    shard.parent.mkdir(parents=True, exist_ok=True)
+    chunks = tokens = 0
+    with open(shard, "w", encoding="utf-8") as out:
+        for chunk in chunk_file(Path(path), _worker["count_tokens"], _worker["max_tokens"],
+                                _worker["overlap_tokens"], doc_id=doc_id):
+            out.write(json.dumps(chunk) + "\n")
+            chunks += 1
+            tokens += chunk["tokens"]
+    return doc_id, chunks, tokens, Path(path).stat().st_size
+
+
+def chunk_corpus(
+    root: Path,
+    out_dir: Path,
+    tokenizer: Optional[str] = None,
+    max_tokens: int = 256,
+    overlap_tokens: int = 32,
+    processes: Optional[int] = None,
+    pattern: str = "**/*.md",
+) -> Iterator[Tuple[str, int, int, int]]:
+    """
+    Chunks every file under `root` matching `pattern` across a pool of processes.
+
+    Files are handed out one at a time and each worker streams its chunks to disk, so
+    memory per process stays bounded whatever the corpus size. Yields
+    (doc_id, chunks, tokens, bytes) per file as files finish.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    jobs = [(str(path), path.relative_to(root).as_posix())
+            for path in sorted(root.glob(pattern)) if path.is_file()]
+    with Pool(processes, initializer=_init_worker,
+              initargs=(tokenizer, max_tokens, overlap_tokens, str(out_dir))) as pool:
+        yield from pool.imap_unordered(_chunk_to_jsonl, jobs)
+
+
+def read_chunks(out_dir: Path) -> Iterator[Dict]:
+    """Streams the chunks written by `chunk_corpus` (e.g., to add them to a TfidfIndex)."""
+    for shard in sorted(Path(out_dir).rglob("*.jsonl")):
+        with open(shard, encoding="utf-8") as lines:
+            for line in lines:
+                yield json.loads(line)
+
+
+def _read_peak_worker_rss() -> Optional[int]:
+    """Peak resident set size of the largest worker process in bytes (None if it cannot be read)."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming, token-aware chunker for large corpora")
+    parser.add_argument("corpus", help="Folder with the documents to chunk")
+    parser.add_argument("--out", default="chunks", help="Folder for the JSONL chunk files (one per document)")
+    parser.add_argument("--tokenizer", default="google/flan-t5-base",
+                        help="Tokenizer used to count tokens (hub name, folder or tokenizer.json)")
+    parser.add_argument("--words", action="store_true", help="Count words instead of tokens")
+    parser.add_argument("--max-tokens", type=int, default=256)
+    parser.add_argument("--overlap", type=int, default=32, help="Tokens repeated from the previous chunk")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--glob", default="**/*.md", help="Files to chunk, relative to the corpus folder")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    files = chunks = tokens = size = 0
+    for doc_id, file_chunks, file_tokens, file_size in chunk_corpus(
+        Path(args.corpus), Path(args.out), None if args.words else args.tokenizer,
+        args.max_tokens, args.overlap, args.processes, args.glob,
+    ):
+        files, chunks, tokens, size = files + 1, chunks + file_chunks, tokens + file_tokens, size + file_size
+        print(f"{doc_id}: {file_chunks} chunks")
+    elapsed = time.perf_counter() - start
+
+    print(f"\n{files} files, {size / 1e6:.1f} MB -> {chunks} chunks, {tokens} tokens "
+          f"in {elapsed:.1f}s ({size / 1e6 / max(elapsed, 1e-9):.1f} MB/s)")
+    worker_rss = _read_peak_worker_rss()
+    if worker_rss is not None:
+        print(f"Peak worker memory: {worker_rss / 1e6:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,12 +10,38 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
-import numpy as np
+import os
 import re
-from typing import List, Dict
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+import threading
+from typing import Callable, Generic, List, Dict, Optional, TypeVar
+
+from tfidf_index import TfidfIndex
+
+T = TypeVar("T")
+
+class Lazy(Generic[T]):
+    """
+    A value built on first use. Concurrent callers wait for a single build instead of
+    each building their own copy; if the build fails, the next call tries again.
+    """
+
+    def __init__(self, factory: Callable[[], T]):
+        self._factory = factory
+        self._value: Optional[T] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> T:
+        if self._value is None:
+            with self._lock:
+                if self._value is None:
+                    self._value = self._factory()
+        return self._value
+
+    def warmup(self) -> threading.Thread:
+        """Builds the value in a background thread, so the first real call does not wait for it."""
+        thread = threading.Thread(target=self.get, daemon=True)
+        thread.start()
+        return thread
 
 # 1. Knowledge base
 DOCUMENTS = [
@@ -79,35 +105,76 @@ for doc in DOCUMENTS:
         })
 
 # 3. Retriever (TF-IDF)
-corpus = [c["text"] for c in KB_CHUNKS]
-vectorizer = TfidfVectorizer(stop_words="english")
-chunk_matrix = vectorizer.fit_transform(corpus)
+# The index is persisted to disk and reused across runs. Chunks that are not in the
+# saved index yet are added incrementally; if an indexed chunk changed or is gone, the
+# index is rebuilt from scratch (TF-IDF counts cannot be removed cheaply).
+INDEX_DIR = os.environ.get("RAG_INDEX_DIR", ".rag_index")
+
+def load_or_build_index(chunks: List[Dict], path: str = INDEX_DIR) -> TfidfIndex:
+    index = None
+    if os.path.isdir(path):
+        index = TfidfIndex.load(path)
+        indexed = {c["chunk_id"]: c["text"] for c in index.chunks}
+        current = {c["chunk_id"]: c["text"] for c in chunks}
+        if any(current.get(chunk_id) != text for chunk_id, text in indexed.items()):
+            index = None
+    if index is None:
+        index, indexed = TfidfIndex(stop_words="english"), {}
+    missing = [c for c in chunks if c["chunk_id"] not in indexed]
+    if missing:
+        index.add(missing)
+        index.save(path)
+    return index
+
+retriever = Lazy(lambda: load_or_build_index(KB_CHUNKS))
 
 def retrieve(query: str, k: int = 3) -> List[Dict]:
-    q_vec = vectorizer.transform([query])
-    sims = cosine_similarity(q_vec, chunk_matrix)[0]
-    top_idx = np.argsort(-sims)[:k]
-    results = []
-    for rank, idx in enumerate(top_idx, start=1):
-        item = KB_CHUNKS[idx].copy()
-        item["score"] = float(sims[idx])
-        item["rank"] = rank
-        results.append(item)
-    return results
+    return retriever.get().search(query, k=k)
 
 # 4. Generation (Hugging Face)
+# transformers (and torch) are imported only when the generator is first used, so
+# tools that only chunk or retrieve do not pay for loading them.
 GENERATION_MODEL = "google/flan-t5-base"
-tokenizer = AutoTokenizer.from_pretrained(GENERATION_MODEL)
-model = AutoModelForSeq2SeqLM.from_pretrained(
-    GENERATION_MODEL,
-    device_map="auto",
-)
+
+def load_generator():
+    from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+    tokenizer = AutoTokenizer.from_pretrained(GENERATION_MODEL)
+    model = AutoModelForSeq2SeqLM.from_pretrained(
+        GENERATION_MODEL,
+        device_map="auto",
+    )
+    return tokenizer, model
+
+generator = Lazy(load_generator)
+
+def warmup() -> List[threading.Thread]:
+    """Starts loading the retriever and the generator in the background."""
+    return [retriever.warmup(), generator.warmup()]
 
 def gen(prompt, max_new_tokens=200):
+    tokenizer, model = generator.get()
     inputs = tokenizer(prompt, return_tensors="pt").to(model.device)
     outputs = model.generate(**inputs, max_new_tokens=max_new_tokens)
     return [{"generated_text": tokenizer.decode(outputs[0], skip_special_tokens=True)}]
 
+def gen_batch(prompts: List[str], max_new_tokens: int = 200, batch_size: int = 8) -> List[str]:
+    """
+    Generates an answer for each prompt. Prompts are sorted by token length and split
+    into buckets of `batch_size`, so every bucket is padded to a similar length, and each
+    bucket is a single `generate` call. Answers are returned in the order of `prompts`.
+    """
+    tokenizer, model = generator.get()
+    lengths = [len(ids) for ids in tokenizer(prompts)["input_ids"]]
+    order = sorted(range(len(prompts)), key=lengths.__getitem__)
+    answers = [""] * len(prompts)
+    for start in range(0, len(order), batch_size):
+        bucket = order[start:start + batch_size]
+        inputs = tokenizer([prompts[i] for i in bucket], return_tensors="pt", padding=True).to(model.device)
+        outputs = model.generate(**inputs, max_new_tokens=max_new_tokens)
+        for i, text in zip(bucket, tokenizer.batch_decode(outputs, skip_special_tokens=True)):
+            answers[i] = text
+    return answers
+
 SYSTEM_MSG = (
     "You are a helpful assistant. Use ONLY the context to answer the question. "
     "Cite sources inline as [source: <chunk_id>]. If the answer is not in the context, say you don't know."
@@ -126,12 +193,22 @@ def build_prompt(query: str, retrieved: List[Dict]) -> str:
     )
     return prompt
 
-def rag_answer(query: str, k: int = 3) -> Dict:
+def rag_answer(query: str, k: int = 3, max_new_tokens: int = 200) -> Dict:
     top = retrieve(query, k=k)
     prompt = build_prompt(query, top)
-    out = gen(prompt, max_new_tokens=200)[0]["generated_text"]
+    out = gen(prompt, max_new_tokens=max_new_tokens)[0]["generated_text"]
     return {"answer": out, "retrieved": top, "prompt": prompt}
 
+def rag_answer_batch(queries: List[str], k: int = 3, batch_size: int = 8, max_new_tokens: int = 200) -> List[Dict]:
+    """Answers several queries: one retrieval for all of them, then length-bucketed generation."""
+    retrieved = retriever.get().search_batch(queries, k=k)
+    prompts = [build_prompt(query, top) for query, top in zip(queries, retrieved)]
+    answers = gen_batch(prompts, max_new_tokens=max_new_tokens, batch_size=batch_size)
+    return [
+        {"answer": answer, "retrieved": top, "prompt": prompt}
+        for answer, top, prompt in zip(answers, retrieved, prompts)
+    ]
+
 def show_result(result: Dict):
     print("\nANSWER:\n")
     print(result["answer"])
@@ -140,6 +217,7 @@ def show_result(result: Dict):
         print(f"  - {r['rank']}. {r['title']} [{r['chunk_id']}]  (score={r['score']:.3f})")
 
 if __name__ == "__main__":
+    warmup()  # load the model while the first query is retrieved
     user_query = "Why is chunking useful in RAG?"
     print(f"User Query: {user_query}")
     result = rag_answer(user_query, k=3)
@@ -0,0 +1,124 @@
+from importlib import util
+from io import StringIO
+from pathlib import Path
+import sys
+import tempfile
+import unittest
+
+from tokenizers import ByteLevelBPETokenizer
+
+SENTENCES = " ".join(f"Sentence number {i} talks about chunking." for i in range(40))
+MARKDOWN = f"""# Retrieval
+RAG combines retrieval with generation. A retriever
+finds relevant passages! Does it help? Yes.
+
+# Chunking
+{SENTENCES}
+
+## Overlap
+Overlapping chunks preserve context near boundaries.
+"""
+
+
+def load_chunker_module():
+    path = Path(__file__).with_name("chunker.py")
+    spec = util.spec_from_file_location("chunker", path)
+    module = util.module_from_spec(spec)
+    sys.modules["chunker"] = module  # worker processes look functions up by module name
+    spec.loader.exec_module(module)
+    return module
+
+
+class ChunkerTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.module = load_chunker_module()
+
+    def chunk(self, text, max_tokens=30, overlap_tokens=8, block_size=1 << 16, count_tokens=None):
+        units = self.module.iter_units(StringIO(text), block_size)
+        return list(self.module.chunk_units(units, count_tokens or self.module.word_count, max_tokens, overlap_tokens))
+
+    def test_chunks_follow_headings_and_sentences(self):
+        chunks = self.chunk(MARKDOWN)
+
+        self.assertEqual(chunks[0], {
+            "section": "Retrieval",
+            "text": "RAG combines retrieval with generation. A retriever finds relevant passages! Does it help? Yes.",
+            "tokens": 14,
+        })
+        self.assertEqual([c["section"] for c in chunks[1:-1]], ["Chunking"] * (len(chunks) - 2))
+        self.assertEqual(chunks[-1]["section"], "Overlap")
+        for chunk in chunks:
+            self.assertLessEqual(chunk["tokens"], 30)
+            self.assertTrue(chunk["text"].endswith((".", "!", "?")))
+
+    def test_comments_in_fenced_code_are_not_headings(self):
+        text = "# Setup\n\nInstall it.\n\n```bash\n# install the package\npip install x\n```\n\n~~~\n## not a heading\n~~~\n\n# Usage\n\nRun it.\n"
+
+        units = list(self.module.iter_units(StringIO(text)))
+
+        self.assertEqual([title for kind, title in units if kind == "heading"], ["Setup", "Usage"])
+        self.assertIn(("sentence", "```bash # install the package pip install x ```"), units)
+
+    def test_fences_split_across_small_reads_are_recognised(self):
+        text = "# Setup\n\n```bash-with-a-long-info-string\n# install the package\n```\n\n# Usage\n\nRun it.\n"
+
+        for block_size in (1, 2, 4, 7):
+            units = list(self.module.iter_units(StringIO(text), block_size))
+            self.assertEqual([title for kind, title in units if kind == "heading"], ["Setup", "Usage"], block_size)
+
+    def test_consecutive_chunks_overlap(self):
+        chunks = [c for c in self.chunk(MARKDOWN) if c["section"] == "Chunking"]
+
+        self.assertGreater(len(chunks), 2)
+        for previous, current in zip(chunks, chunks[1:]):
+            last_sentence = previous["text"].split(". ")[-1]
+            self.assertTrue(current["text"].startswith(last_sentence.rstrip(".")))
+
+    def test_small_reads_give_the_same_chunks(self):
+        expected = self.chunk(MARKDOWN)
+
+        for block_size in (1, 5, 64):
+            self.assertEqual(self.chunk(MARKDOWN, block_size=block_size), expected)
+
+    def test_long_sentences_are_split_at_words(self):
+        chunks = self.chunk("word " * 100 + "end.", max_tokens=30, overlap_tokens=0)
+
+        self.assertEqual([c["tokens"] for c in chunks], [30, 30, 30, 11])
+
+    def test_token_counts_use_the_tokenizer(self):
+        with tempfile.TemporaryDirectory() as directory:
+            bpe = ByteLevelBPETokenizer()
+            bpe.train_from_iterator([MARKDOWN] * 5, vocab_size=300)
+            bpe.save(str(Path(directory) / "tokenizer.json"))
+            count_tokens = self.module.load_token_counter(directory)
+
+        chunks = self.chunk(MARKDOWN, max_tokens=40, count_tokens=count_tokens)
+
+        for chunk in chunks:
+            self.assertLessEqual(chunk["tokens"], 40)
+            sentences = len(self.module.SENTENCE_END.split(chunk["text"]))
+            self.assertLessEqual(abs(count_tokens(chunk["text"]) - chunk["tokens"]), sentences)
+        self.assertNotEqual([c["tokens"] for c in chunks], [c["tokens"] for c in self.chunk(MARKDOWN, max_tokens=40)])
+
+    def test_corpus_is_chunked_across_processes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            root, out = Path(directory) / "docs", Path(directory) / "chunks"
+            (root / "nested").mkdir(parents=True)
+            (root / "a.md").write_text(MARKDOWN, encoding="utf-8")
+            (root / "nested" / "b.md").write_text(MARKDOWN.replace("RAG", "CAG"), encoding="utf-8")
+            (root / "nested__b.md").write_text("# Other\n\nA document with a similar name.\n", encoding="utf-8")
+
+            stats = sorted(self.module.chunk_corpus(root, out, max_tokens=30, overlap_tokens=8, processes=2))
+            chunks = list(self.module.read_chunks(out))
+            expected = list(self.module.chunk_file(root / "a.md", self.module.word_count, 30, 8, doc_id="a.md"))
+
+        self.assertEqual([s[0] for s in stats], ["a.md", "nested/b.md", "nested__b.md"])
+        self.assertEqual(len(chunks), sum(s[1] for s in stats))
+        self.assertEqual(chunks[:len(expected)], expected)
+        self.assertEqual(chunks[len(expected)]["chunk_id"], "nested/b.md#chunk0")
+        self.assertEqual(chunks[-1]["chunk_id"], "nested__b.md#chunk0")
+
+
+if __name__ == "__main__":
+    unittest.main()
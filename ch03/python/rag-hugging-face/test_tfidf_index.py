@@ -0,0 +1,88 @@
+from importlib import util
+from pathlib import Path
+import tempfile
+import unittest
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+
+TEXTS = [
+    "Retrieval-Augmented Generation combines information retrieval with text generation.",
+    "Chunking splits long documents into smaller passages. Overlapping chunks preserve context.",
+    "Cosine similarity measures closeness between vectors of queries and chunks.",
+    "Citations to retrieved passages improve transparency and reduce hallucinations.",
+    "Smaller chunks keep prompts short; overlapping chunks keep context near boundaries.",
+]
+QUERIES = ["Why is chunking useful?", "retrieval and generation", "nothing matches this"]
+
+
+def load_index_module():
+    path = Path(__file__).with_name("tfidf_index.py")
+    spec = util.spec_from_file_location("tfidf_index", path)
+    module = util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class TfidfIndexTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.module = load_index_module()
+        cls.chunks = [{"chunk_id": f"doc{i}#chunk0", "text": text} for i, text in enumerate(TEXTS)]
+
+    def test_scores_match_tfidf_vectorizer(self):
+        index = self.module.TfidfIndex()
+        index.add(self.chunks)
+        vectorizer = TfidfVectorizer(stop_words="english")
+        matrix = vectorizer.fit_transform(TEXTS)
+
+        for query in QUERIES:
+            expected = cosine_similarity(vectorizer.transform([query]), matrix)[0]
+            np.testing.assert_allclose(index.scores(index.query_vector(query))[0], expected, atol=1e-6)
+
+    def test_incremental_add_equals_full_build(self):
+        full = self.module.TfidfIndex()
+        full.add(self.chunks)
+        incremental = self.module.TfidfIndex()
+        incremental.add(self.chunks[:2])
+        incremental.search(QUERIES[0])
+        incremental.add(self.chunks[2:])
+
+        for query in QUERIES:
+            self.assertEqual(incremental.search(query, k=3), full.search(query, k=3))
+
+    def test_saved_index_loads_with_the_same_results(self):
+        index = self.module.TfidfIndex()
+        index.add(self.chunks)
+
+        with tempfile.TemporaryDirectory() as directory:
+            index.save(directory)
+            loaded = self.module.TfidfIndex.load(directory)
+
+        self.assertEqual(len(loaded), len(index))
+        for query in QUERIES:
+            self.assertEqual(loaded.search(query, k=3), index.search(query, k=3))
+
+    def test_search_batch_matches_single_queries(self):
+        index = self.module.TfidfIndex()
+        index.add(self.chunks)
+
+        batched = index.search_batch(QUERIES, k=2)
+
+        self.assertEqual(batched, [index.search(query, k=2) for query in QUERIES])
+
+    def test_search_ranks_best_chunks_first(self):
+        index = self.module.TfidfIndex()
+        index.add(self.chunks)
+
+        results = index.search("overlapping chunks context", k=10)
+
+        self.assertEqual(len(results), len(TEXTS))
+        self.assertEqual([r["rank"] for r in results], list(range(1, len(TEXTS) + 1)))
+        self.assertEqual(results[0]["chunk_id"], "doc4#chunk0")
+        self.assertEqual(sorted((r["score"] for r in results), reverse=True), [r["score"] for r in results])
+
+
+if __name__ == "__main__":
+    unittest.main()
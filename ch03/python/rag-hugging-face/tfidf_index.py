@@ -0,0 +1,166 @@
+"""
+(C) Copyright 2026 Boni Garcia (https://bonigarcia.github.io/)
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+ http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import CountVectorizer
+
+
+class TfidfIndex:
+    """
+    A TF-IDF index over text chunks that can be saved, loaded and extended.
+
+    Scores match scikit-learn's `TfidfVectorizer` defaults (smoothed IDF, L2-normalized
+    rows), so retrieval is cosine similarity. Instead of the weighted matrix, the index
+    keeps the raw term counts and the document frequency of every term. Adding chunks
+    only tokenizes the new chunks and appends their rows, and the vocabulary grows as
+    needed. The IDF and the weighted matrix are recomputed from the counts (a cheap,
+    vectorized pass) before the next query, so no refit over the corpus is needed.
+    """
+
+    def __init__(self, stop_words: Optional[str] = "english"):
+        self.stop_words = stop_words
+        self._analyzer = CountVectorizer(stop_words=stop_words).build_analyzer()
+        self.vocabulary: Dict[str, int] = {}
+        self.chunks: List[Dict] = []
+        self._counts = sp.csr_matrix((0, 0), dtype=np.float32)
+        self._df = np.zeros(0, dtype=np.int64)
+        self._idf: Optional[np.ndarray] = None
+        self._matrix: Optional[sp.csr_matrix] = None
+        self._postings: Optional[sp.csr_matrix] = None
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def add(self, chunks: List[Dict]):
+        """Indexes chunks (dicts with at least a "text" key); new terms extend the vocabulary."""
+        if not chunks:
+            return
+        indptr, indices, data = [0], [], []
+        for chunk in chunks:
+            counts: Dict[int, int] = {}
+            for token in self._analyzer(chunk["text"]):
+                term_id = self.vocabulary.setdefault(token, len(self.vocabulary))
+                counts[term_id] = counts.get(term_id, 0) + 1
+            indices.extend(counts)
+            data.extend(counts.values())
+            indptr.append(len(indices))
+
+        vocab_size = len(self.vocabulary)
+        rows = sp.csr_matrix(
+            (np.asarray(data, dtype=np.float32), np.asarray(indices, dtype=np.int64), np.asarray(indptr)),
+            shape=(len(chunks), vocab_size),
+        )
+        counts_matrix = self._counts
+        if counts_matrix.shape[1] < vocab_size:
+            counts_matrix = sp.csr_matrix(
+                (counts_matrix.data, counts_matrix.indices, counts_matrix.indptr),
+                shape=(counts_matrix.shape[0], vocab_size),
+            )
+        self._counts = sp.vstack([counts_matrix, rows], format="csr")
+        self._df = np.concatenate([self._df, np.zeros(vocab_size - len(self._df), dtype=np.int64)])
+        self._df += np.bincount(rows.indices, minlength=vocab_size)
+        self.chunks.extend(chunks)
+        self._idf = self._matrix = self._postings = None
+
+    def _weights(self):
+        """Recomputes the IDF and the normalized TF-IDF matrix after chunks were added."""
+        if self._matrix is None:
+            n = len(self.chunks)
+            self._idf = (np.log((1 + n) / (1 + self._df)) + 1).astype(np.float32)
+            matrix = self._counts @ sp.diags(self._idf)
+            norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+            norms[norms == 0] = 1
+            self._matrix = sp.csr_matrix(sp.diags(1 / norms) @ matrix)
+            # One row per term (an inverted index), so a query only touches its own terms' postings
+            self._postings = self._matrix.T.tocsr()
+        return self._idf, self._matrix
+
+    def query_vector(self, query: str) -> sp.csr_matrix:
+        """The normalized TF-IDF vector of a query (terms outside the vocabulary are ignored)."""
+        return self.query_matrix([query])
+
+    def query_matrix(self, queries: List[str]) -> sp.csr_matrix:
+        """The normalized TF-IDF vectors of several queries, one row per query."""
+        idf, _ = self._weights()
+        indptr, indices, data = [0], [], []
+        for query in queries:
+            counts: Dict[int, int] = {}
+            for token in self._analyzer(query):
+                term_id = self.vocabulary.get(token)
+                if term_id is not None:
+                    counts[term_id] = counts.get(term_id, 0) + 1
+            ids = np.fromiter(counts, dtype=np.int64, count=len(counts))
+            weights = np.fromiter(counts.values(), dtype=np.float32, count=len(counts)) * idf[ids]
+            norm = np.linalg.norm(weights)
+            indices.append(ids)
+            data.append(weights / norm if norm > 0 else weights)
+            indptr.append(indptr[-1] + len(ids))
+        return sp.csr_matrix(
+            (np.concatenate(data), np.concatenate(indices), np.asarray(indptr)),
+            shape=(len(queries), len(self.vocabulary)),
+        )
+
+    def scores(self, query_matrix: sp.csr_matrix) -> np.ndarray:
+        """Cosine similarity of every chunk to each query row, as a dense [queries, chunks] array."""
+        self._weights()
+        return (query_matrix @ self._postings).toarray()
+
+    def search(self, query: str, k: int = 3) -> List[Dict]:
+        """Top-k chunks for a query, best first, with "score" and "rank" added."""
+        return self.search_batch([query], k=k)[0]
+
+    def search_batch(self, queries: List[str], k: int = 3) -> List[List[Dict]]:
+        """Top-k chunks for each query, scoring all queries with a single sparse product."""
+        if not queries:
+            return []
+        return [self.top_k(sims, k) for sims in self.scores(self.query_matrix(queries))]
+
+    def top_k(self, sims: np.ndarray, k: int) -> List[Dict]:
+        """Turns one row of scores into ranked results, selecting with `argpartition` (no full sort)."""
+        k = min(k, len(sims))
+        if k <= 0:
+            return []
+        top_idx = np.argpartition(-sims, k - 1)[:k]
+        top_idx = top_idx[np.argsort(-sims[top_idx], kind="stable")]
+        results = []
+        for rank, idx in enumerate(top_idx, start=1):
+            item = self.chunks[idx].copy()
+            item["score"] = float(sims[idx])
+            item["rank"] = rank
+            results.append(item)
+        return results
+
+    def save(self, path: Union[str, Path]):
+        """Writes the vocabulary, document frequencies, term counts and chunks to a directory."""
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        sp.save_npz(path / "counts.npz", self._counts)
+        np.save(path / "df.npy", self._df)
+        (path / "vocabulary.json").write_text(json.dumps(self.vocabulary), encoding="utf-8")
+        (path / "chunks.json").write_text(json.dumps(self.chunks), encoding="utf-8")
+        (path / "config.json").write_text(json.dumps({"stop_words": self.stop_words}), encoding="utf-8")
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "TfidfIndex":
+        path = Path(path)
+        config = json.loads((path / "config.json").read_text(encoding="utf-8"))
+        index = cls(stop_words=config["stop_words"])
+        index._counts = sp.load_npz(path / "counts.npz").tocsr()
+        index._df = np.load(path / "df.npy")
+        index.vocabulary = json.loads((path / "vocabulary.json").read_text(encoding="utf-8"))
+        index.chunks = json.loads((path / "chunks.json").read_text(encoding="utf-8"))
+        return index
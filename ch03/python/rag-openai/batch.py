@@ -0,0 +1,219 @@
+"""
+(C) Copyright 2026 Boni Garcia (https://bonigarcia.github.io/)
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+ http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import asyncio
+import hashlib
+import json
+import random
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token for English), used for tokens/min budgeting."""
+    return len(text) // 4 + 1
+
+
+class TokenBucket:
+    """
+    A bucket refilled continuously at `per_minute` units per minute.
+
+    It holds at most `burst_seconds` worth of units, so a full bucket cannot release a
+    whole minute's budget at once (providers also enforce their limits over short windows).
+    A request larger than that is still charged in full: it waits until the bucket is full,
+    and leaves it in debt, so the requests after it wait until the debt is refilled.
+    """
+
+    def __init__(self, per_minute: float, burst_seconds: float = 1.0, clock: Callable[[], float] = time.monotonic):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.available = self.capacity
+        self.clock = clock
+        self.updated = clock()
+
+    def refill(self):
+        now = self.clock()
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` units are available (0 if they are available now)."""
+        self.refill()
+        return max(0.0, (min(amount, self.capacity) - self.available) / self.rate)
+
+    def take(self, amount: float):
+        self.available -= amount  # may go negative for a request larger than the capacity
+
+
+class RateLimiter:
+    """
+    Paces requests to stay under a requests/min and a tokens/min limit.
+
+    Callers are served in arrival order: `acquire` holds a lock while it waits, so a large
+    request is not starved by a stream of small ones.
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: int):
+        async with self._lock:
+            while True:
+                wait = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+                if wait <= 0:
+                    self.requests.take(1)
+                    self.tokens.take(tokens)
+                    return
+                await asyncio.sleep(wait)
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    return getattr(error, "status_code", None) == 429 or type(error).__name__ == "RateLimitError"
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """The delay requested by the server (retry-after-ms or retry-after headers), if any."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        if "retry-after" in headers:
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
+
+async def call_with_retries(
+    call: Callable[[], Awaitable[str]],
+    max_retries: int = 6,
+    base_delay: float = 1.0,
+    max_delay: float = 60.0,
+    limiter: Optional[RateLimiter] = None,
+    tokens: int = 0,
+) -> Tuple[str, int]:
+    """
+    Runs `call`, retrying rate-limit (429) errors with exponential backoff and full jitter.
+
+    Jitter spreads the retries of concurrent requests, so they do not hit the limit again
+    at the same instant. A server-provided retry-after delay is used as the minimum wait.
+    With a `limiter`, every attempt (retries included) first acquires one request and
+    `tokens` tokens from it, so retries count against the budget too.
+    Returns the result and the number of attempts.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            if limiter is not None:
+                await limiter.acquire(tokens)
+            return await call(), attempt + 1
+        except Exception as error:
+            if not is_rate_limit_error(error) or attempt == max_retries:
+                raise
+            delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+            await asyncio.sleep(max(delay, retry_after(error) or 0.0))
+    raise AssertionError("unreachable")
+
+
+def job_key(prompt: str) -> str:
+    """Identifies a job by its prompt, so an edited question is not mistaken for an answered one."""
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:32]
+
+
+def answered_keys(out_path: Path) -> Set[str]:
+    """Keys of the jobs already answered in an output file, so an interrupted batch can be resumed."""
+    if not out_path.exists():
+        return set()
+    keys = set()
+    with open(out_path, encoding="utf-8") as lines:
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn last line of an interrupted run
+            if record.get("error") is None and record.get("key"):
+                keys.add(record["key"])
+    return keys
+
+
+async def run_batch(
+    jobs: Iterable[Dict],
+    call: Callable[[str], Awaitable[str]],
+    out_path: Path,
+    limiter: RateLimiter,
+    concurrency: int = 32,
+    max_output_tokens: int = 512,
+    lookup: Optional[Callable[[str], Optional[str]]] = None,
+    store: Optional[Callable[[str, str], None]] = None,
+    on_result: Optional[Callable[[Dict], None]] = None,
+) -> Dict[str, float]:
+    """
+    Answers jobs ({"id", "question", "prompt"}) concurrently and appends results to a JSONL file.
+
+    `concurrency` workers pull jobs from a queue, so memory does not grow with the number
+    of jobs. Each request (and each retry) first waits for the rate limiter (its prompt
+    plus `max_output_tokens` count against tokens/min). Results are written as soon as
+    they complete, one JSON line each, so they can be read while the batch runs. Jobs
+    already answered in `out_path` (with the same prompt, see `job_key`) are skipped. `lookup`/`store` plug in a response cache; cache
+    hits skip the rate limiter.
+    """
+    done = answered_keys(out_path)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    stats = {"answered": 0, "failed": 0, "cached": 0, "skipped": 0, "retries": 0}
+    start = time.perf_counter()
+
+    with open(out_path, "a", encoding="utf-8") as out:
+        async def worker():
+            while True:
+                job = await queue.get()
+                if job is None:
+                    return
+                record = {"id": job["id"], "key": job_key(job["prompt"]), "question": job["question"],
+                          "answer": None, "error": None, "cached": False, "attempts": 0}
+                job_start = time.perf_counter()
+                try:
+                    answer = lookup(job["prompt"]) if lookup else None
+                    if answer is not None:
+                        record["cached"] = True
+                    else:
+                        answer, record["attempts"] = await call_with_retries(
+                            lambda: call(job["prompt"]), limiter=limiter,
+                            tokens=estimate_tokens(job["prompt"]) + max_output_tokens)
+                        if store:
+                            store(job["prompt"], answer)
+                    record["answer"] = answer
+                except Exception as error:
+                    record["error"] = f"{type(error).__name__}: {error}"
+                record["latency"] = round(time.perf_counter() - job_start, 4)
+
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                stats["failed" if record["error"] else "answered"] += 1
+                stats["cached"] += record["cached"]
+                stats["retries"] += max(0, record["attempts"] - 1)
+                if on_result:
+                    on_result(record)
+
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+        for job in jobs:
+            if job_key(job["prompt"]) in done:
+                stats["skipped"] += 1
+                continue
+            await queue.put(job)
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+
+    stats["seconds"] = time.perf_counter() - start
+    return stats
@@ -10,17 +10,33 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
+import argparse
+import asyncio
+import json
 import os
 import textwrap
+import time
+from pathlib import Path
 from typing import List, Dict, Any
 import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
+
+from batch import RateLimiter, run_batch
+from response_cache import ResponseCache
 
 # 1. Setup
 client = OpenAI()
 
+# Responses are cached on disk, keyed by (model, prompt, parameters). Set RAG_CACHE=0 to disable it.
+CACHE_ENABLED = os.environ.get("RAG_CACHE", "1") != "0"
+response_cache = ResponseCache(
+    path=os.environ.get("RAG_CACHE_PATH", ".rag_cache.sqlite"),
+    ttl_seconds=float(os.environ.get("RAG_CACHE_TTL", 7 * 24 * 3600)),
+    max_entries=int(os.environ.get("RAG_CACHE_MAX_ENTRIES", 10_000)),
+)
+
 # 2. Knowledge base
 documents: List[Dict[str, str]] = [
     {
@@ -69,6 +85,21 @@ def retrieve(query: str, k: int = 3) -> List[Dict[str, Any]]:
         })
     return results
 
+def retrieve_batch(queries: List[str], k: int = 3) -> List[List[Dict[str, Any]]]:
+    """Retrieve the top-k documents for many queries with a single sparse matrix product."""
+    similarities = (vectorizer.transform(queries) @ doc_vectors.T).toarray()  # rows are L2-normalized
+    k = min(k, len(documents))
+    top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+    results = []
+    for row, candidates in zip(similarities, top):
+        ranked = candidates[np.argsort(-row[candidates], kind="stable")]
+        results.append([
+            {"id": documents[idx]["id"], "title": documents[idx]["title"],
+             "score": float(row[idx]), "text": documents[idx]["text"]}
+            for idx in ranked
+        ])
+    return results
+
 # 4. Prompt construction
 def build_context(docs: List[Dict[str, Any]]) -> str:
     """Format retrieved documents into a context block for the model."""
@@ -77,27 +108,19 @@ def build_context(docs: List[Dict[str, Any]]) -> str:
         parts.append(f"[Document {i}: {d['title']}]\n{d['text'].strip()}")
     return "\n\n".join(parts)
 
-# 5. RAG Pipeline
-def query_model_with_rag(question: str, k: int = 3, model: str = "gpt-4o-mini", show_sources: bool = True) -> str:
-    """Answer a question using a simple RAG pipeline."""
-    retrieved_docs = retrieve(question, k=k)
-    context = build_context(retrieved_docs)
-
-    if show_sources:
-        print("\n[Retrieved passages]")
-        for d in retrieved_docs:
-            snippet = textwrap.shorten(d["text"], width=100, placeholder="...")
-            print(f"- {d['title']} (score={d['score']:.3f}): {snippet}")
-
-    prompt = (
+def build_prompt(question: str, docs: List[Dict[str, Any]]) -> str:
+    return (
         "You are a helpful assistant answering questions about the note-taking app LumaNote.\n"
         "Use ONLY the information in the documentation below to answer the question.\n"
         "If the answer is not contained in the documentation, say that you do not know.\n\n"
         "Documentation:\n"
-        f"{context}\n\n"
+        f"{build_context(docs)}\n\n"
         f"User question: {question}"
     )
 
+# 5. RAG Pipeline
+def call_model(prompt: str, model: str) -> str:
+    """Send the prompt to the model and return the answer text."""
     # Using the Responses API if available
     try:
         response = client.responses.create(
@@ -113,9 +136,105 @@ def query_model_with_rag(question: str, k: int = 3, model: str = "gpt-4o-mini",
         )
         return response.choices[0].message.content
 
+def query_model_with_rag(question: str, k: int = 3, model: str = "gpt-4o-mini", show_sources: bool = True,
+                         use_cache: bool = CACHE_ENABLED) -> str:
+    """Answer a question using a simple RAG pipeline."""
+    retrieved_docs = retrieve(question, k=k)
+
+    if show_sources:
+        print("\n[Retrieved passages]")
+        for d in retrieved_docs:
+            snippet = textwrap.shorten(d["text"], width=100, placeholder="...")
+            print(f"- {d['title']} (score={d['score']:.3f}): {snippet}")
+
+    prompt = build_prompt(question, retrieved_docs)
+
+    if not use_cache:
+        return call_model(prompt, model)
+
+    key = ResponseCache.key(model, prompt)
+    start = time.perf_counter()
+    answer = response_cache.get(key)
+    if answer is not None:
+        if show_sources:
+            print(f"\n[Cache hit in {(time.perf_counter() - start) * 1e6:.0f} µs, "
+                  f"served {response_cache.entry_hits(key)} times]")
+        return answer
+    answer = call_model(prompt, model)
+    response_cache.put(key, model, answer)
+    return answer
+
+# 6. Batch mode
+async def answer_batch(questions: List[str], out_path: str, k: int = 3, model: str = "gpt-4o-mini",
+                       requests_per_minute: float = 500, tokens_per_minute: float = 200_000,
+                       concurrency: int = 32, max_output_tokens: int = 512,
+                       use_cache: bool = CACHE_ENABLED) -> Dict[str, float]:
+    """
+    Answer many questions concurrently, appending one JSON line per answer to `out_path`.
+
+    Retrieval runs once for all questions. LLM calls are paced by a token-bucket rate
+    limiter, and 429 responses are retried with jittered backoff (see batch.py). Question
+    ids are their line numbers; answers are matched by a hash of their prompt, so
+    re-running the question set resumes where an interrupted run stopped, and edited
+    questions are answered again.
+    """
+    retrieved = retrieve_batch(questions, k=k)
+    # Same credentials and endpoint as `client`; retries are handled by run_batch, so the
+    # client must not retry 429s on its own
+    async_client = AsyncOpenAI(api_key=client.api_key, base_url=client.base_url, max_retries=0)
+
+    async def call(prompt: str) -> str:
+        response = await async_client.responses.create(model=model, input=prompt, max_output_tokens=max_output_tokens)
+        return response.output[0].content[0].text
+
+    jobs = (
+        {"id": str(i), "question": question, "prompt": build_prompt(question, docs)}
+        for i, (question, docs) in enumerate(zip(questions, retrieved))
+    )
+    params = {"max_output_tokens": max_output_tokens}
+    lookup = (lambda prompt: response_cache.get(ResponseCache.key(model, prompt, params))) if use_cache else None
+    store = (lambda prompt, answer: response_cache.put(ResponseCache.key(model, prompt, params), model, answer)) \
+        if use_cache else None
+    try:
+        return await run_batch(jobs, call, Path(out_path), RateLimiter(requests_per_minute, tokens_per_minute),
+                               concurrency=concurrency, max_output_tokens=max_output_tokens,
+                               lookup=lookup, store=store)
+    finally:
+        await async_client.close()
+
+def read_questions(path: str) -> List[str]:
+    """Questions from a text file (one per line) or a JSONL file with a "question" field."""
+    with open(path, encoding="utf-8") as lines:
+        if path.endswith(".jsonl"):
+            return [json.loads(line)["question"] for line in lines if line.strip()]
+        return [line.strip() for line in lines if line.strip()]
+
 if __name__ == "__main__":
-    question = "How can I sync my notes between my phone and laptop?"
+    parser = argparse.ArgumentParser(description="RAG with OpenAI")
+    parser.add_argument("question", nargs="?", default="How can I sync my notes between my phone and laptop?")
+    parser.add_argument("--no-cache", action="store_true", help="Always call the model, bypassing the response cache")
+    parser.add_argument("--batch", help="Answer the questions in this file (.txt, one per line, or .jsonl)")
+    parser.add_argument("--out", default="answers.jsonl", help="JSONL file the batch answers are appended to")
+    parser.add_argument("--rpm", type=float, default=500, help="Requests per minute allowed in batch mode")
+    parser.add_argument("--tpm", type=float, default=200_000, help="Tokens per minute allowed in batch mode")
+    parser.add_argument("--concurrency", type=int, default=32, help="Requests in flight in batch mode")
+    args = parser.parse_args()
+
+    if args.batch:
+        questions = read_questions(args.batch)
+        print(f"Answering {len(questions)} questions from {args.batch} into {args.out}...")
+        stats = asyncio.run(answer_batch(
+            questions, args.out, requests_per_minute=args.rpm, tokens_per_minute=args.tpm,
+            concurrency=args.concurrency, use_cache=CACHE_ENABLED and not args.no_cache,
+        ))
+        rate = stats["answered"] / stats["seconds"] * 60 if stats["seconds"] else 0.0
+        print(f"Done in {stats['seconds']:.1f}s ({rate:.0f} questions/min): {stats}")
+        raise SystemExit(0)
+
+    question = args.question
     print(f"Question: {question}")
-    
-    answer = query_model_with_rag(question)
+
+    answer = query_model_with_rag(question, use_cache=CACHE_ENABLED and not args.no_cache)
     print(f"\nAnswer:\n{answer}")
+    if CACHE_ENABLED and not args.no_cache:
+        print(f"\n[Response cache] {response_cache.stats()}")
@@ -0,0 +1,118 @@
+"""
+(C) Copyright 2026 Boni Garcia (https://bonigarcia.github.io/)
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+ http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+class ResponseCache:
+    """
+    A disk-backed cache of LLM responses, stored in SQLite.
+
+    Entries are keyed by a hash of (model, prompt, parameters), so a byte-identical request
+    is answered from disk without calling the API. Entries expire after `ttl_seconds`, and
+    when there are more than `max_entries` the least recently used ones are evicted. Every
+    entry counts its hits. The cache can be shared by several threads.
+    """
+
+    def __init__(
+        self,
+        path: str = ".rag_cache.sqlite",
+        ttl_seconds: Optional[float] = 7 * 24 * 3600,
+        max_entries: Optional[int] = 10_000,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        # WAL with synchronous=NORMAL avoids an fsync per hit; a crash can lose only the latest writes
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, model TEXT NOT NULL, response TEXT NOT NULL,"
+            " created_at REAL NOT NULL, last_access REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+        self._db.commit()
+
+    @staticmethod
+    def key(model: str, prompt: str, params: Optional[Dict[str, Any]] = None) -> str:
+        """Hash of everything that determines the response."""
+        payload = json.dumps({"model": model, "prompt": prompt, "params": params or {}}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """The cached response for `key`, or None if it is missing or expired."""
+        now = self.clock()
+        with self._lock:
+            row = self._db.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl_seconds is not None and now - row[1] > self.ttl_seconds:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE responses SET hits = hits + 1, last_access = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, model: str, response: str):
+        now = self.clock()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, created_at, last_access, hits)"
+                " VALUES (?, ?, ?, ?, ?, 0)",
+                (key, model, response, now, now),
+            )
+            self._evict(now)
+            self._db.commit()
+
+    def _evict(self, now: float):
+        if self.ttl_seconds is not None:
+            self._db.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        if self.max_entries is not None:
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN ("
+                " SELECT key FROM responses ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def entry_hits(self, key: str) -> int:
+        """How many times the entry for `key` was served from the cache."""
+        with self._lock:
+            row = self._db.execute("SELECT hits FROM responses WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            entries, total_hits = self._db.execute("SELECT COUNT(*), COALESCE(SUM(hits), 0) FROM responses").fetchone()
+        return {"entries": entries, "total_hits": total_hits, "hits": self.hits, "misses": self.misses}
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,120 @@
+"""
+(C) Copyright 2026 Boni Garcia (https://bonigarcia.github.io/)
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+ http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import argparse
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubOpenAIServer(ThreadingHTTPServer):
+    """
+    A local OpenAI-compatible server for testing batch runs without an API key or costs.
+
+    It answers POST /v1/responses and /v1/chat/completions with a canned answer that
+    echoes the question, after `latency` seconds. Every `rate_limit_every`-th request
+    gets a 429 with a retry-after-ms header, to exercise the retry logic.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 0), latency: float = 0.0, rate_limit_every: int = 0):
+        super().__init__(address, StubHandler)
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.requests = 0
+        self.rate_limited = 0
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def next_request(self) -> bool:
+        """Counts a request; returns True if it should be rate limited."""
+        with self._lock:
+            self.requests += 1
+            limited = self.rate_limit_every > 0 and self.requests % self.rate_limit_every == 0
+            self.rate_limited += limited
+            return limited
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status: int, body: dict, headers: dict = None):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.server.next_request():
+            error = {"message": "Rate limit reached (stub)", "type": "requests", "code": "rate_limit_exceeded"}
+            self.send_json(429, {"error": error}, {"retry-after-ms": "50"})
+            return
+        time.sleep(self.server.latency)
+
+        if self.path.endswith("/responses"):
+            prompt = request.get("input", "")
+            self.send_json(200, response_body(request.get("model", "stub"), answer_for(prompt)))
+        elif self.path.endswith("/chat/completions"):
+            prompt = request["messages"][-1]["content"]
+            self.send_json(200, chat_body(request.get("model", "stub"), answer_for(prompt)))
+        else:
+            self.send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+
+def answer_for(prompt: str) -> str:
+    question = prompt.rsplit("User question:", 1)[-1].strip()
+    return f"Stub answer to: {question}"
+
+
+def response_body(model: str, text: str) -> dict:
+    return {
+        "id": f"resp_{uuid.uuid4().hex}", "object": "response", "created_at": int(time.time()),
+        "status": "completed", "model": model, "parallel_tool_calls": True, "tool_choice": "auto", "tools": [],
+        "output": [{
+            "id": f"msg_{uuid.uuid4().hex}", "type": "message", "role": "assistant", "status": "completed",
+            "content": [{"type": "output_text", "text": text, "annotations": []}],
+        }],
+        "usage": {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0,
+                  "input_tokens_details": {"cached_tokens": 0}, "output_tokens_details": {"reasoning_tokens": 0}},
+    }
+
+
+def chat_body(model: str, text: str) -> dict:
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}", "object": "chat.completion", "created": int(time.time()), "model": model,
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": text}}],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub server for local testing")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds to wait before answering")
+    parser.add_argument("--rate-limit-every", type=int, default=10, help="Answer every N-th request with a 429 (0: never)")
+    args = parser.parse_args()
+
+    server = StubOpenAIServer(("127.0.0.1", args.port), args.latency, args.rate_limit_every)
+    print(f"Stub OpenAI server listening on {server.base_url}")
+    server.serve_forever()
@@ -0,0 +1,168 @@
+import asyncio
+from importlib import util
+import json
+import os
+from pathlib import Path
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+HERE = Path(__file__).parent
+QUESTIONS = [
+    "How can I sync my notes between my phone and laptop?",
+    "Can I edit notes offline?",
+    "How do I share a note with a teammate?",
+    "Is sync end-to-end encrypted?",
+] * 10
+
+
+def load_module(name, filename):
+    spec = util.spec_from_file_location(name, HERE / filename)
+    module = util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class RateLimiterTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.batch = load_module("batch", "batch.py")
+
+    def test_requests_per_minute_are_paced(self):
+        async def acquire_all():
+            limiter = self.batch.RateLimiter(requests_per_minute=600, tokens_per_minute=1_000_000)
+            limiter.requests.available = 0  # start with an empty bucket: 10 requests/s
+            start = time.perf_counter()
+            for _ in range(5):
+                await limiter.acquire(10)
+            return time.perf_counter() - start
+
+        self.assertGreaterEqual(asyncio.run(acquire_all()), 0.45)
+
+    def test_tokens_per_minute_are_paced(self):
+        async def acquire_all():
+            limiter = self.batch.RateLimiter(requests_per_minute=1_000_000, tokens_per_minute=60_000)
+            limiter.tokens.available = 0  # 1,000 tokens/s
+            start = time.perf_counter()
+            await limiter.acquire(300)
+            await limiter.acquire(300)
+            return time.perf_counter() - start
+
+        self.assertGreaterEqual(asyncio.run(acquire_all()), 0.55)
+
+    def test_requests_larger_than_the_bucket_are_charged_in_full(self):
+        now = [0.0]
+        bucket = self.batch.TokenBucket(per_minute=10_000, clock=lambda: now[0])  # capacity: ~167 tokens
+        admitted = 0
+        while True:
+            now[0] += bucket.wait_time(600)
+            if now[0] >= 60:
+                break
+            bucket.take(600)
+            admitted += 600
+
+        self.assertLessEqual(admitted, 10_000 + 600)
+        self.assertGreaterEqual(admitted, 10_000 - 600)
+
+    def test_every_retry_acquires_from_the_limiter(self):
+        class RateLimitError(Exception):
+            status_code = 429
+
+        acquired, attempts = [], []
+
+        class CountingLimiter:
+            async def acquire(self, tokens):
+                acquired.append(tokens)
+
+        async def call():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise RateLimitError("slow down")
+            return "answer"
+
+        with mock.patch.object(self.batch.random, "uniform", return_value=0.0):
+            result = asyncio.run(self.batch.call_with_retries(call, limiter=CountingLimiter(), tokens=42))
+
+        self.assertEqual(result, ("answer", 3))
+        self.assertEqual(acquired, [42, 42, 42])
+
+
+class BatchModeTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.stub = load_module("stub_server", "stub_server.py")
+        cls.server = cls.stub.StubOpenAIServer(latency=0.01, rate_limit_every=7)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.tmp = tempfile.TemporaryDirectory()
+        env = {"OPENAI_API_KEY": "test", "OPENAI_BASE_URL": cls.server.base_url,
+               "RAG_CACHE_PATH": str(Path(cls.tmp.name) / "cache.sqlite")}
+        with mock.patch.dict(os.environ, env):
+            cls.rag = load_module("rag_openai", "rag-openai.py")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.rag.response_cache.close()
+        cls.tmp.cleanup()
+
+    def setUp(self):
+        self.rag.response_cache.clear()
+        self.out = Path(self.tmp.name) / f"{self.id()}.jsonl"
+
+    def run_batch(self, questions, **kwargs):
+        # No jitter, so retries wait only the stub's retry-after-ms (50 ms)
+        with mock.patch("batch.random.uniform", return_value=0.0):
+            kwargs.setdefault("tokens_per_minute", 10_000_000)
+            return asyncio.run(self.rag.answer_batch(questions, str(self.out), concurrency=8, **kwargs))
+
+    def read_out(self):
+        return [json.loads(line) for line in self.out.read_text(encoding="utf-8").splitlines()]
+
+    def test_retrieve_batch_matches_retrieve(self):
+        batched = self.rag.retrieve_batch(QUESTIONS[:4], k=2)
+
+        for question, docs in zip(QUESTIONS, batched):
+            expected = self.rag.retrieve(question, k=2)
+            self.assertEqual(docs[0]["id"], expected[0]["id"])
+            for got, want in zip(docs, expected):
+                self.assertAlmostEqual(got["score"], want["score"], places=6)
+
+    def test_all_questions_are_answered_despite_rate_limits(self):
+        before = self.server.rate_limited
+
+        stats = self.run_batch(QUESTIONS, use_cache=False, requests_per_minute=60_000)
+
+        records = self.read_out()
+        self.assertEqual(stats["answered"], len(QUESTIONS))
+        self.assertEqual(stats["failed"], 0)
+        self.assertGreater(self.server.rate_limited, before)
+        self.assertEqual(stats["retries"], sum(r["attempts"] - 1 for r in records))
+        self.assertEqual(sorted(int(r["id"]) for r in records), list(range(len(QUESTIONS))))
+        for record in records:
+            self.assertEqual(record["answer"], f"Stub answer to: {QUESTIONS[int(record['id'])]}")
+
+    def test_rerun_skips_answered_questions_and_uses_the_cache(self):
+        self.run_batch(QUESTIONS[:4])
+        # Answers are matched by prompt, so the added questions must differ from the first four
+        stats = self.run_batch(QUESTIONS[:4] + ["Can I pin a note?", "How do I restore a deleted note?"])
+        self.out.unlink()
+        cached = self.run_batch(QUESTIONS[:4])
+
+        self.assertEqual((stats["skipped"], stats["answered"]), (4, 2))
+        self.assertEqual((cached["answered"], cached["cached"]), (4, 4))
+
+    def test_edited_questions_are_answered_again_on_resume(self):
+        self.run_batch(QUESTIONS[:4])
+        edited = QUESTIONS[:2] + ["Can I export notes to PDF?"] + QUESTIONS[3:4]
+
+        stats = self.run_batch(edited)
+
+        self.assertEqual((stats["skipped"], stats["answered"]), (3, 1))
+        self.assertEqual(self.read_out()[-1]["answer"], "Stub answer to: Can I export notes to PDF?")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+from importlib import util
+from pathlib import Path
+import tempfile
+import unittest
+
+
+def load_cache_module():
+    path = Path(__file__).with_name("response_cache.py")
+    spec = util.spec_from_file_location("response_cache", path)
+    module = util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000.0
+
+    def __call__(self):
+        return self.now
+
+
+class ResponseCacheTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.module = load_cache_module()
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = str(Path(self.tmp.name) / "cache.sqlite")
+        self.clock = FakeClock()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def cache(self, **kwargs):
+        cache = self.module.ResponseCache(self.path, clock=self.clock, **kwargs)
+        self.addCleanup(cache.close)
+        return cache
+
+    def test_key_depends_on_model_prompt_and_params(self):
+        key = self.module.ResponseCache.key
+
+        self.assertEqual(key("gpt-4o-mini", "prompt", {"a": 1, "b": 2}), key("gpt-4o-mini", "prompt", {"b": 2, "a": 1}))
+        self.assertNotEqual(key("gpt-4o-mini", "prompt"), key("gpt-4o", "prompt"))
+        self.assertNotEqual(key("gpt-4o-mini", "prompt"), key("gpt-4o-mini", "prompt "))
+        self.assertNotEqual(key("gpt-4o-mini", "prompt"), key("gpt-4o-mini", "prompt", {"temperature": 0}))
+
+    def test_hits_are_counted_and_persisted(self):
+        cache = self.cache()
+        key = cache.key("gpt-4o-mini", "How do I sync?")
+
+        self.assertIsNone(cache.get(key))
+        cache.put(key, "gpt-4o-mini", "Sign in on both devices.")
+        self.assertEqual(cache.get(key), "Sign in on both devices.")
+        self.assertEqual(cache.get(key), "Sign in on both devices.")
+        cache.close()
+
+        reopened = self.cache()
+        self.assertEqual(reopened.entry_hits(key), 2)
+        self.assertEqual(reopened.get(key), "Sign in on both devices.")
+        self.assertEqual(reopened.stats(), {"entries": 1, "total_hits": 3, "hits": 1, "misses": 0})
+
+    def test_entries_expire_after_ttl(self):
+        cache = self.cache(ttl_seconds=60)
+        cache.put("old", "m", "old answer")
+        self.clock.now += 30
+        cache.put("new", "m", "new answer")
+        self.clock.now += 31
+
+        self.assertIsNone(cache.get("old"))
+        self.assertEqual(cache.get("new"), "new answer")
+        self.assertEqual(cache.stats()["entries"], 1)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = self.cache(max_entries=2)
+        for key in ("a", "b"):
+            self.clock.now += 1
+            cache.put(key, "m", key.upper())
+        self.clock.now += 1
+        cache.get("a")
+        self.clock.now += 1
+        cache.put("c", "m", "C")
+
+        self.assertEqual([cache.get(key) for key in ("a", "b", "c")], ["A", None, "C"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,245 @@
+"""
+(C) Copyright 2026 Boni Garcia (https://bonigarcia.github.io/)
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+ http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import hashlib
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+TERMINAL_STATES = {"DONE", "FAIL", "CANCEL"}
+
+# The SDK raises a plain Exception with the API message; these are the messages of a
+# list filtered by a name that does not exist
+NOT_FOUND = re.compile(r"don't own|doesn't exist|does not exist|not found", re.IGNORECASE)
+
+
+def find_by_name(list_by_name: Callable[..., list], name: str):
+    """
+    The first object listed with exactly this name, or None. RAGFlow answers a list filtered
+    by an unknown name with an error, which is taken as "not found"; any other error (for
+    example, a connection error) is raised, so that it does not lead to a duplicate.
+    """
+    try:
+        items = list_by_name(name=name)
+    except Exception as error:
+        if NOT_FOUND.search(str(error)):
+            return None
+        raise
+    return next((item for item in items if item.name == name), None)
+
+
+def get_or_create_dataset(rag, name: str, embedding_model: Optional[str] = None):
+    dataset = find_by_name(rag.list_datasets, name)
+    if dataset is not None:
+        return dataset, False
+    return rag.create_dataset(name=name, embedding_model=embedding_model), True
+
+
+def get_or_create_chat(rag, name: str, dataset_ids: List[str]):
+    chat = find_by_name(rag.list_chats, name)
+    if chat is None:
+        return rag.create_chat(name=name, dataset_ids=dataset_ids), True
+    # The API lists the chat's datasets as objects; their ids are what an update takes
+    linked = [d["id"] if isinstance(d, dict) else d.id for d in getattr(chat, "datasets", None) or []]
+    if linked and not set(dataset_ids) <= set(linked):
+        chat.update({"dataset_ids": sorted(set(linked) | set(dataset_ids))})
+    return chat, False
+
+
+def get_or_create_session(chat, name: str):
+    session = find_by_name(chat.list_sessions, name)
+    if session is not None:
+        return session, False
+    return chat.create_session(name=name), True
+
+
+def iter_files(directory: str, patterns: Sequence[str] = ("*",)) -> Iterator[Path]:
+    """Files under `directory` matching `patterns`, yielded lazily in path order within each folder."""
+    for path in sorted(Path(directory).iterdir()):
+        if path.is_dir():
+            yield from iter_files(str(path), patterns)
+        elif any(path.match(pattern) for pattern in patterns):
+            yield path
+
+
+def file_digest(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 of the file contents, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def meta_fields(doc) -> Dict:
+    """The metadata of a document as a dict (the SDK wraps dict fields in objects of its own)."""
+    fields = getattr(doc, "meta_fields", None) or {}
+    return fields if isinstance(fields, dict) else fields.to_json()
+
+
+def list_all_documents(dataset, page_size: int = 100, workers: int = 4) -> list:
+    """Every document of the dataset. After the first page, pages are fetched `workers` at a time, in parallel."""
+    documents = dataset.list_documents(page=1, page_size=page_size)
+    if len(documents) < page_size:
+        return documents
+    page = 2
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            pages = range(page, page + workers)
+            for result in pool.map(lambda p: dataset.list_documents(page=p, page_size=page_size), pages):
+                documents.extend(result)
+                if len(result) < page_size:
+                    return documents
+            page += workers
+
+
+class BulkLoader:
+    """
+    Loads a directory of files into a RAGFlow dataset.
+
+    Files are read lazily and uploaded in batches of up to `batch_files` files or
+    `batch_bytes` bytes per `upload_documents` call, so memory holds one batch at a time.
+    Parsing of each batch starts as soon as it is uploaded, and the parse status of all
+    documents is then tracked together: each poll lists the dataset's documents a page at
+    a time, with the pages fetched in parallel, instead of one request per document.
+
+    Each document records the path of its file relative to `root` and the SHA-256 of its
+    contents (in its `meta_fields`). A file already in the dataset with the same path and
+    hash is not uploaded again (if it was not parsed yet, it is parsed now, so an interrupted
+    load can be resumed). If its contents changed, the file is uploaded again, and the old
+    document is deleted only once the new one has been uploaded.
+    """
+
+    def __init__(
+        self,
+        dataset,
+        batch_files: int = 16,
+        batch_bytes: int = 32 * 1024 * 1024,
+        page_size: int = 100,
+        workers: int = 4,
+        poll_interval: float = 2.0,
+        timeout: float = 3600.0,
+        sleep: Callable[[float], None] = time.sleep,
+        root: Optional[str] = None,
+    ):
+        self.dataset = dataset
+        self.root = Path(root or ".").resolve()
+        self.batch_files = batch_files
+        self.batch_bytes = batch_bytes
+        self.page_size = page_size
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.sleep = sleep
+        self.unfinished: List[str] = []  # documents of an earlier load that are still being parsed
+        self.unparsed: List[str] = []  # documents of an earlier load that have to be parsed again
+        self.stats = {"uploaded": 0, "skipped": 0, "replaced": 0, "upload_requests": 0, "status_polls": 0}
+
+    def relative_path(self, path: Path) -> str:
+        path = path.resolve()
+        try:
+            return path.relative_to(self.root).as_posix()
+        except ValueError:  # outside of the root
+            return path.as_posix()
+
+    def documents(self) -> Dict[str, object]:
+        """The documents of the dataset by file path (by name for documents without one)."""
+        return {meta_fields(doc).get("path", doc.name): doc
+                for doc in list_all_documents(self.dataset, self.page_size, self.workers)}
+
+    def batches(self, paths: Iterable[Path], existing: Dict[str, object]) -> Iterator[Tuple[List[Dict], List[str]]]:
+        """Yields (files to upload, ids of the documents they replace)."""
+        batch, replaced, size = [], [], 0
+        for path in paths:
+            path = Path(path)
+            relative, digest = self.relative_path(path), file_digest(path)
+            old = existing.get(relative)
+            if old is not None and meta_fields(old).get("sha256") == digest:
+                self.stats["skipped"] += 1
+                run = str(old.run).upper()
+                if run == "RUNNING":
+                    self.unfinished.append(old.id)
+                elif run != "DONE":  # not parsed yet, or a failed or cancelled parse of an earlier run
+                    self.unparsed.append(old.id)
+                continue
+            if batch and (len(batch) >= self.batch_files or size + path.stat().st_size > self.batch_bytes):
+                yield batch, replaced
+                batch, replaced, size = [], [], 0
+            blob = path.read_bytes()
+            batch.append({"display_name": path.name, "blob": blob,
+                          "meta_fields": {"path": relative, "sha256": digest}})
+            if old is not None:
+                replaced.append(old.id)
+            size += len(blob)
+        if batch:
+            yield batch, replaced
+
+    def upload_batch(self, batch: List[Dict]) -> List[str]:
+        """Uploads the files and records their path and hash; if that fails, nothing is left behind."""
+        uploaded = self.dataset.upload_documents([{"display_name": f["display_name"], "blob": f["blob"]}
+                                                  for f in batch])
+        self.stats["upload_requests"] += 1
+        try:
+            for doc, file in zip(uploaded, batch):
+                doc.update({"meta_fields": file["meta_fields"]})
+        except Exception:
+            self.dataset.delete_documents(ids=[doc.id for doc in uploaded])
+            raise
+        self.stats["uploaded"] += len(uploaded)
+        return [doc.id for doc in uploaded]
+
+    def upload(self, paths: Iterable[Path]) -> List[str]:
+        """Uploads the new and changed files in batches, and starts parsing each batch. Returns the document ids."""
+        self.unfinished, self.unparsed = [], []
+        doc_ids = []
+        for batch, replaced in self.batches(paths, self.documents()):
+            ids = self.upload_batch(batch)
+            if replaced:  # only now that their new versions are in the dataset
+                self.dataset.delete_documents(ids=replaced)
+                self.stats["replaced"] += len(replaced)
+            self.dataset.async_parse_documents(ids)
+            doc_ids.extend(ids)
+        if self.unparsed:
+            self.dataset.async_parse_documents(self.unparsed)
+        return doc_ids + self.unparsed + self.unfinished
+
+    def wait_for_parsing(self, doc_ids: List[str], on_progress: Optional[Callable[[Dict[str, int]], None]] = None):
+        """Waits until every document is parsed (or failed); returns {doc_id: final run state}."""
+        pending, finished = set(doc_ids), {}
+        deadline = time.monotonic() + self.timeout
+        while pending:
+            self.stats["status_polls"] += 1
+            for doc in list_all_documents(self.dataset, self.page_size, self.workers):
+                if doc.id not in pending:
+                    continue
+                run = str(doc.run).upper()
+                if run in TERMINAL_STATES or float(doc.progress or 0.0) >= 1.0:
+                    finished[doc.id] = run if run in TERMINAL_STATES else "DONE"
+                    pending.discard(doc.id)
+            if on_progress:
+                states = list(finished.values())
+                on_progress({"done": states.count("DONE"), "failed": len(states) - states.count("DONE"),
+                             "pending": len(pending)})
+            if pending:
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"{len(pending)} documents were not parsed after {self.timeout:.0f}s")
+                self.sleep(self.poll_interval)
+        return finished
+
+    def load(self, paths: Iterable[Path], on_progress=None) -> Dict[str, int]:
+        start = time.perf_counter()
+        finished = self.wait_for_parsing(self.upload(paths), on_progress)
+        states = list(finished.values())
+        return {**self.stats, "parsed": states.count("DONE"), "failed": len(states) - states.count("DONE"),
+                "seconds": time.perf_counter() - start}
@@ -0,0 +1,233 @@
+"""
+(C) Copyright 2026 Boni Garcia (https://bonigarcia.github.io/)
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+ http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import argparse
+import json
+import threading
+import uuid
+from email import policy
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class MockRAGFlowServer(ThreadingHTTPServer):
+    """
+    An in-memory stand-in for the RAGFlow HTTP API (/api/v1), for running the example without Docker.
+
+    It implements the dataset, document, chat, and session endpoints used by the SDK. A
+    document whose parsing was started is "RUNNING" for its first `parse_polls` document
+    listings, and "DONE" after that ("FAIL" if its name contains "fail"). An upload that
+    includes a file whose name contains "reject" is refused as a whole. Like RAGFlow, a
+    list filtered by a name that does not exist returns an error. The number of requests
+    to each endpoint is counted in `counts`.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 0), parse_polls: int = 2):
+        super().__init__(address, MockHandler)
+        self.parse_polls = parse_polls
+        self.datasets, self.documents, self.chats, self.sessions = {}, {}, {}, {}
+        self.counts = {}
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, name: str):
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+
+def new_id() -> str:
+    return uuid.uuid4().hex
+
+
+def by_name(items, query):
+    """Items filtered by the `name` query parameter; None if a name was given and nothing matches."""
+    name = query.get("name", [None])[0]
+    if not name:
+        return list(items)
+    matches = [item for item in items if item["name"] == name]
+    return matches or None
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, data=None, code: int = 0, message: str = ""):
+        payload = json.dumps({"code": code, "data": data, "message": message}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def json_body(self) -> dict:
+        return json.loads(self.body() or b"{}")
+
+    def route(self, method: str):
+        url = urlparse(self.path)
+        parts = url.path.strip("/").split("/")[2:]  # without "api/v1"
+        query = parse_qs(url.query)
+        server = self.server
+        with server.lock:
+            server.count(f"{method} /{'/'.join('{id}' if len(p) == 32 else p for p in parts)}")
+            handler = getattr(self, f"{method.lower()}_{parts[0]}", None)
+            if handler is None:
+                self.reply(code=100, message=f"Unknown path {url.path}")
+            else:
+                handler(parts[1:], query)
+
+    def do_GET(self):
+        self.route("GET")
+
+    def do_POST(self):
+        self.route("POST")
+
+    def do_PUT(self):
+        self.route("PUT")
+
+    def do_DELETE(self):
+        self.route("DELETE")
+
+    # Datasets and documents
+
+    def get_datasets(self, parts, query):
+        server = self.server
+        if not parts:
+            datasets = by_name(server.datasets.values(), query)
+            if datasets is None:
+                return self.reply(code=102, message="You don't own the dataset.")
+            return self.reply(datasets)
+        docs = [doc for doc in server.documents.values() if doc["dataset_id"] == parts[0]]
+        if query.get("id", [None])[0]:
+            docs = [doc for doc in docs if doc["id"] == query["id"][0]]
+        for doc in docs:
+            if doc["run"] == "RUNNING":
+                doc["polls"] += 1
+                if doc["polls"] >= server.parse_polls:
+                    doc["run"] = "FAIL" if "fail" in doc["name"] else "DONE"
+                    doc["progress"] = 1.0 if doc["run"] == "DONE" else -1.0
+                    doc["chunk_count"] = 1 if doc["run"] == "DONE" else 0
+        page, page_size = int(query.get("page", ["1"])[0]), int(query.get("page_size", ["30"])[0])
+        page_docs = docs[(page - 1) * page_size:page * page_size]
+        self.reply({"docs": [{k: v for k, v in doc.items() if k != "polls"} for doc in page_docs], "total": len(docs)})
+
+    def post_datasets(self, parts, query):
+        server = self.server
+        if not parts:
+            request = self.json_body()
+            dataset = {"id": new_id(), "name": request["name"], "embedding_model": request.get("embedding_model"),
+                       "document_count": 0, "chunk_count": 0}
+            server.datasets[dataset["id"]] = dataset
+            return self.reply(dataset)
+        dataset_id, action = parts[0], parts[1]
+        if action == "documents":
+            message = BytesParser(policy=policy.default).parsebytes(
+                f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + self.body())
+            parts = list(message.iter_parts())
+            if any("reject" in part.get_filename() for part in parts):
+                return self.reply(code=101, message="This type of file has not been supported yet!")
+            uploaded = []
+            for part in parts:
+                content = part.get_payload(decode=True)
+                doc = {"id": new_id(), "name": part.get_filename(), "dataset_id": dataset_id, "size": len(content),
+                       "run": "UNSTART", "progress": 0.0, "chunk_count": 0, "token_count": 0, "meta_fields": {},
+                       "polls": 0}
+                server.documents[doc["id"]] = doc
+                uploaded.append({k: v for k, v in doc.items() if k != "polls"})
+            server.datasets[dataset_id]["document_count"] += len(uploaded)
+            return self.reply(uploaded)
+        if action == "chunks":
+            for doc_id in self.json_body()["document_ids"]:
+                doc = server.documents[doc_id]
+                doc.update(run="RUNNING", progress=0.0, polls=0)
+            return self.reply()
+        self.reply(code=100, message="Unknown action")
+
+    def delete_datasets(self, parts, query):
+        server = self.server
+        ids = self.json_body().get("ids") or []
+        if parts and parts[1] == "documents":
+            for doc_id in ids:
+                server.documents.pop(doc_id, None)
+            server.datasets[parts[0]]["document_count"] -= len(ids)
+        else:
+            for dataset_id in ids:
+                server.datasets.pop(dataset_id, None)
+        self.reply()
+
+    def put_datasets(self, parts, query):
+        doc = self.server.documents.get(parts[2]) if len(parts) == 3 and parts[1] == "documents" else None
+        if doc is None:
+            return self.reply(code=102, message="The dataset doesn't own the document.")
+        request = self.json_body()
+        if "meta_fields" in request:
+            doc["meta_fields"] = request["meta_fields"]
+        self.reply({k: v for k, v in doc.items() if k != "polls"})
+
+    # Chats and sessions
+
+    def get_chats(self, parts, query):
+        server = self.server
+        if not parts:
+            chats = by_name(server.chats.values(), query)
+            if chats is None:
+                return self.reply(code=102, message="The chat doesn't exist")
+            return self.reply(chats)
+        sessions = by_name([s for s in server.sessions.values() if s["chat_id"] == parts[0]], query)
+        if sessions is None:
+            return self.reply(code=102, message="The session doesn't exist")
+        self.reply(sessions)
+
+    def post_chats(self, parts, query):
+        server = self.server
+        request = self.json_body()
+        if not parts:
+            datasets = [{"id": i, "name": server.datasets[i]["name"]} for i in request.get("dataset_ids") or []]
+            chat = {"id": new_id(), "name": request["name"], "datasets": datasets}
+            server.chats[chat["id"]] = chat
+            return self.reply(chat)
+        if parts[1] == "sessions":
+            session = {"id": new_id(), "name": request.get("name", "New session"), "chat_id": parts[0], "messages": []}
+            server.sessions[session["id"]] = session
+            return self.reply(session)
+        if parts[1] == "completions":
+            return self.reply({"answer": f"Mock answer to: {request.get('question')}", "reference": {},
+                               "session_id": request.get("session_id")})
+        self.reply(code=100, message="Unknown action")
+
+    def put_chats(self, parts, query):
+        server = self.server
+        request = self.json_body()
+        if "dataset_ids" in request:
+            server.chats[parts[0]]["datasets"] = [{"id": i, "name": server.datasets[i]["name"]}
+                                                  for i in request["dataset_ids"]]
+        self.reply()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="In-memory RAGFlow API mock for local testing")
+    parser.add_argument("--port", type=int, default=9380)
+    parser.add_argument("--parse-polls", type=int, default=2, help="Status listings before a document is parsed")
+    args = parser.parse_args()
+
+    server = MockRAGFlowServer(("127.0.0.1", args.port), args.parse_polls)
+    print(f"Mock RAGFlow server listening on {server.base_url}")
+    server.serve_forever()
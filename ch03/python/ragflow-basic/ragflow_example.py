@@ -10,10 +10,11 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
+import argparse
 import os
-import time
 from ragflow_sdk import RAGFlow
 from dotenv import load_dotenv
+from bulk_loader import BulkLoader, get_or_create_chat, get_or_create_dataset, get_or_create_session, iter_files
 
 # Load environment variables from .env file
 load_dotenv()
@@ -24,52 +25,42 @@ BASE_URL = os.getenv("RAGFLOW_BASE_URL", "http://localhost:9380")
 
 rag = RAGFlow(api_key=API_KEY, base_url=BASE_URL)
 
+# Datasets, assistants, and sessions are looked up by name, and only created if
+# they do not exist yet, so running the script again reuses them
+DATASET_NAME = "MyQuickstartDataset"
+ASSISTANT_NAME = "MyAssistant"
+SESSION_NAME = "MySession"
 
-def main():
+
+def main(docs_dir=None, patterns=("*",)):
     try:
         # 2. Define the embedding model
         # Note: Ensure this model is enabled in your RAGFlow UI under 'Model Providers'
         embedding_model = "gemini-embedding-001@Google"
 
-        # 3. Create a dataset
-        dataset_name = "MyQuickstartDataset"
-        print(f"Creating dataset '{dataset_name}' using model: {embedding_model}...")
-        dataset = rag.create_dataset(
-            name=dataset_name,
-            embedding_model=embedding_model
-        )
-        print(f"Dataset created: {dataset.name} (ID: {dataset.id})")
-
-        # 4. Upload a document
-        # We'll use this script itself as a sample document
-        file_path = __file__
-        print(f"Uploading document: {file_path}...")
-        with open(file_path, "rb") as f:
-            blob = f.read()
-
-        uploaded_docs = dataset.upload_documents([
-            {"display_name": "ragflow_example.py", "blob": blob}
-        ])
-        doc_ids = [doc.id for doc in uploaded_docs]
-        print(f"Uploaded document IDs: {doc_ids}")
-
-        # 5. Parse the document and wait for completion
-        print("Starting parsing... this may take a minute.")
-        dataset.parse_documents(doc_ids)
-        print("Parsing complete.")
-
-        # 6. Create a chat assistant
-        assistant_name = f"MyAssistant_{int(time.time())}"
-        print(f"Creating chat assistant '{assistant_name}'...")
-        assistant = rag.create_chat(
-            name=assistant_name,
-            dataset_ids=[dataset.id]
-        )
-        print(f"Assistant created: {assistant.name}")
-
-        # 7. Start a conversation
-        print("Starting conversation...")
-        session = assistant.create_session()
+        # 3. Get (or create) a dataset
+        dataset, created = get_or_create_dataset(rag, DATASET_NAME, embedding_model)
+        print(f"Dataset {'created' if created else 'reused'}: {dataset.name} (ID: {dataset.id})")
+
+        # 4. Upload and parse the documents
+        # By default, we'll use this script itself as a sample document. Files are
+        # uploaded in batches, and files already in the dataset are skipped
+        paths = iter_files(docs_dir, patterns) if docs_dir else [__file__]
+        loader = BulkLoader(dataset, root=docs_dir)
+        print("Uploading and parsing documents... this may take a minute.")
+        report = loader.load(paths, on_progress=lambda p: print(
+            f"  parsed: {p['done']}, failed: {p['failed']}, pending: {p['pending']}"))
+        print(f"Uploaded {report['uploaded']} documents in {report['upload_requests']} requests "
+              f"({report['skipped']} already in the dataset, {report['replaced']} replaced). "
+              f"Parsed: {report['parsed']}, failed: {report['failed']} ({report['seconds']:.1f}s)")
+
+        # 5. Get (or create) a chat assistant
+        assistant, created = get_or_create_chat(rag, ASSISTANT_NAME, [dataset.id])
+        print(f"Assistant {'created' if created else 'reused'}: {assistant.name}")
+
+        # 6. Start (or continue) a conversation
+        session, created = get_or_create_session(assistant, SESSION_NAME)
+        print(f"Session {'created' if created else 'reused'}: {session.name}")
         question = "What does the 'main' function do in the uploaded script?"
         print(f"Asking: {question}")
 
@@ -87,4 +78,8 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="RAGFlow example with bulk document loading")
+    parser.add_argument("--docs", help="Directory of documents to load (default: this script)")
+    parser.add_argument("--pattern", action="append", help="File name pattern to load, e.g. '*.pdf' (repeatable)")
+    args = parser.parse_args()
+    main(args.docs, tuple(args.pattern or ["*"]))
@@ -0,0 +1,122 @@
+from importlib import util
+from pathlib import Path
+import tempfile
+import threading
+import unittest
+
+from ragflow_sdk import RAGFlow
+
+
+def load_module(name):
+    path = Path(__file__).with_name(f"{name}.py")
+    spec = util.spec_from_file_location(name, path)
+    module = util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class BulkLoaderTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.module = load_module("bulk_loader")
+        cls.mock = load_module("mock_server")
+
+    def setUp(self):
+        self.server = self.mock.MockRAGFlowServer(parse_polls=2)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.rag = RAGFlow(api_key="test", base_url=self.server.base_url)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.docs = Path(tmp.name)
+
+    def write_docs(self, names):
+        for name in names:
+            (self.docs / name).write_text(f"Contents of {name}\n", encoding="utf-8")
+
+    def loader(self, dataset, **kwargs):
+        return self.module.BulkLoader(dataset, sleep=lambda seconds: None, root=str(self.docs), **kwargs)
+
+    def test_directory_is_uploaded_in_batches_and_parsed(self):
+        self.write_docs([f"doc{i}.txt" for i in range(9)] + ["will-fail.txt"])
+        (self.docs / "sub").mkdir()
+        self.write_docs(["sub/nested.md"])
+        dataset, _ = self.module.get_or_create_dataset(self.rag, "docs")
+
+        report = self.loader(dataset, batch_files=4).load(self.module.iter_files(str(self.docs), ["*.txt", "*.md"]))
+
+        self.assertEqual((report["uploaded"], report["upload_requests"]), (11, 3))
+        self.assertEqual((report["parsed"], report["failed"]), (10, 1))
+        self.assertEqual(self.server.counts["POST /datasets/{id}/chunks"], 3)
+        self.assertLessEqual(report["status_polls"], 3)
+
+    def test_documents_are_listed_page_by_page(self):
+        self.write_docs([f"doc{i}.txt" for i in range(10)])
+        dataset, _ = self.module.get_or_create_dataset(self.rag, "docs")
+        self.loader(dataset).upload(self.module.iter_files(str(self.docs)))
+
+        documents = self.module.list_all_documents(dataset, page_size=3, workers=2)
+
+        self.assertEqual(sorted(doc.name for doc in documents), sorted(f"doc{i}.txt" for i in range(10)))
+
+    def test_second_run_reuses_everything_and_uploads_only_changes(self):
+        self.write_docs(["a.txt", "b.txt"])
+        dataset, created = self.module.get_or_create_dataset(self.rag, "docs")
+        self.loader(dataset).load(self.module.iter_files(str(self.docs)))
+        chat, _ = self.module.get_or_create_chat(self.rag, "assistant", [dataset.id])
+        self.module.get_or_create_session(chat, "session")
+
+        (self.docs / "b.txt").write_text("Contents of b.txt, edited\n", encoding="utf-8")
+        dataset, dataset_created = self.module.get_or_create_dataset(self.rag, "docs")
+        report = self.loader(dataset).load(self.module.iter_files(str(self.docs)))
+        chat, chat_created = self.module.get_or_create_chat(self.rag, "assistant", [dataset.id])
+        _, session_created = self.module.get_or_create_session(chat, "session")
+
+        self.assertEqual((created, dataset_created, chat_created, session_created), (True, False, False, False))
+        self.assertEqual((report["skipped"], report["replaced"], report["uploaded"]), (1, 1, 1))
+        self.assertEqual(len(self.server.documents), 2)
+        self.assertEqual(self.server.counts["POST /datasets"], 1)
+        self.assertEqual(self.server.counts["POST /chats"], 1)
+
+    def test_files_are_identified_by_relative_path_and_contents(self):
+        (self.docs / "en").mkdir()
+        (self.docs / "es").mkdir()
+        self.write_docs(["en/guide.md", "es/guide.md"])
+        dataset, _ = self.module.get_or_create_dataset(self.rag, "docs")
+        self.loader(dataset).load(self.module.iter_files(str(self.docs)))
+
+        (self.docs / "es" / "guide.md").write_text("Contents of EN/guide.md\n", encoding="utf-8")  # same size
+        report = self.loader(dataset).load(self.module.iter_files(str(self.docs)))
+
+        self.assertEqual((report["skipped"], report["replaced"], report["uploaded"]), (1, 1, 1))
+        paths = sorted(doc["meta_fields"]["path"] for doc in self.server.documents.values())
+        self.assertEqual(paths, ["en/guide.md", "es/guide.md"])
+
+    def test_failed_upload_keeps_the_old_document(self):
+        self.write_docs(["a.txt", "reject.txt"])
+        dataset, _ = self.module.get_or_create_dataset(self.rag, "docs")
+        loader = self.loader(dataset)
+        loader.load([self.docs / "a.txt"])
+        old_ids = set(self.server.documents)
+
+        (self.docs / "a.txt").write_text("Contents of a.txt, edited\n", encoding="utf-8")
+        with self.assertRaises(Exception):
+            self.loader(dataset).upload(self.module.iter_files(str(self.docs)))
+
+        self.assertEqual(set(self.server.documents), old_ids)
+
+    def test_only_not_found_errors_mean_missing(self):
+        def unavailable(name):
+            raise Exception("Connection reset by peer")
+
+        def unknown(name):
+            raise Exception("You don't own the dataset docs.")
+
+        self.assertIsNone(self.module.find_by_name(unknown, "docs"))
+        with self.assertRaises(Exception):
+            self.module.find_by_name(unavailable, "docs")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+"""
+(C) Copyright 2026 Boni Garcia (https://bonigarcia.github.io/)
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+ http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+from pageindex.errors import PageIndexAPIError
+
+
+def file_digest(path: str, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def count_nodes(tree: Any) -> int:
+    """Number of nodes in a PageIndex tree (a node or a list of nodes, with children in "nodes")."""
+    if isinstance(tree, list):
+        return sum(count_nodes(node) for node in tree)
+    if isinstance(tree, dict):
+        return 1 + count_nodes(tree.get("nodes", []))
+    return 0
+
+
+def is_retryable(error: Exception) -> bool:
+    status = getattr(error, "status_code", None)
+    return status == 429 or (status is not None and status >= 500)
+
+
+class TreeCache:
+    """Trees of indexed documents, stored as one JSON file per file hash."""
+
+    def __init__(self, path: str = ".pageindex_cache"):
+        self.path = Path(path)
+
+    def get(self, digest: str) -> Optional[Dict[str, Any]]:
+        try:
+            return json.loads((self.path / f"{digest}.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def put(self, digest: str, entry: Dict[str, Any]):
+        self.path.mkdir(parents=True, exist_ok=True)
+        tmp = self.path / f"{digest}.json.tmp"
+        tmp.write_text(json.dumps(entry, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.path / f"{digest}.json")
+
+
+class AsyncPageIndex:
+    """
+    An asyncio wrapper of `PageIndexClient` for indexing many documents at once.
+
+    The SDK is synchronous, so each request runs in a worker thread. At most
+    `max_concurrency` requests are in flight at any time, across all documents. While a
+    document is being indexed, its status is polled with exponential backoff and jitter
+    (the wait doubles from `initial_delay` up to `max_delay`, and is randomized so that
+    the polls of documents submitted together spread out). Rate-limited (429) and server
+    (5xx) errors are retried the same way.
+
+    Completed trees are cached locally by the SHA-256 of the file, so a file that was
+    already indexed is neither uploaded nor indexed again.
+    """
+
+    def __init__(
+        self,
+        client,
+        cache: Optional[TreeCache] = None,
+        max_concurrency: int = 4,
+        initial_delay: float = 1.0,
+        max_delay: float = 30.0,
+        timeout: float = 900.0,
+        max_retries: int = 5,
+        sleep: Callable[[float], Any] = asyncio.sleep,
+    ):
+        self.client = client
+        self.cache = cache or TreeCache()
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.sleep = sleep
+        self.stats = {"cached": 0, "submitted": 0, "polls": 0, "retries": 0}
+
+    def backoff(self, attempt: int) -> float:
+        """Exponential backoff with "equal jitter": between half and all of the exponential delay."""
+        delay = min(self.max_delay, self.initial_delay * 2 ** attempt)
+        return random.uniform(delay / 2, delay)
+
+    async def call(self, method: str, *args, **kwargs) -> Any:
+        """Runs a client method in a worker thread under the concurrency cap, retrying 429 and 5xx errors."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self.semaphore:
+                    return await asyncio.to_thread(getattr(self.client, method), *args, **kwargs)
+            except Exception as error:
+                if not is_retryable(error) or attempt == self.max_retries:
+                    raise
+                self.stats["retries"] += 1
+                await self.sleep(self.backoff(attempt))
+        raise AssertionError("unreachable")
+
+    async def wait_until_indexed(self, doc_id: str) -> Dict[str, Any]:
+        deadline = time.monotonic() + self.timeout
+        attempt = 0
+        while True:
+            info = await self.call("get_document", doc_id)
+            self.stats["polls"] += 1
+            status = info.get("status")
+            if status == "completed":
+                return info
+            if status == "failed":
+                raise PageIndexAPIError(f"Indexing of document {doc_id} failed")
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Document {doc_id} was not indexed after {self.timeout:.0f}s")
+            await self.sleep(self.backoff(attempt))
+            attempt += 1
+
+    async def index_document(self, path: str) -> Dict[str, Any]:
+        """
+        The cache entry of an indexed document: path, hash, doc_id, tree, and whether it was cached.
+
+        The file is submitted and indexed only if its hash is not in the cache.
+        """
+        digest = await asyncio.to_thread(file_digest, path)
+        entry = self.cache.get(digest)
+        if entry is not None:
+            self.stats["cached"] += 1
+            return {**entry, "path": str(path), "cached": True}
+
+        doc_id = (await self.call("submit_document", str(path)))["doc_id"]
+        self.stats["submitted"] += 1
+        await self.wait_until_indexed(doc_id)
+        tree = await self.call("get_tree", doc_id)
+        entry = {"path": str(path), "sha256": digest, "doc_id": doc_id, "tree": tree}
+        self.cache.put(digest, entry)
+        return {**entry, "cached": False}
+
+    async def index_documents(self, paths: Sequence[str]) -> List[Union[Dict[str, Any], Exception]]:
+        """Indexes all documents concurrently; a document that fails gets its exception in the result."""
+        return await asyncio.gather(*(self.index_document(path) for path in paths), return_exceptions=True)
+
+    async def chat_completions(self, messages: List[Dict[str, str]], doc_id: Union[str, List[str]]) -> Dict[str, Any]:
+        return await self.call("chat_completions", messages=messages, doc_id=doc_id)
@@ -0,0 +1,142 @@
+"""
+(C) Copyright 2026 Boni Garcia (https://bonigarcia.github.io/)
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+ http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+
+class StubPageIndexServer(ThreadingHTTPServer):
+    """
+    A local stand-in for the PageIndex cloud API, for testing without an API key.
+
+    It accepts uploads (POST /doc/), reports a document as "processing" for its first
+    `polls_until_ready` status requests (GET /doc/<id>/metadata/) and "completed" after
+    that, returns a small tree (GET /doc/<id>/?type=tree), and answers chat completions.
+    Every `rate_limit_every`-th request gets a 429. It records the number of requests of
+    each kind and the highest number of requests it served at the same time.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 0), latency: float = 0.0, polls_until_ready: int = 2,
+                 rate_limit_every: int = 0):
+        super().__init__(address, StubHandler)
+        self.latency = latency
+        self.polls_until_ready = polls_until_ready
+        self.rate_limit_every = rate_limit_every
+        self.counts = {"requests": 0, "uploads": 0, "polls": 0, "trees": 0, "chats": 0, "rate_limited": 0}
+        self.polls_by_doc = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start_request(self) -> bool:
+        """Counts a request; returns True if it should be rate limited."""
+        with self._lock:
+            self.counts["requests"] += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            limited = self.rate_limit_every > 0 and self.counts["requests"] % self.rate_limit_every == 0
+            self.counts["rate_limited"] += limited
+            return limited
+
+    def end_request(self):
+        with self._lock:
+            self.in_flight -= 1
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status: int, body: dict):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def handle_request(self, method: str):
+        server = self.server
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        try:
+            if server.start_request():
+                self.send_json(429, {"detail": "Rate limit reached (stub)"})
+                return
+            time.sleep(server.latency)
+            path = urlparse(self.path).path.strip("/").split("/")
+            if method == "POST" and path == ["doc"]:
+                with server._lock:
+                    server.counts["uploads"] += 1
+                    doc_id = f"pi-stub{server.counts['uploads']}"
+                    server.polls_by_doc[doc_id] = 0
+                self.send_json(200, {"doc_id": doc_id, "size": len(body)})
+            elif method == "GET" and len(path) == 3 and path[0] == "doc" and path[2] == "metadata":
+                with server._lock:
+                    server.counts["polls"] += 1
+                    server.polls_by_doc[path[1]] = polls = server.polls_by_doc.get(path[1], 0) + 1
+                status = "completed" if polls > server.polls_until_ready else "processing"
+                self.send_json(200, {"id": path[1], "name": "sample.pdf", "status": status, "pageNum": 2})
+            elif method == "GET" and len(path) == 2 and path[0] == "doc":
+                with server._lock:
+                    server.counts["trees"] += 1
+                self.send_json(200, {"doc_id": path[1], "status": "completed", "retrieval_ready": True,
+                                     "result": tree_for(path[1])})
+            elif method == "POST" and path == ["chat", "completions"]:
+                with server._lock:
+                    server.counts["chats"] += 1
+                question = json.loads(body or b"{}")["messages"][-1]["content"]
+                self.send_json(200, {"choices": [{"message": {"role": "assistant",
+                                                              "content": f"Stub answer to: {question}"}}]})
+            else:
+                self.send_json(404, {"detail": f"Unknown path {self.path}"})
+        finally:
+            server.end_request()
+
+    def do_GET(self):
+        self.handle_request("GET")
+
+    def do_POST(self):
+        self.handle_request("POST")
+
+
+def tree_for(doc_id: str) -> list:
+    return [{
+        "title": f"Document {doc_id}", "node_id": "0000", "start_index": 1, "end_index": 2,
+        "nodes": [
+            {"title": "Introduction", "node_id": "0001", "start_index": 1, "end_index": 1, "nodes": []},
+            {"title": "Synchronization", "node_id": "0002", "start_index": 2, "end_index": 2, "nodes": []},
+        ],
+    }]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="PageIndex API stub server for local testing")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.1, help="Seconds to wait before answering")
+    parser.add_argument("--polls-until-ready", type=int, default=2, help="Status requests before a document is ready")
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="Answer every N-th request with a 429 (0: never)")
+    args = parser.parse_args()
+
+    server = StubPageIndexServer(("127.0.0.1", args.port), args.latency, args.polls_until_ready, args.rate_limit_every)
+    print(f"Stub PageIndex server listening on {server.base_url}")
+    server.serve_forever()
@@ -0,0 +1,99 @@
+from importlib import util
+from pathlib import Path
+import asyncio
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from pageindex import PageIndexClient
+
+
+def load_module(name):
+    path = Path(__file__).with_name(f"{name}.py")
+    spec = util.spec_from_file_location(name, path)
+    module = util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class AsyncPageIndexTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.module = load_module("async_pageindex")
+        cls.stub = load_module("stub_server")
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.dir = Path(self.tmp.name)
+        self.delays = []
+
+    def start_server(self, **kwargs):
+        server = self.stub.StubPageIndexServer(**kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def documents(self, count):
+        paths = []
+        for i in range(count):
+            path = self.dir / f"doc{i}.pdf"
+            shutil.copy(Path(__file__).with_name("sample.pdf"), path)
+            with open(path, "ab") as file:
+                file.write(f"% copy {i}\n".encode())
+            paths.append(str(path))
+        return paths
+
+    async def no_sleep(self, delay):
+        self.delays.append(delay)
+
+    def index(self, server, paths, **kwargs):
+        client = PageIndexClient(api_key="test")
+        client.BASE_URL = server.base_url
+        pageindex = self.module.AsyncPageIndex(client, self.module.TreeCache(str(self.dir / "cache")),
+                                               sleep=self.no_sleep, **kwargs)
+        return pageindex, asyncio.run(pageindex.index_documents(paths))
+
+    def test_documents_are_indexed_concurrently_under_the_cap(self):
+        server = self.start_server(latency=0.05, polls_until_ready=1)
+        paths = self.documents(6)
+
+        pageindex, results = self.index(server, paths, max_concurrency=2)
+
+        self.assertEqual([result["path"] for result in results], paths)
+        self.assertEqual(len({result["doc_id"] for result in results}), 6)
+        self.assertEqual(self.module.count_nodes(results[0]["tree"]["result"]), 3)
+        self.assertEqual((server.counts["uploads"], server.counts["trees"]), (6, 6))
+        self.assertEqual(server.max_in_flight, 2)
+
+    def test_cached_trees_skip_upload_and_indexing(self):
+        server = self.start_server()
+        paths = self.documents(2)
+        self.index(server, paths)
+
+        with open(paths[1], "ab") as file:
+            file.write(b"% edited\n")
+        pageindex, results = self.index(server, paths)
+
+        self.assertEqual([result["cached"] for result in results], [True, False])
+        self.assertEqual(pageindex.stats["submitted"], 1)
+        self.assertEqual(server.counts["uploads"], 3)
+
+    def test_polling_backs_off_and_rate_limits_are_retried(self):
+        server = self.start_server(polls_until_ready=4, rate_limit_every=3)
+
+        with mock.patch.object(self.module.random, "uniform", side_effect=lambda low, high: high):
+            pageindex, results = self.index(server, self.documents(1), initial_delay=1.0, max_delay=4.0)
+
+        self.assertFalse(isinstance(results[0], Exception))
+        self.assertGreater(pageindex.stats["retries"], 0)
+        poll_delays = [d for d in self.delays if d > 1.0]
+        self.assertEqual(poll_delays, sorted(poll_delays))
+        self.assertLessEqual(max(self.delays), 4.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
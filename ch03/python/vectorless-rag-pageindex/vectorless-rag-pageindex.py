@@ -10,12 +10,16 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
+import argparse
+import asyncio
 import os
-import time
 from pageindex import PageIndexClient
+from async_pageindex import AsyncPageIndex, TreeCache, count_nodes
 
+CACHE_DIR = os.getenv("PAGEINDEX_CACHE_DIR", ".pageindex_cache")
 
-def main():
+
+async def main(pdf_paths, query, concurrency):
     # Initialize the PageIndex client
     # You can get an API key from https://dash.pageindex.ai/
     api_key = os.getenv("PAGEINDEX_API_KEY")
@@ -24,51 +28,52 @@ def main():
         return
 
     client = PageIndexClient(api_key=api_key)
+    if os.getenv("PAGEINDEX_BASE_URL"):
+        # For example, the local stub server (stub_server.py)
+        client.BASE_URL = os.getenv("PAGEINDEX_BASE_URL")
 
-    # Path to the local PDF file
-    pdf_path = "sample.pdf"
-    print(f"--- Indexing document: {pdf_path} ---")
-
-    # 1. Upload and index the document
-    # submit_document returns a dictionary containing the doc_id
-    upload_result = client.submit_document(pdf_path)
-    doc_id = upload_result.get("doc_id")
-
-    print(f"Document submitted. ID: {doc_id}")
-    print("Waiting for indexing to complete...")
+    # 1. Upload and index the documents
+    # The documents are submitted concurrently, and their status is polled with
+    # exponential backoff. Trees already indexed (same file hash) are read from
+    # the local cache, so they are neither uploaded nor indexed again
+    pageindex = AsyncPageIndex(client, TreeCache(CACHE_DIR), max_concurrency=concurrency)
+    print(f"--- Indexing {len(pdf_paths)} document(s) ---")
+    results = await pageindex.index_documents(pdf_paths)
 
-    # Poll for completion status
-    while True:
-        doc_info = client.get_document(doc_id)
-        status = doc_info.get("status")
-        if status == "completed":
-            break
-        elif status == "failed":
-            print("Indexing failed.")
-            return
-        time.sleep(2)
-
-    print("Indexing complete.\n")
+    doc_ids = []
+    for path, result in zip(pdf_paths, results):
+        if isinstance(result, Exception):
+            print(f"{path}: indexing failed ({result})")
+            continue
+        source = "cached tree" if result["cached"] else "indexed"
+        nodes = count_nodes(result["tree"].get("result", []))
+        print(f"{path}: {result['doc_id']} ({source}, {nodes} nodes)")
+        doc_ids.append(result["doc_id"])
+    stats = pageindex.stats
+    print(f"Submitted: {stats['submitted']}, from cache: {stats['cached']}, "
+          f"status polls: {stats['polls']}, retries: {stats['retries']}\n")
+    if not doc_ids:
+        return
 
     # 2. Reasoning-based Retrieval and Generation
-    query = "What happens if the same note is changed on two different devices?"
     print(f"Query: {query}")
 
     # chat_completions performs reasoning-based retrieval and answer generation
     # It follows an interface similar to OpenAI's chat completions
-    response = client.chat_completions(
+    response = await pageindex.chat_completions(
         messages=[{"role": "user", "content": query}],
-        doc_id=doc_id
+        doc_id=doc_ids[0] if len(doc_ids) == 1 else doc_ids,
     )
 
     print("\n--- Answer ---")
     answer = response["choices"][0]["message"]["content"]
     print(answer)
 
-    # Optional: Retrieve the tree structure or reasoning details if needed
-    tree = client.get_tree(doc_id)
-    print(f"\nDocument Tree structure retrieved: {len(tree)} nodes found.")
-
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Vectorless RAG with PageIndex")
+    parser.add_argument("pdf_paths", nargs="*", default=["sample.pdf"], help="PDF files to index (default: sample.pdf)")
+    parser.add_argument("--query", default="What happens if the same note is changed on two different devices?")
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum concurrent requests to PageIndex")
+    args = parser.parse_args()
+    asyncio.run(main(args.pdf_paths, args.query, args.concurrency))
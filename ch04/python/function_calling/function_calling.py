@@ -10,10 +10,15 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
+import functools
 import json
+import os
 from typing import Any, Dict
 from openai import OpenAI
 
+from token_accounting import TokenEstimator
+from tool_dispatcher import ToolCall, ToolDispatcher
+
 client = OpenAI()  # OPENAI_API_KEY should be set as an environment variable
 
 
@@ -77,13 +82,27 @@ TOOLS = [
 ]
 
 
+# ---------------------------------------------------
+# Tool dispatcher: concurrent execution and memoization
+# ---------------------------------------------------
+# The function calls of one model turn run concurrently, each one with its own timeout.
+# Weather results are reused for 10 minutes, so asking again about the same location
+# does not run the lookup again.
+DISPATCHER = ToolDispatcher()
+DISPATCHER.register("get_weather", get_weather, timeout=5.0, ttl=600.0)
+
+
 def route_function_call(name: str, arguments: Dict[str, Any]) -> Any:
     """
-    Dispatch model tool calls to local Python functions.
+    Dispatch a single model tool call to its local Python function.
     """
-    if name == "get_weather":
-        return get_weather(arguments["location"])
-    raise ValueError(f"Unknown function requested by model: {name}")
+    return DISPATCHER.call(name, arguments)
+
+
+@functools.cache
+def get_estimator(model: str) -> TokenEstimator:
+    """Local token estimator of a model; tool-schema costs and calibrations persist in TOKEN_CACHE_PATH."""
+    return TokenEstimator(model, cache_path=os.getenv("TOKEN_CACHE_PATH", ".token_cache.json"))
 
 
 def query_model(prompt: str, model: str = "gpt-4o-mini") -> str:
@@ -92,18 +111,29 @@ def query_model(prompt: str, model: str = "gpt-4o-mini") -> str:
     """
 
     # ------------------------------------------------
-    # Step 1: Count tokens for the exact request shape
+    # Step 1: Estimate tokens for the exact request shape
     # ------------------------------------------------
     # Tool definitions (function schemas, MCP servers, etc.) add tokens to the context.
-    # We can count them together with the user prompt as follows:
+    # The token-counting endpoint can count them together with the user prompt:
     # https://developers.openai.com/api/docs/guides/token-counting
-    token_count = client.responses.input_tokens.count(
-        model=model,
-        tools=TOOLS,
-        input=prompt,
+    # Calling it before every request costs a network round trip, so the estimate is
+    # computed locally: the cost of each tool schema is counted once and cached by its
+    # hash, and the remote counter is called only to calibrate a new model and tool set.
+    estimator = get_estimator(model)
+    estimator.calibrate(
+        prompt,
+        TOOLS,
+        lambda: client.responses.input_tokens.count(
+            model=model,
+            tools=TOOLS,
+            input=prompt,
+        ).input_tokens,
     )
+    estimated_tokens = estimator.estimate(prompt, TOOLS)
     print("== 1. TOKEN COUNTING ==")
-    print(f"Estimated input tokens: {token_count.input_tokens}\n")
+    print(f"Estimated input tokens: {estimated_tokens}")
+    print(f"(tools: {estimator.tools_tokens(TOOLS)}, calibration offset: {estimator.offset(TOOLS):+d}, "
+          f"remote counts: {estimator.stats['remote_counts']})\n")
 
     # ----------------------------------------------------------
     # Step 2: Send the request and force at least one tool call
@@ -118,7 +148,12 @@ def query_model(prompt: str, model: str = "gpt-4o-mini") -> str:
         input=prompt,
     )
 
+    # The usage of the real response tells how far off the estimate was.
+    drift = estimator.record(estimated_tokens, response.usage)
+
     print("== 2. INITIAL MODEL RESPONSE ==")
+    if drift is not None:
+        print(f"Actual input tokens: {estimated_tokens + drift} (drift {drift:+d}; {estimator.drift_summary()})")
     print("Raw response output items:")
     for i, item in enumerate(response.output, start=1):
         print(f"\n[{i}] type={item.type}")
@@ -136,27 +171,29 @@ def query_model(prompt: str, model: str = "gpt-4o-mini") -> str:
     # items, then appending a "function_call_output" item with the same call_id.
     input_items = list(response.output)
 
-    for item in response.output:
-        if item.type != "function_call":
-            continue
-
-        function_name = item.name
-        function_args = json.loads(item.arguments)
+    # The calls of a turn are independent of each other, so they are dispatched
+    # together and run concurrently; their results are sent back in the same order.
+    calls = [
+        ToolCall(item.call_id, item.name, json.loads(item.arguments))
+        for item in response.output
+        if item.type == "function_call"
+    ]
 
+    for result in DISPATCHER.dispatch(calls):
+        source = "cache" if result.cached else f"{result.seconds * 1000:.1f} ms"
         print("== 3. FUNCTION CALLING ==")
-        print(f"Function name : {function_name}")
-        print(f"Arguments     : {json.dumps(function_args, indent=2)}")
-        result = route_function_call(function_name, function_args)
-        print("Function result:")
-        print(json.dumps(result, indent=2))
+        print(f"Function name : {result.name}")
+        print(f"Arguments     : {json.dumps(result.arguments, indent=2)}")
+        print(f"Function result ({source}):")
+        print(json.dumps(result.output, indent=2))
         print()
 
         # Send function result back to the model.
         input_items.append(
             {
                 "type": "function_call_output",
-                "call_id": item.call_id,
-                "output": json.dumps(result),
+                "call_id": result.call_id,
+                "output": json.dumps(result.output),
             }
         )
 
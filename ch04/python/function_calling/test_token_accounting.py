@@ -0,0 +1,118 @@
+from importlib import util
+from pathlib import Path
+from types import SimpleNamespace
+import tempfile
+import threading
+import time
+import unittest
+
+
+def load_accounting_module():
+    path = Path(__file__).with_name("token_accounting.py")
+    spec = util.spec_from_file_location("token_accounting", path)
+    module = util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+WEATHER_TOOL = {
+    "type": "function",
+    "name": "get_weather",
+    "description": "Get the current weather in a location",
+    "parameters": {
+        "type": "object",
+        "properties": {"location": {"type": "string"}},
+        "required": ["location"],
+    },
+}
+
+
+class WordCounter:
+    """One token per word, and a record of every text counted."""
+
+    def __init__(self):
+        self.counted = []
+
+    def __call__(self, text):
+        self.counted.append(text)
+        return len(text.split())
+
+
+class TokenEstimatorTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.module = load_accounting_module()
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.cache_path = str(Path(self.tmp.name) / "tokens.json")
+        self.counter = WordCounter()
+
+    def estimator(self):
+        return self.module.TokenEstimator("gpt-test", ("words", self.counter), self.cache_path)
+
+    def test_tool_schema_costs_are_counted_once_and_persisted(self):
+        first = self.estimator().estimate("What is the weather in London?", [WEATHER_TOOL])
+        self.counter.counted.clear()
+
+        estimator = self.estimator()
+        second = estimator.estimate("What is the weather in London?", [WEATHER_TOOL])
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.counter.counted, ["What is the weather in London?"])
+        self.assertEqual(estimator.stats["schema_hits"], 1)
+
+    def test_a_changed_schema_is_counted_again(self):
+        estimator = self.estimator()
+        before = estimator.tool_tokens(WEATHER_TOOL)
+        changed = {**WEATHER_TOOL, "description": "Get the current weather and forecast in a city"}
+
+        self.assertGreater(estimator.tool_tokens(changed), before)
+        self.assertEqual(estimator.stats["schema_misses"], 2)
+
+    def test_remote_counter_is_only_used_for_calibration(self):
+        remote_calls = []
+
+        def count_remote():
+            remote_calls.append(1)
+            return 80
+
+        estimator = self.estimator()
+        local = estimator.estimate("Weather in Paris?", [WEATHER_TOOL])
+        estimator.calibrate("Weather in Paris?", [WEATHER_TOOL], count_remote)
+        self.assertEqual(estimator.estimate("Weather in Paris?", [WEATHER_TOOL]), 80)
+
+        reloaded = self.estimator()
+        reloaded.calibrate("Weather in Rome?", [WEATHER_TOOL], count_remote)
+        self.assertEqual(len(remote_calls), 1)
+        self.assertEqual(reloaded.offset([WEATHER_TOOL]), 80 - local)
+        self.assertEqual(reloaded.offset([]), 0)
+
+        drift = reloaded.record(80, SimpleNamespace(input_tokens=83))
+        self.assertEqual(drift, 3)
+        self.assertIsNone(reloaded.record(80, None))
+        self.assertIn("last drift +3 tokens", reloaded.drift_summary())
+
+    def test_concurrent_calibrations_call_the_remote_counter_once(self):
+        remote_calls = []
+
+        def count_remote():
+            remote_calls.append(1)
+            time.sleep(0.05)
+            return 80
+
+        estimator = self.estimator()
+        threads = [threading.Thread(target=estimator.calibrate, args=("Weather in Paris?", [WEATHER_TOOL], count_remote))
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(remote_calls), 1)
+        self.assertEqual(estimator.stats["remote_counts"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
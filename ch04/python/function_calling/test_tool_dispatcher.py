@@ -0,0 +1,119 @@
+from importlib import util
+from pathlib import Path
+import asyncio
+import time
+import unittest
+
+
+def load_dispatcher_module():
+    path = Path(__file__).with_name("tool_dispatcher.py")
+    spec = util.spec_from_file_location("tool_dispatcher", path)
+    module = util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class ToolDispatcherTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.module = load_dispatcher_module()
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.dispatcher = self.module.ToolDispatcher(clock=self.clock)
+        self.addCleanup(self.dispatcher.close)
+        self.executed = []
+
+    def slow_lookup(self, location):
+        self.executed.append(location)
+        time.sleep(0.2)
+        return {"location": location}
+
+    async def async_lookup(self, location):
+        await asyncio.sleep(0.2)
+        return {"location": location, "async": True}
+
+    def call(self, call_id, name, **arguments):
+        return self.module.ToolCall(call_id, name, arguments)
+
+    def test_calls_of_a_turn_run_concurrently_and_keep_their_order(self):
+        self.dispatcher.register("sync_lookup", self.slow_lookup)
+        self.dispatcher.register("async_lookup", self.async_lookup)
+        calls = [self.call("a", "sync_lookup", location="Paris"),
+                 self.call("b", "async_lookup", location="Rome"),
+                 self.call("c", "sync_lookup", location="Oslo")]
+
+        start = time.perf_counter()
+        results = self.dispatcher.dispatch(calls)
+        elapsed = time.perf_counter() - start
+
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual([r.call_id for r in results], ["a", "b", "c"])
+        self.assertEqual(results[1].output, {"location": "Rome", "async": True})
+        self.assertEqual(sorted(self.executed), ["Oslo", "Paris"])
+
+    def test_repeated_calls_are_served_from_the_cache_until_the_ttl_expires(self):
+        self.dispatcher.register("get_weather", self.slow_lookup, ttl=600)
+
+        first = self.dispatcher.dispatch([self.call("1", "get_weather", location="london"),
+                                          self.call("2", "get_weather", location="london")])
+        second = self.dispatcher.dispatch([self.call("3", "get_weather", location="london")])
+        self.clock.now = 601
+        third = self.dispatcher.dispatch([self.call("4", "get_weather", location="london")])
+
+        self.assertEqual(self.executed, ["london", "london"])
+        self.assertEqual(first[1].output, {"location": "london"})
+        self.assertTrue(second[0].cached)
+        self.assertFalse(third[0].cached)
+        self.assertEqual(self.dispatcher.stats["coalesced"], 1)
+        self.assertEqual(self.dispatcher.stats["cache_hits"], 1)
+
+    def test_timeouts_and_errors_are_reported_to_the_model(self):
+        self.dispatcher.register("slow", self.slow_lookup, timeout=0.05, ttl=600)
+        self.dispatcher.register("async_slow", self.async_lookup, timeout=0.05)
+
+        results = self.dispatcher.dispatch([self.call("1", "slow", location="Paris"),
+                                            self.call("2", "async_slow", location="Rome"),
+                                            self.call("3", "slow", city="Paris"),
+                                            self.call("4", "missing")])
+
+        self.assertIn("timed out", results[0].output["error"])
+        self.assertIn("timed out", results[1].output["error"])
+        self.assertIn("TypeError", results[2].output["error"])
+        self.assertIn("Unknown function", results[3].output["error"])
+        self.assertEqual(self.dispatcher.cache, {})
+        self.assertEqual(self.dispatcher.stats["timeouts"], 2)
+
+    def test_cached_outputs_are_copies(self):
+        self.dispatcher.register("get_weather", self.slow_lookup, ttl=600)
+
+        first = self.dispatcher.dispatch([self.call("1", "get_weather", location="london")])
+        first[0].output["location"] = "changed by the caller"
+        second = self.dispatcher.dispatch([self.call("2", "get_weather", location="london")])
+        second[0].output["location"] = "changed again"
+        third = self.dispatcher.dispatch([self.call("3", "get_weather", location="london")])
+
+        self.assertEqual(third[0].output, {"location": "london"})
+        self.assertEqual(self.executed, ["london"])
+
+    def test_dispatch_works_inside_a_running_event_loop(self):
+        self.dispatcher.register("async_lookup", self.async_lookup)
+
+        async def caller():
+            return self.dispatcher.dispatch([self.call("1", "async_lookup", location="Rome")])
+
+        results = asyncio.run(caller())
+
+        self.assertEqual(results[0].output, {"location": "Rome", "async": True})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,190 @@
+"""
+(C) Copyright 2026 Boni Garcia (https://bonigarcia.github.io/)
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+ http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Approximate fixed costs of the way the API renders a prompt and its function
+# definitions for the model. The differences left are learned by calibration.
+MESSAGE_TOKENS = 3  # per input message
+REPLY_TOKENS = 3  # priming of the assistant reply
+FUNCTION_TOKENS = 7  # per function definition
+PROPERTY_TOKENS = 3  # per parameter
+ENUM_ITEM_TOKENS = 3  # per enum value
+TOOLS_END_TOKENS = 12  # once, if there are functions
+
+
+def default_tokenizer(model: str = "gpt-4o-mini") -> Tuple[str, Callable[[str], int]]:
+    """
+    (tokenizer name, token counter): tiktoken's encoding for the model when it is available,
+    or an estimate of ~4 characters per token. The name is part of the cache keys, so
+    costs counted with one tokenizer are never reused for the other.
+    """
+    try:
+        import tiktoken
+
+        encoding = tiktoken.encoding_for_model(model)
+        return encoding.name, lambda text: len(encoding.encode(text))
+    except Exception:  # tiktoken is not installed, or its encoding cannot be downloaded
+        return "chars/4", lambda text: len(text) // 4 + 1
+
+
+def schema_hash(value: Any) -> str:
+    """SHA-256 of the canonical JSON of a tool schema (or a list of them)."""
+    canonical = json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def read_input_tokens(usage: Any) -> Optional[int]:
+    """Input tokens from a Responses (`input_tokens`) or Chat Completions (`prompt_tokens`) usage object."""
+    for field in ("input_tokens", "prompt_tokens"):
+        value = getattr(usage, field, None)
+        if value is not None:
+            return value
+    return None
+
+
+class TokenEstimator:
+    """
+    Estimates the input tokens of a request locally, without calling the token-counting API.
+
+    The tool schemas of an application rarely change, so the cost of each one is counted
+    once and cached by the hash of its content, in memory and in a JSON file (`cache_path`).
+    Only the prompt is tokenized for each request.
+
+    The local count does not know every detail of how the API renders a request, so it is
+    calibrated: the first time a model is used with a set of tools, the remote counter is
+    called once, and the difference with the local estimate is stored as an offset that is
+    added to later estimates. Every real response can then be recorded to report the drift
+    between the estimate and the input tokens the API actually billed.
+    """
+
+    def __init__(
+        self,
+        model: str = "gpt-4o-mini",
+        tokenizer: Optional[Tuple[str, Callable[[str], int]]] = None,
+        cache_path: Optional[str] = ".token_cache.json",
+    ):
+        self.model = model
+        self.tokenizer_name, self.count_text = tokenizer or default_tokenizer(model)
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.cache: Dict[str, Dict[str, int]] = {"tools": {}, "calibration": {}}
+        self.drift: List[Tuple[int, int]] = []  # (estimated, actual) input tokens
+        self.stats = {"schema_hits": 0, "schema_misses": 0, "remote_counts": 0}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        if self.cache_path is None:
+            return
+        try:
+            data = json.loads(self.cache_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        for section in self.cache:
+            self.cache[section].update(data.get(section, {}))
+
+    def save(self):
+        if self.cache_path is None:
+            return
+        with self._lock:
+            payload = json.dumps(self.cache, indent=2, sort_keys=True)
+        tmp = self.cache_path.with_name(self.cache_path.name + ".tmp")
+        tmp.write_text(payload, encoding="utf-8")
+        os.replace(tmp, self.cache_path)
+
+    def schema_tokens(self, tool: Dict[str, Any]) -> int:
+        """Local count of one function definition (name, description, and each parameter)."""
+        parameters = tool.get("parameters") or {}
+        tokens = FUNCTION_TOKENS + self.count_text(f"{tool.get('name', '')}:{tool.get('description', '')}")
+        for key, prop in (parameters.get("properties") or {}).items():
+            tokens += PROPERTY_TOKENS + self.count_text(f"{key}:{prop.get('type', '')}:{prop.get('description', '')}")
+            for value in prop.get("enum") or []:
+                tokens += ENUM_ITEM_TOKENS + self.count_text(str(value))
+        return tokens
+
+    def tool_tokens(self, tool: Dict[str, Any]) -> int:
+        """Cost of one tool schema, counted once per schema content and tokenizer."""
+        key = f"{self.tokenizer_name}:{schema_hash(tool)}"
+        with self._lock:
+            cached = self.cache["tools"].get(key)
+            if cached is not None:
+                self.stats["schema_hits"] += 1
+                return cached
+            self.stats["schema_misses"] += 1
+        tokens = self.schema_tokens(tool)
+        with self._lock:
+            self.cache["tools"][key] = tokens
+        self.save()
+        return tokens
+
+    def tools_tokens(self, tools: Sequence[Dict[str, Any]]) -> int:
+        if not tools:
+            return 0
+        return sum(self.tool_tokens(tool) for tool in tools) + TOOLS_END_TOKENS
+
+    def prompt_tokens(self, prompt: str) -> int:
+        return MESSAGE_TOKENS + self.count_text(prompt) + REPLY_TOKENS
+
+    def calibration_key(self, tools: Sequence[Dict[str, Any]]) -> str:
+        return f"{self.model}:{self.tokenizer_name}:{schema_hash(list(tools))}"
+
+    def offset(self, tools: Sequence[Dict[str, Any]]) -> int:
+        return self.cache["calibration"].get(self.calibration_key(tools), 0)
+
+    def estimate(self, prompt: str, tools: Sequence[Dict[str, Any]] = ()) -> int:
+        """Estimated input tokens of a request with one user prompt and these tools."""
+        return self.prompt_tokens(prompt) + self.tools_tokens(tools) + self.offset(tools)
+
+    def is_calibrated(self, tools: Sequence[Dict[str, Any]]) -> bool:
+        return self.calibration_key(tools) in self.cache["calibration"]
+
+    def calibrate(self, prompt: str, tools: Sequence[Dict[str, Any]], count_remote: Callable[[], int]) -> int:
+        """
+        Calls the remote counter (for the same prompt and tools) unless this model and set
+        of tools is already calibrated, and stores the offset. Returns the offset.
+
+        The check and the update happen under the lock, so that threads calibrating the
+        same tools at the same time call the remote counter only once.
+        """
+        key = self.calibration_key(tools)
+        local = self.prompt_tokens(prompt) + self.tools_tokens(tools)
+        with self._lock:
+            offset = self.cache["calibration"].get(key)
+            if offset is not None:
+                return offset
+            offset = self.cache["calibration"][key] = count_remote() - local
+            self.stats["remote_counts"] += 1
+        self.save()
+        return offset
+
+    def record(self, estimated: int, usage: Any) -> Optional[int]:
+        """Records the actual input tokens of a response; returns the drift (actual - estimated)."""
+        actual = read_input_tokens(usage)
+        if actual is None:
+            return None
+        self.drift.append((estimated, actual))
+        return actual - estimated
+
+    def drift_summary(self) -> str:
+        if not self.drift:
+            return "no responses recorded"
+        errors = [actual - estimated for estimated, actual in self.drift]
+        relative = [abs(a - e) / a for e, a in self.drift if a]
+        mean_relative = sum(relative) / len(relative) if relative else 0.0
+        return (f"{len(self.drift)} responses, last drift {errors[-1]:+d} tokens, "
+                f"mean absolute drift {sum(abs(e) for e in errors) / len(errors):.1f} tokens "
+                f"({mean_relative:.1%}), tokenizer {self.tokenizer_name}")
@@ -0,0 +1,176 @@
+"""
+(C) Copyright 2026 Boni Garcia (https://bonigarcia.github.io/)
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+ http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import asyncio
+import copy
+import inspect
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+
+def canonical_args(arguments: Dict[str, Any]) -> str:
+    """The arguments as JSON with sorted keys and no spacing, so equal arguments give equal keys."""
+    return json.dumps(arguments, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+@dataclass
+class ToolSpec:
+    func: Callable[..., Any]
+    timeout: float = 10.0  # seconds before the call is reported as timed out
+    ttl: float = 0.0  # seconds a result is reused for the same arguments (0: never cached)
+
+
+@dataclass
+class ToolCall:
+    call_id: str
+    name: str
+    arguments: Dict[str, Any]
+
+
+@dataclass
+class ToolResult:
+    call_id: str
+    name: str
+    arguments: Dict[str, Any]
+    output: Any
+    cached: bool = False
+    seconds: float = 0.0
+
+
+class ToolDispatcher:
+    """
+    Executes the tool calls of one model turn concurrently.
+
+    Synchronous tools run in a shared thread pool and coroutine functions run on an asyncio
+    event loop, so the calls of a turn take about as long as the slowest one instead of the
+    sum of all of them. Each tool has its own timeout. A call that times out, fails, or names
+    an unknown tool gets an {"error": ...} output, so the other results still reach the model
+    (a timed-out synchronous call cannot be interrupted; its thread finishes in the background).
+
+    Results are memoized by (tool name, canonical arguments) for the tool's `ttl` seconds,
+    so a repeated call such as get_weather("london") is answered without running the tool
+    again. Identical calls within the same turn run only once. The cache keeps its own copy
+    of each result, and every cached output handed out is a copy, so a caller that modifies
+    an output does not change what later calls get.
+    """
+
+    def __init__(self, max_workers: int = 8, clock: Callable[[], float] = time.monotonic):
+        self.tools: Dict[str, ToolSpec] = {}
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool")
+        self.clock = clock
+        self.cache: Dict[Tuple[str, str], Tuple[float, Any]] = {}
+        self.stats = {"calls": 0, "executed": 0, "cache_hits": 0, "coalesced": 0, "timeouts": 0, "errors": 0}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, func: Callable[..., Any], timeout: float = 10.0, ttl: float = 0.0):
+        self.tools[name] = ToolSpec(func, timeout, ttl)
+
+    def cached(self, key: Tuple[str, str]) -> Optional[Tuple[float, Any]]:
+        with self._lock:
+            entry = self.cache.get(key)
+            if entry is not None and entry[0] <= self.clock():
+                del self.cache[key]
+                return None
+            return entry
+
+    def clear_cache(self):
+        with self._lock:
+            self.cache.clear()
+
+    async def execute(self, name: str, arguments: Dict[str, Any]) -> Any:
+        """Runs one tool under its timeout; returns its result or an {"error": ...} output."""
+        spec = self.tools.get(name)
+        if spec is None:
+            self._count("errors")
+            return {"error": f"Unknown function requested by model: {name}"}
+        self._count("executed")
+        try:
+            if inspect.iscoroutinefunction(spec.func):
+                work = spec.func(**arguments)
+            else:
+                loop = asyncio.get_running_loop()
+                work = loop.run_in_executor(self.pool, lambda: spec.func(**arguments))
+            result = await asyncio.wait_for(work, spec.timeout)
+        except asyncio.TimeoutError:
+            self._count("timeouts")
+            return {"error": f"{name} timed out after {spec.timeout:g}s"}
+        except Exception as error:
+            self._count("errors")
+            return {"error": f"{name} failed: {type(error).__name__}: {error}"}
+        if spec.ttl > 0:
+            with self._lock:
+                self.cache[(name, canonical_args(arguments))] = (self.clock() + spec.ttl, copy.deepcopy(result))
+        return result
+
+    async def timed(self, name: str, arguments: Dict[str, Any]) -> Tuple[Any, float]:
+        start = time.perf_counter()
+        output = await self.execute(name, arguments)
+        return output, time.perf_counter() - start
+
+    async def dispatch_async(self, calls: Sequence[ToolCall]) -> List[ToolResult]:
+        """Results in the order of `calls`."""
+        running: Dict[Tuple[str, str], asyncio.Task] = {}
+        hits: Dict[Tuple[str, str], Any] = {}
+        for call in calls:
+            self._count("calls")
+            key = (call.name, canonical_args(call.arguments))
+            if key in running:
+                self._count("coalesced")
+            elif key not in hits:
+                entry = self.cached(key)
+                if entry is not None:
+                    hits[key] = entry[1]
+                else:
+                    running[key] = asyncio.ensure_future(self.timed(call.name, call.arguments))
+
+        results, returned = [], set()
+        for call in calls:
+            key = (call.name, canonical_args(call.arguments))
+            task = running.get(key)
+            if task is None:
+                self._count("cache_hits")
+                output = copy.deepcopy(hits[key])
+                results.append(ToolResult(call.call_id, call.name, call.arguments, output, cached=True))
+            else:
+                output, seconds = await task
+                if key in returned:  # a coalesced call gets its own copy too
+                    output = copy.deepcopy(output)
+                returned.add(key)
+                results.append(ToolResult(call.call_id, call.name, call.arguments, output, seconds=seconds))
+        return results
+
+    def dispatch(self, calls: Sequence[ToolCall]) -> List[ToolResult]:
+        """
+        Synchronous version of `dispatch_async`. Async code should await `dispatch_async`
+        instead: called from a running event loop (e.g., in a notebook), this runs the calls
+        on a new event loop in a helper thread, and blocks the caller's loop until they finish.
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.dispatch_async(calls))
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="dispatch") as helper:
+            return helper.submit(asyncio.run, self.dispatch_async(calls)).result()
+
+    def call(self, name: str, arguments: Dict[str, Any]) -> Any:
+        return self.dispatch([ToolCall("", name, arguments)])[0].output
+
+    def _count(self, counter: str):
+        with self._lock:
+            self.stats[counter] += 1
+
+    def close(self):
+        self.pool.shutdown(wait=False)
@@ -0,0 +1,219 @@
+"""
+(C) Copyright 2026 Boni Garcia (https://bonigarcia.github.io/)
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+ http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Sequence
+
+
+@dataclass
+class BrowserSession:
+    session_id: str
+    browser_name: str
+    last_used: float
+    driver: Any = None
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+class BrowserPool:
+    """
+    WebDriver sessions keyed by session id, driven without blocking the event loop.
+
+    Selenium calls are blocking, so every one of them (starting a browser, navigating,
+    reading the page, quitting) runs in a thread pool of `max_workers` threads. Commands
+    of the same session run one at a time, since a WebDriver session is not thread-safe,
+    while different sessions run in parallel: a slow page load in one session does not
+    delay the others, nor the server itself.
+
+    To make opening a browser fast, `warm_size` browsers of each of `warm_browsers` are
+    started in advance and handed out to new sessions (and replaced in the background).
+    A session that has not been used for `idle_timeout` seconds is closed by `evict_idle`,
+    which `run_maintenance` calls periodically. At most `max_sessions` sessions are open.
+
+    `close_all` stops the background refills and quits every browser. A browser that was
+    still starting at that point is quit as soon as it is ready, so none outlives the pool.
+    """
+
+    def __init__(
+        self,
+        driver_factory: Callable[[str], Any],
+        max_workers: int = 4,
+        idle_timeout: float = 300.0,
+        warm_size: int = 0,
+        warm_browsers: Sequence[str] = ("chrome",),
+        max_sessions: int = 8,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.driver_factory = driver_factory
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="selenium")
+        self.idle_timeout = idle_timeout
+        self.warm_size = warm_size
+        self.warm_browsers = [name.lower() for name in warm_browsers]
+        self.max_sessions = max_sessions
+        self.clock = clock
+        self.sessions: Dict[str, BrowserSession] = {}
+        self.warm: Dict[str, List[Any]] = {name: [] for name in self.warm_browsers}
+        self.warming: Dict[str, int] = {name: 0 for name in self.warm_browsers}
+        self.stats = {"started": 0, "warm_hits": 0, "evicted": 0, "closed": 0}
+        self._tasks = set()  # background refills of the warm browsers
+        self.closed = False
+
+    async def in_thread(self, func: Callable[..., Any], *args) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def start_driver(self, browser_name: str) -> Any:
+        if self.closed:
+            raise RuntimeError("The browser pool is closed")
+        future = self.executor.submit(self._start, browser_name)
+        try:
+            driver = await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            future.add_done_callback(self._quit_late)  # the browser keeps starting in its thread
+            raise
+        self.stats["started"] += 1
+        if self.closed:
+            await self.quit(driver)
+            raise RuntimeError("The browser pool is closed")
+        return driver
+
+    def _start(self, browser_name: str) -> Any:
+        driver = self.driver_factory(browser_name)
+        if self.closed:  # close_all ran while the browser was starting
+            self._quit_now(driver)
+            raise RuntimeError("The browser pool is closed")
+        return driver
+
+    @staticmethod
+    def _quit_late(future):
+        if not future.cancelled() and future.exception() is None:
+            BrowserPool._quit_now(future.result())
+
+    @staticmethod
+    def _quit_now(driver: Any):
+        try:
+            driver.quit()
+        except Exception:
+            pass  # the browser is gone already
+
+    async def open(self, session_id: str, browser_name: str) -> bool:
+        """Opens a browser for the session; returns False if the session already has one."""
+        browser_name = browser_name.lower()
+        session = self.sessions.get(session_id)
+        if session is None:
+            if len(self.sessions) >= self.max_sessions:
+                raise RuntimeError(f"Too many browser sessions (maximum {self.max_sessions})")
+            session = self.sessions[session_id] = BrowserSession(session_id, browser_name, self.clock())
+        async with session.lock:
+            if session.driver is not None:
+                return False
+            try:
+                if self.closed:
+                    raise RuntimeError("The browser pool is closed")
+                if self.warm.get(browser_name):
+                    session.driver = self.warm[browser_name].pop()
+                    self.stats["warm_hits"] += 1
+                    task = asyncio.ensure_future(self.fill_warm())
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+                else:
+                    session.driver = await self.start_driver(browser_name)
+            except Exception:
+                if self.sessions.get(session_id) is session:
+                    del self.sessions[session_id]
+                raise
+            session.browser_name = browser_name
+            session.last_used = self.clock()
+            return True
+
+    async def run(self, session_id: str, func: Callable[..., Any], *args) -> Any:
+        """Runs `func(driver, *args)` in a worker thread, after the earlier commands of the session."""
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise LookupError(f"No browser is open in session '{session_id}'")
+        async with session.lock:
+            if session.driver is None:
+                raise LookupError(f"No browser is open in session '{session_id}'")
+            session.last_used = self.clock()
+            try:
+                return await self.in_thread(func, session.driver, *args)
+            finally:
+                session.last_used = self.clock()
+
+    async def close(self, session_id: str) -> bool:
+        """Quits the browser of the session; returns False if there was none."""
+        session = self.sessions.pop(session_id, None)
+        if session is None:
+            return False
+        async with session.lock:
+            driver, session.driver = session.driver, None
+        if driver is None:
+            return False
+        self.stats["closed"] += 1
+        await self.quit(driver)
+        return True
+
+    async def quit(self, driver: Any):
+        # Once closed, the pool's executor may be shut down already
+        executor = None if self.closed else self.executor
+        await asyncio.get_running_loop().run_in_executor(executor, self._quit_now, driver)
+
+    async def evict_idle(self) -> List[str]:
+        """Closes the sessions idle for longer than `idle_timeout`; returns their ids."""
+        now = self.clock()
+        idle = [s.session_id for s in self.sessions.values()
+                if not s.lock.locked() and now - s.last_used > self.idle_timeout]
+        for session_id in idle:
+            if await self.close(session_id):
+                self.stats["evicted"] += 1
+        return idle
+
+    async def fill_warm(self):
+        """Starts browsers until each warm browser type has `warm_size` of them ready."""
+        for name in self.warm_browsers:
+            missing = self.warm_size - len(self.warm[name]) - self.warming[name]
+            if missing <= 0:
+                continue
+            self.warming[name] += missing
+            try:
+                await asyncio.gather(*(self.warm_one(name) for _ in range(missing)), return_exceptions=True)
+            finally:
+                self.warming[name] -= missing
+
+    async def warm_one(self, browser_name: str):
+        # Each browser joins the warm list as soon as it is started, so that one already
+        # started is never lost if the refill is cancelled while others are still starting
+        driver = await self.start_driver(browser_name)
+        self.warm[browser_name].append(driver)
+
+    async def run_maintenance(self, interval: float = 30.0):
+        """Evicts idle sessions and refills the warm browsers every `interval` seconds, until cancelled."""
+        while True:
+            await self.evict_idle()
+            await self.fill_warm()
+            await asyncio.sleep(interval)
+
+    async def close_all(self):
+        """Cancels the refills in progress and quits every browser, including the ones still starting."""
+        self.closed = True
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        drivers = [driver for name in self.warm for driver in self.warm[name]]
+        for name in self.warm:
+            self.warm[name] = []
+        await asyncio.gather(*(self.close(session_id) for session_id in list(self.sessions)),
+                             *(self.quit(driver) for driver in drivers))
+        # Wait for the browsers still starting in the worker threads (quit by _quit_late)
+        await asyncio.get_running_loop().run_in_executor(None, self.executor.shutdown)
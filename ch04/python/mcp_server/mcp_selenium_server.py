@@ -11,6 +11,7 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 import asyncio
+import os
 from typing import Any, Dict
 from mcp.server import Server, NotificationOptions
 from mcp.server.models import InitializationOptions
@@ -19,57 +20,111 @@ from mcp.types import Tool, TextContent, CallToolResult
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 
+from browser_pool import BrowserPool
+
+
+DEFAULT_SESSION = "default"
+SUPPORTED_BROWSERS = ("chrome", "firefox")
+HEADLESS = os.getenv("SELENIUM_HEADLESS", "true").lower() not in ("0", "false", "no")
+
+
+def create_driver(browser_name: str):
+    """Starts a browser (headless unless SELENIUM_HEADLESS is false)."""
+    name = browser_name.lower()
+    if name == "chrome":
+        options = webdriver.ChromeOptions()
+        if HEADLESS:
+            options.add_argument("--headless=new")
+        return webdriver.Chrome(options=options)
+    if name == "firefox":
+        options = webdriver.FirefoxOptions()
+        if HEADLESS:
+            options.add_argument("-headless")
+        return webdriver.Firefox(options=options)
+    raise ValueError(f"Unsupported browser: {browser_name}")
+
 
 class SeleniumBrowser:
-    def __init__(self):
-        self.driver = None
+    """
+    The browser tools, for any number of independent sessions.
 
-    def start_browser(self, browser_name: str) -> str:
-        if self.driver:
-            return "Browser is already open."
+    Each session id gets its own browser from the pool. The blocking Selenium calls run in
+    the pool's worker threads, so the server keeps serving other requests meanwhile.
+    """
+
+    def __init__(self, pool: BrowserPool):
+        self.pool = pool
+
+    async def start_browser(self, session_id: str, browser_name: str) -> str:
+        if browser_name.lower() not in SUPPORTED_BROWSERS:
+            return f"Error: Unsupported browser: {browser_name}"
         try:
-            if browser_name.lower() == "chrome":
-                self.driver = webdriver.Chrome()
-            elif browser_name.lower() == "firefox":
-                self.driver = webdriver.Firefox()
-            else:
-                return f"Error: Unsupported browser: {browser_name}"
-            return f"Browser '{browser_name}' started successfully."
+            if not await self.pool.open(session_id, browser_name):
+                return "Browser is already open."
+            return f"Browser '{browser_name}' started successfully (session '{session_id}')."
         except Exception as e:
             return f"Error starting browser: {str(e)}"
 
-    def navigate(self, url: str) -> str:
-        if not self.driver:
-            return "Error: Browser not started. Please start a browser first."
+    async def navigate(self, session_id: str, url: str) -> str:
         try:
-            self.driver.get(url)
+            await self.pool.run(session_id, lambda driver: driver.get(url))
             return "Navigation successful."
+        except LookupError:
+            return "Error: Browser not started. Please start a browser first."
         except Exception as e:
             return f"Error navigating to url: {str(e)}"
 
-    def get_text(self) -> str:
-        if not self.driver:
-            return "Error: Browser not started. Please start a browser first."
+    async def get_text(self, session_id: str) -> str:
         try:
-            return self.driver.find_element(By.TAG_NAME, "body").text
+            return await self.pool.run(session_id, lambda driver: driver.find_element(By.TAG_NAME, "body").text)
+        except LookupError:
+            return "Error: Browser not started. Please start a browser first."
         except Exception as e:
             return f"Error reading page text: {str(e)}"
 
-    def close_browser(self) -> str:
-        if not self.driver:
-            return "Error: Browser not started. Please start a browser first."
+    async def close_browser(self, session_id: str) -> str:
         try:
-            self.driver.quit()
-            self.driver = None
+            if not await self.pool.close(session_id):
+                return "Error: Browser not started. Please start a browser first."
             return "Browser closed successfully."
         except Exception as e:
             return f"Error closing browser: {str(e)}"
 
 
-browser = SeleniumBrowser()
+def warm_browsers_from_env() -> list:
+    """The browsers listed in SELENIUM_WARM_BROWSERS (comma-separated), checked at startup."""
+    names = [name.strip().lower() for name in os.getenv("SELENIUM_WARM_BROWSERS", "chrome").split(",")]
+    names = [name for name in names if name]
+    unsupported = [name for name in names if name not in SUPPORTED_BROWSERS]
+    if unsupported:
+        raise ValueError(f"Unsupported browser(s) in SELENIUM_WARM_BROWSERS: {', '.join(unsupported)} "
+                         f"(supported: {', '.join(SUPPORTED_BROWSERS)})")
+    return names
+
+
+pool = BrowserPool(
+    create_driver,
+    max_workers=int(os.getenv("SELENIUM_WORKERS", "4")),
+    idle_timeout=float(os.getenv("SELENIUM_IDLE_TIMEOUT", "300")),
+    warm_size=int(os.getenv("SELENIUM_WARM_SESSIONS", "1")) if HEADLESS else 0,
+    warm_browsers=warm_browsers_from_env(),
+    max_sessions=int(os.getenv("SELENIUM_MAX_SESSIONS", "8")),
+)
+browser = SeleniumBrowser(pool)
 server = Server("mcp-selenium-server")
 
 
+SESSION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "session_id": {
+            "type": "string",
+            "description": "Identifier of the browser session (optional). Each session drives its own browser.",
+        },
+    },
+}
+
+
 @server.list_tools()
 async def handle_list_tools() -> list[Tool]:
     """List available tools."""
@@ -84,6 +139,10 @@ async def handle_list_tools() -> list[Tool]:
                         "type": "string",
                         "description": "The name of the browser to open. Supported values: 'chrome', 'firefox'",
                     },
+                    "session_id": {
+                        "type": "string",
+                        "description": "Identifier of the browser session (optional). Each session drives its own browser.",
+                    },
                 },
                 "required": ["browser_name"],
             },
@@ -98,6 +157,10 @@ async def handle_list_tools() -> list[Tool]:
                         "type": "string",
                         "description": "The complete URL to navigate to (e.g., https://example.com)",
                     },
+                    "session_id": {
+                        "type": "string",
+                        "description": "Identifier of the browser session (optional). Each session drives its own browser.",
+                    },
                 },
                 "required": ["url"],
             },
@@ -105,12 +168,12 @@ async def handle_list_tools() -> list[Tool]:
         Tool(
             name="get_browser_text",
             description="Read the visible text of the entire page.",
-            inputSchema={"type": "object", "properties": {}},
+            inputSchema=SESSION_SCHEMA,
         ),
         Tool(
             name="close_browser",
             description="Close the browser.",
-            inputSchema={"type": "object", "properties": {}},
+            inputSchema=SESSION_SCHEMA,
         ),
     ]
 
@@ -120,16 +183,18 @@ async def handle_call_tool(
         name: str, arguments: Dict[str, Any] | None
 ) -> list[TextContent]:
     """Handle tool calls."""
+    arguments = arguments or {}
+    session_id = arguments.get("session_id") or DEFAULT_SESSION
     if name == "open_browser":
         browser_name = arguments.get("browser_name", "chrome")
-        result = browser.start_browser(browser_name)
+        result = await browser.start_browser(session_id, browser_name)
     elif name == "navigate_url":
         url = arguments.get("url")
-        result = browser.navigate(url)
+        result = await browser.navigate(session_id, url)
     elif name == "get_browser_text":
-        result = browser.get_text()
+        result = await browser.get_text(session_id)
     elif name == "close_browser":
-        result = browser.close_browser()
+        result = await browser.close_browser(session_id)
     else:
         result = f"Error: Tool '{name}' not found"
 
@@ -139,19 +204,25 @@ async def handle_call_tool(
 
 async def main():
     """Run the server."""
-    async with stdio_server() as (read_stream, write_stream):
-        await server.run(
-            read_stream,
-            write_stream,
-            InitializationOptions(
-                server_name="mcp-selenium-server",
-                server_version="1.0.0",
-                capabilities=server.get_capabilities(
-                    notification_options=NotificationOptions(),
-                    experimental_capabilities={},
+    maintenance = asyncio.create_task(pool.run_maintenance(float(os.getenv("SELENIUM_MAINTENANCE_INTERVAL", "30"))))
+    try:
+        async with stdio_server() as (read_stream, write_stream):
+            await server.run(
+                read_stream,
+                write_stream,
+                InitializationOptions(
+                    server_name="mcp-selenium-server",
+                    server_version="1.0.0",
+                    capabilities=server.get_capabilities(
+                        notification_options=NotificationOptions(),
+                        experimental_capabilities={},
+                    ),
                 ),
-            ),
-        )
+            )
+    finally:
+        maintenance.cancel()
+        await asyncio.gather(maintenance, return_exceptions=True)  # including a refill in progress
+        await pool.close_all()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,146 @@
+from importlib import util
+from pathlib import Path
+import asyncio
+import time
+import unittest
+
+
+def load_pool_module():
+    path = Path(__file__).with_name("browser_pool.py")
+    spec = util.spec_from_file_location("browser_pool", path)
+    module = util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class FakeDriver:
+    """A WebDriver stand-in whose page loads block for `load_time` seconds."""
+
+    def __init__(self, browser_name, load_time=0.2):
+        self.browser_name = browser_name
+        self.load_time = load_time
+        self.url = None
+        self.quit_called = False
+
+    def get(self, url):
+        time.sleep(self.load_time)
+        self.url = url
+
+    def quit(self):
+        self.quit_called = True
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class BrowserPoolTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.module = load_pool_module()
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.drivers = []
+
+    def factory(self, browser_name):
+        driver = FakeDriver(browser_name)
+        self.drivers.append(driver)
+        return driver
+
+    def pool(self, **kwargs):
+        return self.module.BrowserPool(self.factory, clock=self.clock, **kwargs)
+
+    def test_sessions_navigate_in_parallel_without_blocking_the_loop(self):
+        async def scenario():
+            pool = self.pool(max_workers=4)
+            await pool.open("a", "chrome")
+            await pool.open("b", "firefox")
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+
+            tick_task = asyncio.create_task(ticker())
+            start = time.perf_counter()
+            await asyncio.gather(pool.run("a", FakeDriver.get, "https://a.example"),
+                                 pool.run("b", FakeDriver.get, "https://b.example"))
+            elapsed = time.perf_counter() - start
+            tick_task.cancel()
+            await pool.close_all()
+            return pool, elapsed, ticks
+
+        pool, elapsed, ticks = asyncio.run(scenario())
+
+        self.assertLess(elapsed, 0.35)
+        self.assertGreater(ticks, 5)
+        self.assertEqual([d.url for d in self.drivers], ["https://a.example", "https://b.example"])
+        self.assertTrue(all(d.quit_called for d in self.drivers))
+        self.assertFalse(pool.sessions)
+
+    def test_warm_browsers_are_handed_out_and_replaced(self):
+        async def scenario():
+            pool = self.pool(warm_size=1)
+            await pool.fill_warm()
+            warm = pool.warm["chrome"][0]
+            await pool.open("a", "chrome")
+            opened = pool.sessions["a"].driver
+            self.assertFalse(await pool.open("a", "chrome"))
+            await asyncio.sleep(0.05)  # the background refill
+            return pool, warm, opened
+
+        pool, warm, opened = asyncio.run(scenario())
+
+        self.assertIs(opened, warm)
+        self.assertEqual(pool.stats["warm_hits"], 1)
+        self.assertEqual(len(pool.warm["chrome"]), 1)
+        self.assertEqual(pool.stats["started"], 2)
+
+    def test_idle_sessions_are_evicted(self):
+        async def scenario():
+            pool = self.pool(idle_timeout=60)
+            await pool.open("old", "chrome")
+            self.clock.now = 50
+            await pool.open("new", "chrome")
+            self.clock.now = 100
+            evicted = await pool.evict_idle()
+            with self.assertRaises(LookupError):
+                await pool.run("old", FakeDriver.get, "https://example.com")
+            return pool, evicted
+
+        pool, evicted = asyncio.run(scenario())
+
+        self.assertEqual(evicted, ["old"])
+        self.assertEqual(list(pool.sessions), ["new"])
+        self.assertTrue(self.drivers[0].quit_called)
+        self.assertEqual(pool.stats["evicted"], 1)
+
+    def test_browsers_still_starting_are_quit_on_close(self):
+        def slow_factory(browser_name):
+            time.sleep(0.2)
+            return self.factory(browser_name)
+
+        async def scenario():
+            pool = self.module.BrowserPool(slow_factory, warm_size=2, clock=self.clock)
+            refill = asyncio.create_task(pool.fill_warm())
+            await asyncio.sleep(0.05)  # the browsers are starting
+            await pool.close_all()
+            await asyncio.gather(refill, return_exceptions=True)
+            return pool
+
+        pool = asyncio.run(scenario())
+
+        self.assertEqual(len(self.drivers), 2)
+        self.assertTrue(all(d.quit_called for d in self.drivers))
+        self.assertEqual(pool.warm["chrome"], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -10,41 +10,303 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
+import argparse
 import asyncio
+import functools
+import hashlib
+import inspect
+import json
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from uuid import UUID
+
 import cognee
 
+DATASET_NAME = "main_dataset"
+
+DEFAULT_TEXT = (
+    "Context engineering is the process of optimizing information "
+    "provided to an LLM to improve its performance and accuracy."
+)
+
+# Cognify task functions (as named in cognee's default pipeline) mapped to the stage they belong to.
+COGNIFY_TASK_STAGES = {
+    "classify_documents": "chunking",
+    "extract_chunks_from_documents": "chunking",
+    "extract_graph_from_data": "extraction",
+    "summarize_text": "extraction",
+    "add_data_points": "graph write",
+}
+
+
+def fingerprint(text: str) -> str:
+    """Content hash used to decide whether a document needs to be cognified again."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def load_documents(docs_dir):
+    """Return {document key: text}. Without a folder, the single demo sentence is used."""
+    if docs_dir is None:
+        return {"inline:context-engineering": DEFAULT_TEXT}
+    root = Path(docs_dir)
+    documents = {}
+    for path in sorted(root.rglob("*")):
+        if path.is_file() and path.suffix.lower() in (".txt", ".md"):
+            documents[path.relative_to(root).as_posix()] = path.read_text(encoding="utf-8")
+    return documents
+
+
+def load_manifest(path: Path) -> dict:
+    if path.exists():
+        return json.loads(path.read_text(encoding="utf-8"))
+    return {}
+
+
+def save_manifest(path: Path, manifest: dict) -> None:
+    path.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+
+
+def manifest_hash(entry) -> str:
+    """Content hash of a manifest entry (older manifests stored only the hash)."""
+    return entry if isinstance(entry, str) else entry.get("hash")
+
+
+def ingested_data_id(result):
+    """(dataset id, data id) of the single item added by `cognee.add`, or (None, None) if not reported."""
+    if isinstance(result, dict):  # some cognee versions return {dataset_id: run info}
+        result = next(iter(result.values()), None)
+    for info in getattr(result, "data_ingestion_info", None) or []:
+        if isinstance(info, dict) and info.get("data_id") is not None:
+            return str(result.dataset_id), str(info["data_id"])
+    return None, None
+
+
+async def delete_document(entry) -> bool:
+    """
+    Removes a previously added document from memory: its data item, and the graph nodes,
+    edges and vectors cognee derived from it. Returns False if its ids are unknown.
+    """
+    if isinstance(entry, str) or not entry.get("data_id") or not entry.get("dataset_id"):
+        return False
+    dataset_id, data_id = UUID(entry["dataset_id"]), UUID(entry["data_id"])
+    datasets = getattr(cognee, "datasets", None)
+    if datasets is not None and hasattr(datasets, "delete_data"):
+        await datasets.delete_data(dataset_id=dataset_id, data_id=data_id)
+    else:  # cognee < 0.3.9
+        await cognee.delete(data_id=data_id, dataset_id=dataset_id)
+    return True
+
+
+def plan_changes(documents: dict, manifest: dict, source: str):
+    """
+    Compares the documents of a corpus with the manifest. Returns the content hash of every
+    document and the manifest keys of the new, changed and removed documents.
+
+    Manifest keys are "<source>:<document key>", so corpora that share file names never
+    collide, and documents of other corpora are neither changed nor removed by this run.
+    """
+    hashes = {f"{source}:{key}": fingerprint(text) for key, text in documents.items()}
+    new = [key for key in hashes if key not in manifest]
+    changed = [key for key in hashes if key in manifest and manifest_hash(manifest[key]) != hashes[key]]
+    removed = [key for key, entry in manifest.items()
+               if key not in hashes and not isinstance(entry, str) and entry.get("source") == source]
+    return hashes, new, changed, removed
+
+
+async def forget_documents(manifest: dict, keys) -> list:
+    """
+    Deletes the documents of these manifest keys from memory, and their manifest entries.
+    A document whose deletion fails keeps its entry, so it is retried on the next run.
+    Returns the keys that were forgotten.
+    """
+    forgotten = []
+    for key in keys:
+        try:
+            deleted = await delete_document(manifest[key])
+        except Exception as e:
+            print(f"Warning: could not delete '{key}' from memory ({type(e).__name__}: {e}); "
+                  f"it is retried on the next run")
+            continue
+        if not deleted:
+            print(f"Warning: the previous version of '{key}' has no recorded data id and stays in memory")
+        del manifest[key]
+        forgotten.append(key)
+    return forgotten
+
+
+class StageTimer:
+    """
+    Accumulates wall-clock time per pipeline stage.
+
+    Stages can nest (e.g., embedding happens inside the graph write task); a nested
+    stage's time is subtracted from its parent so each stage reports only its own time.
+    The current stage is tracked per asyncio task, and cognee runs tasks concurrently,
+    so the totals are summed task time and can exceed the wall-clock total.
+    """
+
+    def __init__(self):
+        self.totals = defaultdict(float)
+        self._current = ContextVar("cognify_stage", default=None)
+
+    @contextmanager
+    def stage(self, name: str):
+        parent = self._current.get()
+        frame = [0.0]  # time spent in nested stages
+        token = self._current.set(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._current.reset(token)
+            self.totals[name] += max(0.0, elapsed - frame[0])
+            if parent is not None:
+                parent[0] += elapsed
+
+    def wrap(self, name: str, fn):
+        """Wrap a sync/async function or (async) generator, preserving its kind."""
+        if inspect.isasyncgenfunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                agen = fn(*args, **kwargs)
+                while True:
+                    with self.stage(name):
+                        try:
+                            item = await agen.__anext__()
+                        except StopAsyncIteration:
+                            return
+                    yield item
+        elif inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                with self.stage(name):
+                    return await fn(*args, **kwargs)
+        elif inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                gen = fn(*args, **kwargs)
+                while True:
+                    with self.stage(name):
+                        try:
+                            item = next(gen)
+                        except StopIteration:
+                            return
+                    yield item
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.stage(name):
+                    return fn(*args, **kwargs)
+        return wrapper
+
+    def report(self) -> str:
+        lines = [f"  {name:<12} {seconds * 1000:10.1f} ms" for name, seconds in sorted(self.totals.items())]
+        return "\n".join(lines) if lines else "  (no stages ran)"
+
+
+async def instrument_cognify(timer: StageTimer) -> None:
+    """
+    Wrap cognify's task functions and the embedding/graph engines with stage timers.
+
+    cognee builds its default task list from functions imported into the cognify module,
+    so replacing those names is enough to time each task without rebuilding the pipeline.
+    """
+    import cognee.api.v1.cognify.cognify as cognify_module
+    from cognee.infrastructure.databases.graph import get_graph_engine
+    from cognee.infrastructure.databases.vector import get_vector_engine
+
+    for task_name, stage in COGNIFY_TASK_STAGES.items():
+        fn = getattr(cognify_module, task_name, None)
+        if fn is not None:
+            setattr(cognify_module, task_name, timer.wrap(stage, fn))
+
+    embedding_engine = get_vector_engine().embedding_engine
+    embedding_engine.embed_text = timer.wrap("embedding", embedding_engine.embed_text)
+
+    graph_engine = await get_graph_engine()
+    for method in ("add_nodes", "add_edges"):
+        if hasattr(graph_engine, method):
+            setattr(graph_engine, method, timer.wrap("graph write", getattr(graph_engine, method)))
+
 
 async def main():
     """
     Demonstrates basic memory operations with Cognee:
-    1. Adding unstructured data (text).
+    1. Adding unstructured data (text), skipping documents already in memory.
     2. 'Cognifying' it (building a knowledge graph and vectorizing).
     3. Searching the memory layer with a hybrid approach.
     """
+    parser = argparse.ArgumentParser(description="Cognee memory example with incremental ingestion")
+    parser.add_argument("--docs", help="Folder with .txt/.md documents to ingest (default: a demo sentence)")
+    parser.add_argument("--manifest", default=".cognee_manifest.json",
+                        help="File storing the content hash of every cognified document")
+    parser.add_argument("--reset", action="store_true", help="Prune all data and rebuild memory from scratch")
+    parser.add_argument("--query", default="What is context engineering?")
+    args = parser.parse_args()
+
     print("=== Cognee Memory Example ===")
+    manifest_path = Path(args.manifest)
 
     # 1. Reset data for a clean start (optional)
-    print("Pruning old data...")
-    await cognee.prune.prune_data()
-    await cognee.prune.prune_system(metadata=True)
-
-    # 2. Add data to memory
-    print("Adding context to memory...")
-    text_context = (
-        "Context engineering is the process of optimizing information "
-        "provided to an LLM to improve its performance and accuracy."
-    )
-    await cognee.add(text_context)
-    print(f"Data added: '{text_context}'")
-
-    # 3. Cognify: Process raw data into structured memory (Graph + Vector)
-    print("Cognifying (building knowledge graph and vector index)...")
-    await cognee.cognify()
+    if args.reset:
+        print("Pruning old data...")
+        await cognee.prune.prune_data()
+        await cognee.prune.prune_system(metadata=True)
+        manifest_path.unlink(missing_ok=True)
+
+    # 2. Add only new or changed documents to memory, and forget the previous version of
+    # changed documents and the documents removed from the corpus
+    documents = load_documents(args.docs)
+    source = str(Path(args.docs).resolve()) if args.docs else "inline"
+    manifest = load_manifest(manifest_path)
+    hashes, new, changed, removed = plan_changes(documents, manifest, source)
+    texts = {f"{source}:{key}": text for key, text in documents.items()}
+    print(f"Documents: {len(documents)} total, {len(new)} new, {len(changed)} changed, "
+          f"{len(removed)} removed, {len(documents) - len(new) - len(changed)} unchanged")
+
+    forgotten = await forget_documents(manifest, changed + removed)
+    for key in removed:
+        if key in forgotten:
+            print(f"Data deleted: '{key}'")
+    if forgotten:
+        save_manifest(manifest_path, manifest)  # a changed document counts as new if adding it fails
+
+    # A changed document whose old version could not be deleted is not added again yet,
+    # so that the two versions never coexist in memory
+    pending = new + [key for key in changed if key in forgotten]
+    if pending:
+        print("Adding context to memory...")
+        for key in pending:
+            # One call per document, so that its data id can be recorded for later deletion
+            result = await cognee.add(texts[key], dataset_name=DATASET_NAME)
+            dataset_id, data_id = ingested_data_id(result)
+            manifest[key] = {"hash": hashes[key], "source": source, "dataset_id": dataset_id, "data_id": data_id}
+            print(f"Data added: '{key}'")
+
+        # 3. Cognify: Process raw data into structured memory (Graph + Vector).
+        # cognee skips data items it has already processed, and entity nodes have
+        # deterministic ids, so only the new items are chunked, extracted and embedded,
+        # and their entities are merged into the existing graph.
+        print("Cognifying (building knowledge graph and vector index)...")
+        timer = StageTimer()
+        await instrument_cognify(timer)
+        start = time.perf_counter()
+        await cognee.cognify(datasets=[DATASET_NAME])
+        total = time.perf_counter() - start
+
+        print("\n--- Cognify stage timings ---")
+        print(timer.report())
+        print(f"  {'total':<12} {total * 1000:10.1f} ms\n")
+        save_manifest(manifest_path, manifest)
+    elif not forgotten:
+        print("Memory is up to date; skipping cognify.")
 
     # 4. Search: Query the memory layer
-    query = "What is context engineering?"
-    print(f"Searching memory for: '{query}'")
-    results = await cognee.search(query_text=query)
+    print(f"Searching memory for: '{args.query}'")
+    results = await cognee.search(query_text=args.query)
 
     print("\n--- Memory Retrieval Results ---")
     if not results:
@@ -55,4 +317,4 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
@@ -0,0 +1,88 @@
+from importlib import util
+from pathlib import Path
+from types import ModuleType, SimpleNamespace
+from unittest import mock
+import asyncio
+import sys
+import unittest
+import uuid
+
+
+class FakeDatasets:
+    """Stands in for `cognee.datasets`: records deletions, and fails for the ids in `failing`."""
+
+    def __init__(self):
+        self.deleted = []
+        self.failing = set()
+
+    async def delete_data(self, dataset_id, data_id):
+        if str(data_id) in self.failing:
+            raise RuntimeError("data not found")
+        self.deleted.append(str(data_id))
+
+
+def load_memory_module(fake_cognee):
+    path = Path(__file__).with_name("cognee_memory.py")
+    spec = util.spec_from_file_location("cognee_memory", path)
+    module = util.module_from_spec(spec)
+    with mock.patch.dict(sys.modules, {"cognee": fake_cognee}):
+        spec.loader.exec_module(module)
+    return module
+
+
+def entry(module, text, source):
+    return {"hash": module.fingerprint(text), "source": source,
+            "dataset_id": str(uuid.uuid4()), "data_id": str(uuid.uuid4())}
+
+
+class IncrementalIngestionTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.cognee = ModuleType("cognee")
+        cls.module = load_memory_module(cls.cognee)
+
+    def setUp(self):
+        self.cognee.datasets = FakeDatasets()
+
+    def test_documents_are_classified_as_new_changed_and_removed(self):
+        manifest = {
+            "/a:intro.md": entry(self.module, "Intro", "/a"),
+            "/a:usage.md": entry(self.module, "Old usage", "/a"),
+            "/a:gone.md": entry(self.module, "Gone", "/a"),
+        }
+        documents = {"intro.md": "Intro", "usage.md": "New usage", "faq.md": "FAQ"}
+
+        _, new, changed, removed = self.module.plan_changes(documents, manifest, "/a")
+
+        self.assertEqual((new, changed, removed), (["/a:faq.md"], ["/a:usage.md"], ["/a:gone.md"]))
+
+    def test_corpora_sharing_file_names_do_not_collide(self):
+        manifest = {"/a:intro.md": entry(self.module, "Intro of A", "/a")}
+
+        _, new, changed, removed = self.module.plan_changes({"intro.md": "Intro of B"}, manifest, "/b")
+
+        self.assertEqual((new, changed, removed), (["/b:intro.md"], [], []))
+
+    def test_a_failed_deletion_keeps_the_manifest_entry(self):
+        manifest = {
+            "/a:usage.md": entry(self.module, "Old usage", "/a"),
+            "/a:gone.md": entry(self.module, "Gone", "/a"),
+        }
+        self.cognee.datasets.failing.add(manifest["/a:gone.md"]["data_id"])
+        usage_id = manifest["/a:usage.md"]["data_id"]
+
+        forgotten = asyncio.run(self.module.forget_documents(manifest, ["/a:usage.md", "/a:gone.md"]))
+
+        self.assertEqual(forgotten, ["/a:usage.md"])
+        self.assertEqual(self.cognee.datasets.deleted, [usage_id])
+        self.assertEqual(list(manifest), ["/a:gone.md"])
+
+    def test_added_data_id_is_read_from_the_pipeline_result(self):
+        result = SimpleNamespace(dataset_id="ds", data_ingestion_info=[{"data_id": "item"}])
+
+        self.assertEqual(self.module.ingested_data_id(result), ("ds", "item"))
+        self.assertEqual(self.module.ingested_data_id(None), (None, None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -13,10 +13,15 @@ limitations under the License.
 from __future__ import annotations
 
 import argparse
+import json
 import os
 import sys
+import threading
+import time
+import uuid
 from datetime import datetime, UTC
-from typing import Any, Dict, List, Optional, Sequence
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
 
 from openai import OpenAI
 from rich.console import Console
@@ -140,6 +145,211 @@ class GPT5:
         return (resp.output_text or "").strip()
 
 
+# -----------------------------
+# Write-behind memory queue
+# -----------------------------
+
+class MemoryWriteQueue:
+    """
+    Batches conversation turns per user and writes them to Mem0 on a background thread.
+
+    `mem0.add` runs an LLM extraction plus a vector upsert, so calling it inline delays
+    the next prompt by the full write cost. Instead, turns are buffered and flushed as a
+    single `add` call per user when `batch_turns` turns are pending, when the oldest
+    pending turn is older than `flush_seconds`, or when `flush()` is called (e.g., on /exit).
+
+    Every enqueued turn is appended to a small JSONL spool before it is acknowledged, and
+    the spool is rewritten after each successful flush. Turns left over from a crashed
+    session are replayed on startup.
+
+    A failed write keeps the batch pending, and the worker retries it with exponential
+    backoff (`retry_seconds`, doubled after each failure up to `max_retry_seconds`), since
+    every attempt may repeat a paid LLM extraction. `on_error` is called for the first
+    failure only, until a write for that user succeeds again.
+    """
+
+    def __init__(
+        self,
+        mem0: Any,
+        spool_path: Path,
+        batch_turns: int = 4,
+        flush_seconds: float = 30.0,
+        on_error: Optional[Callable[[str, Exception], None]] = None,
+        retry_seconds: float = 5.0,
+        max_retry_seconds: float = 300.0,
+    ):
+        self.mem0 = mem0
+        self.spool_path = spool_path
+        self.batch_turns = max(1, int(batch_turns))
+        self.flush_seconds = max(0.1, float(flush_seconds))
+        self.on_error = on_error
+        self.retry_seconds = retry_seconds
+        self.max_retry_seconds = max_retry_seconds
+
+        self._pending: Dict[str, List[Dict[str, Any]]] = {}
+        self._failures: Dict[str, int] = {}  # consecutive failed writes per user
+        self._retry_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="mem0-writer", daemon=True)
+
+        self._load_spool()
+
+    # Public API
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def enqueue(self, user_id: str, messages: List[Dict[str, str]], metadata: Dict[str, Any]) -> None:
+        entry = {
+            "id": uuid.uuid4().hex,
+            "user_id": user_id,
+            "messages": messages,
+            "metadata": metadata,
+            "queued_at": time.time(),
+        }
+        with self._lock:
+            self._append_spool(entry)
+            batch = self._pending.setdefault(user_id, [])
+            batch.append(entry)
+            if len(batch) >= self.batch_turns:
+                self._wakeup.set()
+
+    def pending_count(self, user_id: Optional[str] = None) -> int:
+        with self._lock:
+            if user_id is not None:
+                return len(self._pending.get(user_id, []))
+            return sum(len(batch) for batch in self._pending.values())
+
+    def discard(self, user_id: str) -> int:
+        """
+        Drop pending (not yet written) turns for a user, e.g., before /forget.
+
+        Waits for a flush already in progress, so that no write of the user's turns
+        can land after this returns (and after their memories are deleted).
+        """
+        with self._write_lock:
+            with self._lock:
+                dropped = self._pending.pop(user_id, [])
+                self._failures.pop(user_id, None)
+                self._retry_at.pop(user_id, None)
+                self._rewrite_spool()
+        return len(dropped)
+
+    def flush(self, user_id: Optional[str] = None) -> None:
+        """Synchronously write pending turns (for one user or for everyone)."""
+        with self._lock:
+            users = [user_id] if user_id is not None else list(self._pending)
+        for uid in users:
+            self._flush_user(uid)
+
+    def close(self) -> None:
+        """Stop the worker and flush everything that is still pending."""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.flush()
+
+    # Worker
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wakeup.wait(timeout=min(1.0, self.flush_seconds))
+            self._wakeup.clear()
+            if self._stop.is_set():
+                break
+            for uid in self._due_users():
+                self._flush_user(uid)
+
+    def _due_users(self) -> List[str]:
+        now = time.time()
+        with self._lock:
+            return [
+                uid for uid, batch in self._pending.items()
+                if batch and now >= self._retry_at.get(uid, 0.0) and (
+                    len(batch) >= self.batch_turns
+                    or now - batch[0]["queued_at"] >= self.flush_seconds
+                )
+            ]
+
+    def _flush_user(self, user_id: str) -> None:
+        # Serialize writers so the worker and an explicit flush never add the same batch twice.
+        with self._write_lock:
+            with self._lock:
+                batch = list(self._pending.get(user_id, []))
+            if not batch:
+                return
+
+            messages: List[Dict[str, str]] = []
+            for entry in batch:
+                messages.extend(entry["messages"])
+            metadata = dict(batch[-1]["metadata"])
+            metadata["turns"] = len(batch)
+
+            try:
+                self.mem0.add(messages=messages, user_id=user_id, metadata=metadata)
+            except Exception as e:
+                # Keep the batch pending (and spooled) so it is retried, after a backoff.
+                with self._lock:
+                    failures = self._failures[user_id] = self._failures.get(user_id, 0) + 1
+                    delay = min(self.max_retry_seconds, self.retry_seconds * 2 ** (failures - 1))
+                    self._retry_at[user_id] = time.time() + delay
+                if self.on_error and failures == 1:
+                    self.on_error(user_id, e)
+                return
+
+            written = {entry["id"] for entry in batch}
+            with self._lock:
+                self._failures.pop(user_id, None)
+                self._retry_at.pop(user_id, None)
+                remaining = [e for e in self._pending.get(user_id, []) if e["id"] not in written]
+                if remaining:
+                    self._pending[user_id] = remaining
+                else:
+                    self._pending.pop(user_id, None)
+                self._rewrite_spool()
+
+    # Spool (caller must hold self._lock, except during __init__)
+
+    def _load_spool(self) -> None:
+        if not self.spool_path.exists():
+            return
+        with self.spool_path.open("r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn last line from a crash mid-write; everything before it is intact.
+                    continue
+                self._pending.setdefault(entry["user_id"], []).append(entry)
+
+    def _append_spool(self, entry: Dict[str, Any]) -> None:
+        self.spool_path.parent.mkdir(parents=True, exist_ok=True)
+        with self.spool_path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _rewrite_spool(self) -> None:
+        entries = [entry for batch in self._pending.values() for entry in batch]
+        if not entries:
+            self.spool_path.unlink(missing_ok=True)
+            return
+        tmp_path = self.spool_path.with_suffix(self.spool_path.suffix + ".tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.spool_path)
+
+
 # -----------------------------
 # Main loop
 # -----------------------------
@@ -162,6 +372,14 @@ def main() -> int:
     parser.add_argument("--top-k", type=int, default=int(os.getenv("TOP_K", "6")), help="Memories to retrieve per turn")
     parser.add_argument("--window", type=int, default=int(os.getenv("WINDOW_TURNS", "8")),
                         help="In-session turns to keep (short-term context)")
+    parser.add_argument("--batch-turns", type=int, default=int(os.getenv("MEM0_BATCH_TURNS", "4")),
+                        help="Turns buffered per user before a background memory write")
+    parser.add_argument("--flush-seconds", type=float, default=float(os.getenv("MEM0_FLUSH_SECONDS", "30")),
+                        help="Max age of a buffered turn before it is written to memory")
+    parser.add_argument("--spool", default=os.getenv("MEM0_SPOOL", ".mem0_spool.jsonl"),
+                        help="On-disk spool for turns not yet written to memory")
+    parser.add_argument("--sync-writes", action="store_true",
+                        help="Write every turn to memory inline (original, blocking behavior)")
     args = parser.parse_args()
 
     if not os.getenv("OPENAI_API_KEY"):
@@ -171,6 +389,29 @@ def main() -> int:
     mem0 = Memory.from_config(build_mem0_config())
     llm = GPT5(model=args.model)
 
+    def report_write_error(user_id: str, e: Exception) -> None:
+        console.print(f"[yellow]Warning:[/yellow] Memory write for {user_id} failed (retrying in the background, with backoff): {e}")
+
+    writer: Optional[MemoryWriteQueue] = None
+    if not args.sync_writes:
+        writer = MemoryWriteQueue(
+            mem0,
+            spool_path=Path(args.spool),
+            batch_turns=args.batch_turns,
+            flush_seconds=args.flush_seconds,
+            on_error=report_write_error,
+        )
+        replayed = writer.pending_count()
+        if replayed:
+            console.print(f"Replaying {replayed} spooled turn(s) from a previous session.")
+        writer.start()
+
+    def shutdown() -> None:
+        if writer is not None and writer.pending_count():
+            console.print("Flushing pending memory writes...")
+        if writer is not None:
+            writer.close()
+
     # Short-term, in-session transcript (bounded)
     transcript: List[Dict[str, str]] = []
 
@@ -182,6 +423,7 @@ def main() -> int:
             user_text = Prompt.ask("[bold cyan]you[/bold cyan]").strip()
         except (EOFError, KeyboardInterrupt):
             console.print("\nExiting.")
+            shutdown()
             return 0
 
         if not user_text:
@@ -192,10 +434,14 @@ def main() -> int:
             if cmd == "/help":
                 console.print(HELP)
             elif cmd == "/exit":
+                shutdown()
                 console.print("Goodbye.")
                 return 0
             elif cmd == "/memories":
                 try:
+                    # Make recent turns visible before listing.
+                    if writer is not None:
+                        writer.flush(args.user)
                     # Not all versions expose get_all in OSS mode; handle defensively.
                     memories = mem0.get_all(user_id=args.user)
                     mem_list = normalize_mem0_results(memories, max_items=10)
@@ -205,6 +451,8 @@ def main() -> int:
                     console.print(f"[yellow]Unable to list memories in this setup:[/yellow] {e}\n")
             elif cmd == "/forget":
                 try:
+                    if writer is not None:
+                        writer.discard(args.user)
                     # Prefer delete_all if available; otherwise fall back to delete by search results.
                     if hasattr(mem0, "delete_all"):
                         mem0.delete_all(user_id=args.user)
@@ -243,15 +491,17 @@ def main() -> int:
 
         # Write this turn to memory (long-term)
         # Mem0 will infer what to store (preferences/facts) by default.
+        turn = [
+            {"role": "user", "content": user_text},
+            {"role": "assistant", "content": assistant_text},
+        ]
+        metadata = {"source": "cli", "ts": now_iso(), "app": "gpt5-mem0-qdrant"}
+        if writer is not None:
+            # Write-behind: the background worker batches turns into one Mem0 add call.
+            writer.enqueue(args.user, turn, metadata)
+            continue
         try:
-            mem0.add(
-                messages=[
-                    {"role": "user", "content": user_text},
-                    {"role": "assistant", "content": assistant_text},
-                ],
-                user_id=args.user,
-                metadata={"source": "cli", "ts": now_iso(), "app": "gpt5-mem0-qdrant"},
-            )
+            mem0.add(messages=turn, user_id=args.user, metadata=metadata)
         except Exception as e:
             console.print(f"[yellow]Warning:[/yellow] Memory write failed: {e}\n")
 
@@ -0,0 +1,143 @@
+from importlib import util
+from pathlib import Path
+import json
+import tempfile
+import threading
+import time
+import unittest
+
+
+def load_chat_module():
+    path = Path(__file__).with_name("mem0_chat.py")
+    spec = util.spec_from_file_location("mem0_chat", path)
+    module = util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class FakeMem0:
+    """Records `add` calls. It fails while `failing` is set, and blocks while `gate` is clear."""
+
+    def __init__(self):
+        self.added = []
+        self.failing = False
+        self.gate = threading.Event()
+        self.gate.set()
+        self.started = threading.Event()
+
+    def add(self, messages, user_id, metadata):
+        self.started.set()
+        self.gate.wait()
+        if self.failing:
+            raise RuntimeError("extraction failed")
+        self.added.append((user_id, [m["content"] for m in messages], metadata["turns"]))
+
+
+class MemoryWriteQueueTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.module = load_chat_module()
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.spool = Path(tmp.name) / "spool.jsonl"
+        self.mem0 = FakeMem0()
+        self.errors = []
+
+    def queue(self, **kwargs):
+        queue = self.module.MemoryWriteQueue(self.mem0, self.spool, on_error=lambda uid, e: self.errors.append(uid),
+                                             **kwargs)
+        self.addCleanup(queue._stop.set)
+        return queue
+
+    def turn(self, queue, text, user_id="alice"):
+        queue.enqueue(user_id, [{"role": "user", "content": text}], {"source": "test"})
+
+    def wait_for(self, condition, timeout=3.0):
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return condition()
+
+    def test_a_batch_is_written_after_batch_turns_turns(self):
+        queue = self.queue(batch_turns=2, flush_seconds=60)
+        queue.start()
+        self.turn(queue, "one")
+        time.sleep(0.1)
+        self.assertEqual(self.mem0.added, [])
+
+        self.turn(queue, "two")
+
+        self.assertTrue(self.wait_for(lambda: self.mem0.added))
+        self.assertEqual(self.mem0.added, [("alice", ["one", "two"], 2)])
+        self.assertFalse(self.spool.exists())
+
+    def test_old_turns_are_written_without_a_full_batch(self):
+        queue = self.queue(batch_turns=10, flush_seconds=0.1)
+        queue.start()
+        self.turn(queue, "one")
+
+        self.assertTrue(self.wait_for(lambda: self.mem0.added))
+        self.assertEqual(self.mem0.added, [("alice", ["one"], 1)])
+
+    def test_spooled_turns_are_replayed_despite_a_torn_last_line(self):
+        entries = [{"id": str(i), "user_id": "alice", "messages": [{"role": "user", "content": f"turn {i}"}],
+                    "metadata": {}, "queued_at": 0} for i in range(2)]
+        self.spool.write_text("".join(json.dumps(e) + "\n" for e in entries) + '{"id": "2", "user_', encoding="utf-8")
+
+        queue = self.queue()
+        self.assertEqual(queue.pending_count("alice"), 2)
+        queue.flush()
+
+        self.assertEqual(self.mem0.added, [("alice", ["turn 0", "turn 1"], 2)])
+        self.assertFalse(self.spool.exists())
+
+    def test_a_failed_write_is_kept_and_retried_with_backoff(self):
+        self.mem0.failing = True
+        queue = self.queue(batch_turns=1, flush_seconds=60, retry_seconds=0.3)
+        queue.start()
+        self.turn(queue, "one")
+        self.assertTrue(self.wait_for(lambda: self.errors))
+        time.sleep(0.2)  # the worker wakes up meanwhile, but the retry is not due yet
+
+        self.assertEqual(queue.pending_count("alice"), 1)
+        self.assertTrue(self.spool.exists())
+        self.mem0.failing = False
+
+        self.assertTrue(self.wait_for(lambda: self.mem0.added))
+        self.assertEqual(self.errors, ["alice"])
+        self.assertEqual(queue.pending_count(), 0)
+
+    def test_failures_are_reported_once_until_a_write_succeeds(self):
+        self.mem0.failing = True
+        queue = self.queue(retry_seconds=0)
+        self.turn(queue, "one")
+        for _ in range(3):
+            queue.flush()
+
+        self.assertEqual(self.errors, ["alice"])
+
+    def test_discard_waits_for_a_write_in_progress(self):
+        queue = self.queue()
+        self.turn(queue, "one")
+        self.mem0.gate.clear()
+        flusher = threading.Thread(target=queue.flush)
+        flusher.start()
+        self.assertTrue(self.mem0.started.wait(3))
+
+        discarded = []
+        discarder = threading.Thread(target=lambda: discarded.append(queue.discard("alice")))
+        discarder.start()
+        time.sleep(0.1)
+        self.assertEqual(discarded, [])  # blocked by the write in progress
+
+        self.mem0.gate.set()
+        flusher.join()
+        discarder.join()
+        self.assertEqual(len(self.mem0.added), 1)
+        self.assertEqual(discarded, [0])  # nothing was left to drop, and no write can follow
+
+
+if __name__ == "__main__":
+    unittest.main()